@@ -0,0 +1,130 @@
+# Copyright 2014-2015 Kapil Thangavelu <kapil.foss@gmail.com>
+#
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+"""Generate synthetic topologies for benchmarking.
+
+Usage::
+
+    $ python -m benchmarks.generate --nodes 500 > topology.yaml
+
+Topologies consist of compute servers hosting software components.
+Each component is of a custom type derived `type_depth` levels from
+tosca.nodes.SoftwareComponent, and has `fanout` requirements on
+earlier components. Components form chains of `chain_depth`
+get_ref_property lookups, each ending in a get_input.
+"""
+
+import argparse
+import random
+import sys
+
+import yaml
+
+TYPE_PREFIX = 'bench.nodes.Component'
+
+
+def generate_types(type_depth, fanout):
+    """Return node types forming a derivation chain of type_depth.
+    """
+    types = {}
+    base = 'tosca.nodes.SoftwareComponent'
+    for level in range(type_depth):
+        name = '%s%d' % (TYPE_PREFIX, level)
+        types[name] = {
+            'derived_from': base,
+            'properties': {
+                'level_%d' % level: {
+                    'type': 'integer',
+                    'required': False,
+                    'constraints': [{'greater_or_equal': 0}]}}}
+        base = name
+    types[base].setdefault('properties', {})['chained'] = {
+        'type': 'string', 'required': False}
+    types[base]['requirements'] = [
+        {'dep_%d' % i: 'tosca.nodes.Root'} for i in range(fanout)]
+    return base, types
+
+
+def generate(nodes=100, fanout=2, chain_depth=3, type_depth=3, seed=0):
+    """Return the data of a synthetic topology of `nodes` templates.
+    """
+    rng = random.Random(seed)
+    type_depth = max(type_depth, 1)
+    component_type, node_types = generate_types(type_depth, fanout)
+    servers = max(1, nodes // 10)
+    templates = {}
+    for i in range(servers):
+        templates['server_%d' % i] = {
+            'type': 'tosca.nodes.Compute',
+            'properties': {'num_cpus': 2, 'mem_size': 2048,
+                           'disk_size': 10, 'os_type': 'linux'}}
+
+    components = []
+    for i in range(nodes - servers):
+        name = 'app_%d' % i
+        requirements = [{'host': 'server_%d' % (i % servers)}]
+        properties = dict(
+            ('level_%d' % level, level) for level in range(type_depth))
+        position = i % (chain_depth + 1)
+        for slot in range(min(fanout, len(components))):
+            if slot == 0 and position:
+                target = components[-1]
+            else:
+                target = rng.choice(components)
+            requirements.append({'dep_%d' % slot: target})
+        if position and fanout and components:
+            properties['chained'] = {
+                'get_ref_property': ['dep_0', 'chained']}
+        else:
+            properties['chained'] = {'get_input': 'base_value'}
+        templates[name] = {
+            'type': component_type,
+            'properties': properties,
+            'requirements': requirements}
+        components.append(name)
+
+    return {
+        'tosca_definitions_version': 'tosca_simple_1_0',
+        'description': 'Synthetic benchmark topology.',
+        'inputs': {'base_value': {
+            'type': 'string', 'description': 'Start of ref chains.'}},
+        'node_types': node_types,
+        'node_templates': templates,
+        'outputs': {'server_cpus': {
+            'description': 'Cpus of the first server.',
+            'value': {'get_property': ['server_0', 'num_cpus']}}}}
+
+
+def setup_parser():
+    parser = argparse.ArgumentParser(
+        description="Generate a synthetic topology.")
+    parser.add_argument('--nodes', type=int, default=100)
+    parser.add_argument('--fanout', type=int, default=2)
+    parser.add_argument('--chain-depth', type=int, default=3)
+    parser.add_argument('--type-depth', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=0)
+    return parser
+
+
+def main():
+    args = setup_parser().parse_args()
+    yaml.safe_dump(
+        generate(args.nodes, args.fanout, args.chain_depth,
+                 args.type_depth, args.seed),
+        sys.stdout, default_flow_style=False)
+
+
+if __name__ == '__main__':
+    main()
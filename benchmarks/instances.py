@@ -0,0 +1,84 @@
+# Copyright 2014-2015 Kapil Thangavelu <kapil.foss@gmail.com>
+#
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+"""Compare instance store queries against scanning a list of instances.
+
+Usage::
+
+    $ python -m benchmarks.instances [instances]
+
+Creates a fleet of servers each hosting web servers, a quarter of them
+started, and times finding the started web servers hosted on one
+server by scanning a list and with each store backend.
+"""
+
+import sys
+import timeit
+
+from pytosca.instances import (
+    Instance, MemoryInstanceStore, SQLiteInstanceStore)
+
+PER_HOST = 10
+TYPES = ('tosca.nodes.WebServer', 'tosca.nodes.SoftwareComponent',
+         'tosca.nodes.Root')
+
+
+def fleet(count):
+    instances = []
+    for i in range(count / (PER_HOST + 1)):
+        server = 'server-%d' % i
+        instances.append(Instance(
+            server, 'server', ('tosca.nodes.Compute', 'tosca.nodes.Root'),
+            state='started'))
+        for j in range(PER_HOST):
+            instances.append(Instance(
+                '%s-web-%d' % (server, j), 'webserver', TYPES, host=server,
+                state=j % 4 and 'created' or 'started'))
+    return instances
+
+
+def scan(instances, host):
+    return [i for i in instances
+            if i.host == host and i.state == 'started' and
+            'tosca.nodes.WebServer' in i.types]
+
+
+def best(func, repeat=5, number=100):
+    return min(timeit.repeat(func, repeat=repeat, number=number)) / number
+
+
+def main():
+    count = len(sys.argv) > 1 and int(sys.argv[1]) or 50000
+    instances = fleet(count)
+    host = 'server-%d' % (len(instances) / (PER_HOST + 1) / 2)
+    print "%-24s %10.3f ms" % (
+        'list scan', best(lambda: scan(instances, host)) * 1000)
+    for store in (MemoryInstanceStore(), SQLiteInstanceStore()):
+        start = timeit.default_timer()
+        store.add_many(instances)
+        elapsed = timeit.default_timer() - start
+        print "%-24s %10.3f ms" % (
+            '%s add' % store.__class__.__name__, elapsed * 1000)
+        assert len(store.find(
+            type='WebServer', host=host, state='started')) == len(
+                scan(instances, host))
+        print "%-24s %10.3f ms" % (
+            '%s find' % store.__class__.__name__, best(
+                lambda: store.find(
+                    type='WebServer', host=host, state='started')) * 1000)
+
+
+if __name__ == '__main__':
+    main()
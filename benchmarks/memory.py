@@ -0,0 +1,122 @@
+# Copyright 2014-2015 Kapil Thangavelu <kapil.foss@gmail.com>
+#
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+"""Measure the memory held by the runtime objects of node templates.
+
+Usage::
+
+    $ python -m benchmarks.memory [template ...]
+    $ python -m benchmarks.memory -o results.json
+
+Materializes the properties, requirements, capabilities and interface
+operations of every node template and reports the bytes per node
+template of the objects created, excluding the template data and type
+hierarchy they share with the topology.
+
+Figures are compared with a baseline results file, by default
+memory_baseline.json next to this script. It records the figures from
+before runtime objects used __slots__.
+"""
+
+import argparse
+import json
+import logging
+import os
+import sys
+
+from pytosca.tosca import Tosca
+
+TEST_DATA = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    'pytosca', 'tests', 'data')
+
+BASELINE = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), 'memory_baseline.json')
+
+DEFAULT_TEMPLATES = [
+    os.path.join(TEST_DATA, 'tosca_single_instance_wordpress.yaml'),
+    os.path.join(TEST_DATA, 'tosca_custom_relations.yaml')]
+
+
+def object_size(obj):
+    size = sys.getsizeof(obj)
+    if hasattr(obj, '__dict__'):
+        size += sys.getsizeof(obj.__dict__)
+    return size
+
+
+def materialize(node):
+    objects = [node]
+    objects.extend(node.properties)
+    objects.extend(node.requirements)
+    for capability in node.capabilities:
+        objects.append(capability)
+        objects.extend(capability.properties)
+    for operation in node.interfaces:
+        objects.append(operation)
+        objects.extend(operation.properties)
+    return objects
+
+
+def template_size(path):
+    topology = Tosca.load(path)
+    nodes = list(topology.nodetemplates)
+    objects = []
+    for node in nodes:
+        objects.extend(materialize(node))
+    return len(nodes), len(objects), sum(map(object_size, objects))
+
+
+def setup_parser():
+    parser = argparse.ArgumentParser(
+        description="Measure memory held per node template.")
+    parser.add_argument('templates', nargs='*', default=DEFAULT_TEMPLATES)
+    parser.add_argument(
+        '--baseline', default=BASELINE,
+        help="results file to compare with, default %(default)s")
+    parser.add_argument(
+        '-o', '--output', help="write results as json to this file")
+    return parser
+
+
+def main():
+    args = setup_parser().parse_args()
+    logging.basicConfig(level=logging.ERROR)
+    baseline = {}
+    if args.baseline and os.path.exists(args.baseline):
+        with open(args.baseline) as fh:
+            baseline = json.load(fh)['results']
+
+    results = {}
+    for path in args.templates:
+        name = os.path.basename(path)
+        nodes, objects, size = template_size(path)
+        results[name] = {'nodes': nodes, 'objects': objects,
+                         'bytes_per_node': size / nodes}
+        line = "%-40s %4d nodes %5d objects %8d bytes/node" % (
+            name, nodes, objects, size / nodes)
+        if name in baseline:
+            before = baseline[name]['bytes_per_node']
+            line += "  baseline %8d  %5.2fx" % (
+                before, float(size / nodes) / before)
+        print line
+    if args.output:
+        with open(args.output, 'w') as fh:
+            json.dump({'python': sys.version.split()[0],
+                       'results': results}, fh, indent=2, sort_keys=True)
+
+
+if __name__ == '__main__':
+    main()
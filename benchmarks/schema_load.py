@@ -0,0 +1,75 @@
+# Copyright 2014-2015 Kapil Thangavelu <kapil.foss@gmail.com>
+#
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+"""Compare schema loading with and without the compiled schema cache.
+
+Usage::
+
+    $ python -m benchmarks.schema_load
+
+Reports both the in process cost of TypeHierarchy.load_schema and the
+cold start cost of a fresh interpreter loading the normative types.
+"""
+
+import logging
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import timeit
+
+from pytosca.cache import SchemaCache
+from pytosca.tosca import Tosca, TypeHierarchy
+
+COLD_START = (
+    "from pytosca.tosca import Tosca, TypeHierarchy;"
+    "TypeHierarchy().load_schema(Tosca.schema_path)")
+
+
+def in_process(cache, number=200):
+    return min(timeit.repeat(
+        lambda: TypeHierarchy().load_schema(Tosca.schema_path, cache=cache),
+        number=number, repeat=3)) / number
+
+
+def cold_start(cache_dir, number=10):
+    env = dict(os.environ, PYTOSCA_CACHE_DIR=cache_dir)
+    cmd = [sys.executable, "-c", COLD_START]
+    with open(os.devnull, 'w') as devnull:
+        return min(timeit.repeat(
+            lambda: subprocess.check_call(cmd, env=env, stderr=devnull),
+            number=number, repeat=3)) / number
+
+
+def main():
+    logging.basicConfig(level=logging.ERROR)
+    cache_dir = tempfile.mkdtemp()
+    try:
+        cache = SchemaCache(cache_dir)
+        TypeHierarchy.compile_schema(Tosca.schema_path, cache=cache)
+        results = [
+            ("load_schema parsed", in_process(False)),
+            ("load_schema cached", in_process(cache)),
+            ("cold start parsed", cold_start("")),
+            ("cold start cached", cold_start(cache_dir))]
+    finally:
+        shutil.rmtree(cache_dir)
+    for name, seconds in results:
+        print "%-20s %8.3f ms" % (name, seconds * 1000)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,66 @@
+# Copyright 2014-2015 Kapil Thangavelu <kapil.foss@gmail.com>
+#
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+"""Measure interpreter startup costs of using pytosca.
+
+Usage::
+
+    $ python -m benchmarks.startup
+
+Each measurement runs in a fresh interpreter, reporting the time to
+import pytosca.tosca, and the time to the first get_template of a
+template with the schema cache populated.
+"""
+
+import logging
+import os
+import subprocess
+import sys
+import timeit
+
+from pytosca.tosca import Tosca, TypeHierarchy
+
+TEMPLATE = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    'pytosca', 'tests', 'data', 'tosca_single_instance_wordpress.yaml')
+
+BASELINE = "pass"
+IMPORT = "import pytosca.tosca"
+FIRST_TEMPLATE = (
+    "from pytosca.tosca import Tosca;"
+    "Tosca.load(%r).get_template('wordpress').properties" % TEMPLATE)
+
+
+def run(code, number=10):
+    cmd = [sys.executable, "-c", code]
+    with open(os.devnull, 'w') as devnull:
+        return min(timeit.repeat(
+            lambda: subprocess.check_call(cmd, stderr=devnull),
+            number=number, repeat=3)) / number
+
+
+def main():
+    logging.basicConfig(level=logging.ERROR)
+    # Populate the schema cache so runs measure the warm path.
+    TypeHierarchy().load_schema(Tosca.schema_path)
+    baseline = run(BASELINE)
+    for name, code in (("import", IMPORT),
+                       ("first get_template", FIRST_TEMPLATE)):
+        seconds = run(code) - baseline
+        print "%-20s %8.3f ms" % (name, seconds * 1000)
+
+
+if __name__ == '__main__':
+    main()
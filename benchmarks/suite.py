@@ -0,0 +1,255 @@
+# Copyright 2014-2015 Kapil Thangavelu <kapil.foss@gmail.com>
+#
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+"""Benchmark suite over synthetic topologies.
+
+Usage::
+
+    $ python -m benchmarks.suite -o results.json
+    $ python -m benchmarks.suite --compare base.json results.json
+
+Runs each benchmark against a generated topology, reporting the best
+time of several repeats. Results are written as JSON along with the
+topology parameters and the interpreter and pytosca versions, and two
+result files may be compared to spot regressions between commits.
+"""
+
+import argparse
+import json
+import logging
+import os
+import platform
+import shutil
+import subprocess
+import tempfile
+import timeit
+
+import yaml
+
+import pytosca
+from pytosca.graph import TopologyGraph
+from pytosca.snapshot import Snapshot
+from pytosca.tosca import Tosca, TypeHierarchy
+
+from benchmarks.generate import generate
+
+BENCHMARKS = []
+
+
+def benchmark(func):
+    BENCHMARKS.append(func)
+    return func
+
+
+class Context(object):
+    """A generated topology, saved to a file, and its loaded form.
+    """
+
+    def __init__(self, params):
+        self.params = params
+        self.data = generate(**params)
+        self.dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.dir, 'topology.yaml')
+        with open(self.path, 'w') as fh:
+            yaml.safe_dump(self.data, fh, default_flow_style=False)
+        self.topology = self.load()
+        self.snapshot = self.topology.snapshot().dumps()
+
+    def load(self):
+        topology = Tosca.load(self.path)
+        topology.bind_inputs({'base_value': 'base'})
+        return topology
+
+    def close(self):
+        shutil.rmtree(self.dir)
+
+
+@benchmark
+def load_schema(context):
+    TypeHierarchy().load_schema(Tosca.schema_path, cache=False)
+
+
+@benchmark
+def load_schema_cached(context):
+    types = TypeHierarchy()
+    types.load_schema(Tosca.schema_path)
+    types.warmup()
+
+
+@benchmark
+def load(context):
+    Tosca.load(context.path)
+
+
+@benchmark
+def nodetemplates(context):
+    context.topology.invalidate()
+    context.topology.nodetemplates
+
+
+@benchmark
+def resolve_properties(context):
+    topology = context.topology
+    topology.invalidate()
+    for node in topology.nodetemplates:
+        for p in node.properties:
+            p.value
+
+
+@benchmark
+def resolve_all(context):
+    context.topology.invalidate()
+    context.topology.resolve_all()
+
+
+@benchmark
+def validate(context):
+    topology = context.topology
+    topology.invalidate()
+    for node in topology.nodetemplates:
+        node.validate()
+
+
+@benchmark
+def requirement_traversal(context):
+    topology = context.topology
+    topology.invalidate()
+    for node in topology.nodetemplates:
+        for r in node.requirements:
+            r.target
+
+
+@benchmark
+def graph_sort(context):
+    TopologyGraph(context.topology).sort()
+
+
+@benchmark
+def find_templates(context):
+    context.topology.find_templates(type='Root', properties={'level_0': 0})
+
+
+@benchmark
+def snapshot_compile(context):
+    context.topology.invalidate()
+    context.topology.snapshot()
+
+
+@benchmark
+def snapshot_load(context):
+    snapshot = Snapshot.loads(context.snapshot)
+    for node in snapshot.nodetemplates:
+        node.properties
+
+
+def measure(func, context, repeat):
+    times = []
+    for i in range(repeat):
+        start = timeit.default_timer()
+        func(context)
+        times.append(timeit.default_timer() - start)
+    return {'min': min(times), 'mean': sum(times) / len(times),
+            'repeat': repeat}
+
+
+def revision():
+    try:
+        with open(os.devnull, 'w') as devnull:
+            return subprocess.check_output(
+                ['git', 'rev-parse', 'HEAD'], stderr=devnull,
+                cwd=os.path.dirname(os.path.abspath(__file__))).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(params, repeat=5, names=None):
+    context = Context(params)
+    try:
+        results = {}
+        for func in BENCHMARKS:
+            if names and func.__name__ not in names:
+                continue
+            results[func.__name__] = measure(func, context, repeat)
+    finally:
+        context.close()
+    return {
+        'params': params,
+        'python': platform.python_version(),
+        'pytosca': pytosca.__version__,
+        'revision': revision(),
+        'results': results}
+
+
+def compare(base, current):
+    """Return (name, base seconds, current seconds, ratio) rows.
+    """
+    rows = []
+    for name in sorted(current['results']):
+        if name not in base['results']:
+            continue
+        old = base['results'][name]['min']
+        new = current['results'][name]['min']
+        rows.append((name, old, new, old and new / old or None))
+    return rows
+
+
+def setup_parser():
+    parser = argparse.ArgumentParser(
+        description="Run benchmarks over a synthetic topology.")
+    parser.add_argument('--nodes', type=int, default=200)
+    parser.add_argument('--fanout', type=int, default=2)
+    parser.add_argument('--chain-depth', type=int, default=3)
+    parser.add_argument('--type-depth', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument(
+        '-b', '--benchmark', action='append', dest='names',
+        choices=[f.__name__ for f in BENCHMARKS],
+        help="only run the named benchmark, may be repeated")
+    parser.add_argument(
+        '-o', '--output', help="write results as json to this file")
+    parser.add_argument(
+        '--compare', nargs=2, metavar=('BASE', 'CURRENT'),
+        help="compare two result files instead of running")
+    return parser
+
+
+def main():
+    args = setup_parser().parse_args()
+    logging.basicConfig(level=logging.ERROR)
+
+    if args.compare:
+        with open(args.compare[0]) as fh:
+            base = json.load(fh)
+        with open(args.compare[1]) as fh:
+            current = json.load(fh)
+        for name, old, new, ratio in compare(base, current):
+            print "%-24s %10.3f ms %10.3f ms %7.2fx" % (
+                name, old * 1000, new * 1000, ratio or 0)
+        return
+
+    params = {'nodes': args.nodes, 'fanout': args.fanout,
+              'chain_depth': args.chain_depth,
+              'type_depth': args.type_depth, 'seed': args.seed}
+    report = run(params, args.repeat, args.names)
+    for name, result in sorted(report['results'].items()):
+        print "%-24s %10.3f ms" % (name, result['min'] * 1000)
+    if args.output:
+        with open(args.output, 'w') as fh:
+            json.dump(report, fh, indent=2, sort_keys=True)
+
+
+if __name__ == '__main__':
+    main()
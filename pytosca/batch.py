@@ -0,0 +1,120 @@
+# Copyright 2014-2015 Kapil Thangavelu <kapil.foss@gmail.com>
+#
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import itertools
+
+from pytosca.tosca import Constraint
+
+
+def _is_type(*types):
+    def check(value):
+        return isinstance(value, types) and not (
+            isinstance(value, bool) and bool not in types)
+    return check
+
+
+TYPE_CHECKS = {
+    'integer': _is_type(int, long),
+    'number': _is_type(int, long, float),
+    'float': _is_type(int, long, float),
+    'string': _is_type(basestring),
+    'boolean': _is_type(bool),
+    'list': _is_type(list),
+    'map': _is_type(dict)}
+
+
+class InputValidator(object):
+    """Validate many sets of input values against one topology.
+
+    The checks for each input are compiled once: its declared type and
+    constraints, along with the constraints of any node template or
+    capability property bound directly to it via get_input. Input sets
+    are then checked column wise, one input across all sets at a time,
+    without binding them to the topology.
+    """
+
+    def __init__(self, topology):
+        self.inputs = {}
+        self.types = {}
+        for name, attrs in (topology.data.get('inputs') or {}).items():
+            attrs = attrs or {}
+            checks = []
+            if attrs.get('constraints'):
+                checks.append(
+                    (None, Constraint.compile_all(attrs['constraints'])))
+            required = attrs.get('required', True) and (
+                attrs.get('default') is None)
+            self.types[name] = attrs.get('type')
+            self.inputs[name] = (
+                required, TYPE_CHECKS.get(attrs.get('type')), checks)
+
+        for node in topology.nodetemplates:
+            self._add_property_checks(node.name, node)
+            for c in node.capabilities:
+                if c is not None:
+                    self._add_property_checks(
+                        "%s.%s" % (node.name, c.name), c)
+
+    def _add_property_checks(self, label, container):
+        template_properties = container._template_properties()
+        for name, validator in (container._validators or {}).items():
+            value = template_properties.get(name)
+            if not isinstance(value, dict) or 'get_input' not in value:
+                continue
+            if value['get_input'] in self.inputs:
+                self.inputs[value['get_input']][2].append(
+                    ("%s.%s" % (label, name), validator))
+
+    def validate(self, input_sets, chunk_size=1024):
+        """Yield a list of errors for each input set, in order.
+
+        Input sets may be any iterable of dicts, they are consumed
+        chunk_size at a time.
+        """
+        input_sets = iter(input_sets)
+        while True:
+            chunk = list(itertools.islice(input_sets, chunk_size))
+            if not chunk:
+                return
+            for errors in self._validate_chunk(chunk):
+                yield errors
+
+    def _validate_chunk(self, chunk):
+        results = [[] for _ in chunk]
+        for values, errors in itertools.izip(chunk, results):
+            for name in values:
+                if name not in self.inputs:
+                    errors.append("Unknown input %s" % name)
+
+        for name, (required, type_check, checks) in self.inputs.items():
+            for values, errors in itertools.izip(chunk, results):
+                if name not in values:
+                    if required:
+                        errors.append("Missing input %s" % name)
+                    continue
+                value = values[name]
+                if type_check is not None and not type_check(value):
+                    errors.append("Input %s value %r is not of type %s" % (
+                        name, value, self.types[name]))
+                    continue
+                for label, validator in checks:
+                    for constraint_type, constraint in validator(value):
+                        error = "Input %s value %r violates %s: %s" % (
+                            name, value, constraint_type, constraint)
+                        if label:
+                            error += " (%s)" % label
+                        errors.append(error)
+        return results
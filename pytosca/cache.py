@@ -0,0 +1,153 @@
+# Copyright 2014-2015 Kapil Thangavelu <kapil.foss@gmail.com>
+#
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import glob
+import hashlib
+import json
+import logging
+import os
+import tempfile
+
+from pytosca import __version__
+
+
+log = logging.getLogger("tosca.cache")
+
+# Bumped whenever the layout of compiled type entries changes.
+CACHE_FORMAT = 6
+
+
+def _encode(value):
+    """Return a value as json types, raising TypeError for others.
+
+    Tuples are stored as lists, dicts need string keys so they read
+    back unchanged.
+    """
+    if isinstance(value, dict):
+        encoded = {}
+        for k, v in value.items():
+            if not isinstance(k, basestring):
+                raise TypeError("Can't cache non string key %r" % (k,))
+            encoded[k] = _encode(v)
+        return encoded
+    elif isinstance(value, (list, tuple)):
+        return [_encode(v) for v in value]
+    elif value is None or isinstance(
+            value, (basestring, bool, int, long, float)):
+        return value
+    raise TypeError("Can't cache value %r" % (value,))
+
+
+def _decode(value):
+    """Restore strings as yaml loads them, str when ascii.
+    """
+    if isinstance(value, unicode):
+        try:
+            return value.encode('ascii')
+        except UnicodeEncodeError:
+            return value
+    elif isinstance(value, dict):
+        return dict((_decode(k), _decode(v)) for k, v in value.items())
+    elif isinstance(value, list):
+        return [_decode(v) for v in value]
+    return value
+
+
+class SchemaCache(object):
+    """On disk cache of compiled type schemas.
+
+    A compiled schema is the list of type entries produced by
+    TypeHierarchy while processing a schema file, in load order, with
+    each type's properties, requirements, capabilities and interfaces
+    already merged with those of its base type. Entries are keyed by
+    the content hash of the schema file and the library version, so
+    edits to the schema or an upgrade simply miss the cache.
+
+    Entries are stored as json, so reading a cache directory can't run
+    code, and values json can't represent are not cached.
+    """
+
+    prefix = "schema-"
+    suffix = ".json"
+
+    def __init__(self, path):
+        self.path = path
+
+    @classmethod
+    def default(cls):
+        """Return the cache configured via PYTOSCA_CACHE_DIR.
+
+        An empty value disables caching, and None is returned.
+        """
+        path = os.environ.get('PYTOSCA_CACHE_DIR')
+        if path is None:
+            path = os.path.join(
+                os.path.expanduser('~'), '.cache', 'pytosca')
+        if not path:
+            return None
+        return cls(path)
+
+    def key(self, content):
+        digest = hashlib.sha1()
+        digest.update("%s:%s:" % (__version__, CACHE_FORMAT))
+        digest.update(content)
+        return digest.hexdigest()
+
+    def _entry_path(self, content):
+        return os.path.join(
+            self.path,
+            "%s%s%s" % (self.prefix, self.key(content), self.suffix))
+
+    def get(self, content):
+        entry_path = self._entry_path(content)
+        try:
+            with open(entry_path, 'rb') as fh:
+                return _decode(json.load(fh))
+        except IOError:
+            return None
+        except Exception as e:
+            log.warning("Discarding unreadable schema cache %s: %s",
+                        entry_path, e)
+            return None
+
+    def put(self, content, compiled):
+        entry_path = self._entry_path(content)
+        try:
+            encoded = json.dumps(_encode(compiled), separators=(',', ':'))
+        except (TypeError, ValueError) as e:
+            log.info("Not caching %s: %s", entry_path, e)
+            return
+        try:
+            if not os.path.isdir(self.path):
+                os.makedirs(self.path, 0o700)
+            fd, tmp_path = tempfile.mkstemp(dir=self.path)
+            with os.fdopen(fd, 'wb') as fh:
+                fh.write(encoded)
+            os.rename(tmp_path, entry_path)
+        except (IOError, OSError) as e:
+            log.warning("Could not write schema cache %s: %s", entry_path, e)
+
+    def clear(self):
+        for p in glob.glob(
+                os.path.join(self.path, "%s*%s" % (self.prefix, self.suffix))):
+            os.remove(p)
+
+
+class ImportCache(SchemaCache):
+    """On disk cache of parsed import documents, keyed by content.
+    """
+
+    prefix = "import-"
@@ -0,0 +1,146 @@
+# Copyright 2014-2015 Kapil Thangavelu <kapil.foss@gmail.com>
+#
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+"""Command line interface for validating, resolving and planning templates.
+
+Templates are given as files, directories (searched recursively for
+yaml files) or glob patterns, and processed across a pool of worker
+processes. Each worker loads the normative types once, and results
+are written as one JSON object per line as they complete.
+"""
+
+import argparse
+import fnmatch
+import glob
+import json
+import logging
+import multiprocessing
+import os
+import sys
+
+from pytosca.tosca import Tosca, warmup, yaml_load
+
+TEMPLATE_PATTERNS = ('*.yaml', '*.yml')
+
+
+def find_templates(paths):
+    """Yield template files from files, directories and glob patterns.
+    """
+    for path in paths:
+        if os.path.isdir(path):
+            for root, dirs, files in os.walk(path):
+                dirs.sort()
+                for f in sorted(files):
+                    if any(fnmatch.fnmatch(f, p) for p in TEMPLATE_PATTERNS):
+                        yield os.path.join(root, f)
+        elif os.path.exists(path):
+            yield path
+        else:
+            for match in sorted(glob.glob(path)):
+                yield match
+
+
+def validate(topology):
+    errors = []
+    for node in topology.nodetemplates:
+        errors.extend(node.validate())
+    topology.resolve_all()
+    return {'valid': not errors, 'errors': errors}
+
+
+def resolve(topology):
+    return {'values': topology.resolve_all().as_dict()}
+
+
+def plan(topology):
+    from pytosca.executor import Plan
+    return {'levels': [
+        ["%s.%s" % key for key in level] for level in Plan(topology).levels()]}
+
+
+COMMANDS = {'validate': validate, 'resolve': resolve, 'plan': plan}
+
+
+def process(job):
+    command, path, inputs = job
+    result = {'path': path}
+    try:
+        topology = Tosca.load(path)
+        if inputs:
+            errors = next(topology.validate_inputs([inputs]))
+            if errors:
+                result['error'] = "Invalid inputs: %s" % "; ".join(errors)
+                return result
+            topology.bind_inputs(inputs)
+        result.update(COMMANDS[command](topology))
+    except Exception as e:
+        result['error'] = "%s: %s" % (e.__class__.__name__, e)
+    return result
+
+
+def setup_parser():
+    parser = argparse.ArgumentParser(
+        prog='pytosca', description="Process TOSCA templates.")
+    parser.add_argument(
+        'command', choices=sorted(COMMANDS),
+        help="validate, resolve values of, or plan the lifecycle operations"
+        " of the templates")
+    parser.add_argument(
+        'paths', nargs='+', metavar='PATH',
+        help="template file, directory or glob pattern")
+    parser.add_argument(
+        '-i', '--inputs', metavar='FILE',
+        help="yaml or json file of input values to bind")
+    parser.add_argument(
+        '-j', '--jobs', type=int, default=0,
+        help="number of worker processes, defaults to the cpu count")
+    return parser
+
+
+def main(argv=None, output=None):
+    args = setup_parser().parse_args(argv)
+    output = output or sys.stdout
+    logging.basicConfig(level=logging.ERROR)
+
+    inputs = None
+    if args.inputs:
+        with open(args.inputs) as fh:
+            inputs = yaml_load(fh.read())
+    jobs = ((args.command, path, inputs)
+            for path in find_templates(args.paths))
+
+    # Build the types before forking, so workers share them.
+    warmup()
+    processes = args.jobs or multiprocessing.cpu_count()
+    if processes == 1:
+        results = (process(job) for job in jobs)
+        pool = None
+    else:
+        pool = multiprocessing.Pool(processes, initializer=warmup)
+        results = pool.imap_unordered(process, jobs)
+
+    failed = False
+    try:
+        for result in results:
+            failed = failed or 'error' in result or (
+                not result.get('valid', True))
+            output.write(json.dumps(result, sort_keys=True, default=str))
+            output.write("\n")
+            output.flush()
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+    return failed and 1 or 0
@@ -0,0 +1,186 @@
+# Copyright 2014-2015 Kapil Thangavelu <kapil.foss@gmail.com>
+#
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+"""Structural comparison of two topologies.
+
+Every node template is reduced to a digest of its aspects: its type,
+the definition of its type when defined by the template, its resolved
+property, capability and operation input values, its operation
+implementations and its requirements. Templates with equal digests
+are skipped without further comparison, the rest report which aspects
+changed. The change set is then extended through the new topology's
+requirement graph to every template depending on a changed one.
+"""
+
+import hashlib
+import json
+
+from pytosca.tosca import type_names
+
+ASPECTS = (
+    'type', 'types', 'properties', 'capabilities', 'interfaces',
+    'requirements')
+
+TYPE_SECTIONS = ('node_types', 'capability_types', 'relation_types')
+
+
+def digest(value):
+    return hashlib.sha1(
+        json.dumps(value, sort_keys=True, default=repr)).hexdigest()
+
+
+class TopologyDiff(object):
+    """The changes between two topologies.
+
+    `modified` maps each changed template to the aspects that changed,
+    `affected` holds the added and modified templates along with all the
+    templates transitively requiring them or a removed template, and
+    `types` the names of template defined types that were added,
+    removed or changed. A template using a changed node, capability or
+    relation type, directly or as a base type, has its 'types' aspect
+    modified.
+    """
+
+    def __init__(self, added, removed, modified, affected, types):
+        self.added = added
+        self.removed = removed
+        self.modified = modified
+        self.affected = affected
+        self.types = types
+
+    @property
+    def changed(self):
+        return bool(self.added or self.removed or self.modified or self.types)
+
+    def __repr__(self):
+        return "<TopologyDiff added:%d removed:%d modified:%d affected:%d>" % (
+            len(self.added), len(self.removed), len(self.modified),
+            len(self.affected))
+
+
+def fingerprint(topology):
+    """Return a mapping of template name to (digest, aspect digests).
+    """
+    resolved = {}
+    for key, value in topology.resolve_all().items():
+        if key[0] == 'node_templates':
+            resolved.setdefault(key[1], {}).setdefault(
+                key[2], []).append((key[3:], value))
+    type_digests = _type_digests(topology)
+
+    prints = {}
+    for name, data in (topology.data.get('node_templates') or {}).items():
+        values = resolved.get(name, {})
+        interfaces = data.get('interfaces') or {}
+        aspects = {
+            'type': digest(data.get('type')),
+            'types': _type_chain_digest(topology, data.get('type'),
+                                        type_digests),
+            'properties': digest(sorted(values.get('properties', ()))),
+            'capabilities': digest(sorted(values.get('capabilities', ()))),
+            'interfaces': digest([
+                sorted(values.get('interfaces', ())),
+                sorted([(k, _implementation(v))
+                        for k, v in interfaces.items()])]),
+            'requirements': digest(data.get('requirements'))}
+        prints[name] = (
+            digest([aspects[a] for a in ASPECTS]), aspects)
+    return prints
+
+
+def _implementation(op):
+    if isinstance(op, dict):
+        return op.get('implementation')
+    return op
+
+
+def _type_digests(topology):
+    digests = {}
+    for section in TYPE_SECTIONS:
+        for name, definition in (topology.data.get(section) or {}).items():
+            digests[(section, name)] = digest(definition)
+    return digests
+
+
+def _type_chain_digest(topology, type_name, type_digests):
+    # Only template defined types can change between topologies, walk
+    # the chain of template defined base types.
+    node_types = topology.data.get('node_types') or {}
+    chain = []
+    while type_name in node_types and type_name not in chain:
+        chain.append(type_name)
+        type_name = (node_types[type_name] or {}).get('derived_from')
+    return digest([type_digests[('node_types', t)] for t in chain])
+
+
+def used_types(topology):
+    """Return a mapping of template name to the type names it uses.
+
+    These are the names of its node type, capability types and relation
+    types, along with their base types.
+    """
+    used = {}
+    for node in topology.nodetemplates:
+        names = set(node.type_names)
+        for c in node.capabilities:
+            if c is not None:
+                names.update(type_names(c.__class__))
+        for r in node.requirements:
+            names.update(type_names(r.__class__))
+        used[node.name] = names
+    return used
+
+
+def diff(old, new):
+    """Compare two topologies, returning a TopologyDiff.
+    """
+    old_prints = fingerprint(old)
+    new_prints = fingerprint(new)
+    added = set(new_prints) - set(old_prints)
+    removed = set(old_prints) - set(new_prints)
+
+    modified = {}
+    for name in set(old_prints) & set(new_prints):
+        old_digest, old_aspects = old_prints[name]
+        new_digest, new_aspects = new_prints[name]
+        if old_digest == new_digest:
+            continue
+        modified[name] = [
+            a for a in ASPECTS if old_aspects[a] != new_aspects[a]]
+
+    old_types = _type_digests(old)
+    new_types = _type_digests(new)
+    types = set([
+        k[1] for k in set(old_types) | set(new_types)
+        if old_types.get(k) != new_types.get(k)])
+
+    # Templates using a changed capability or relation type, which the
+    # node type chain digest doesn't cover.
+    if types:
+        for topology in (old, new):
+            for name, used in used_types(topology).items():
+                if name in added or name in removed or not used & types:
+                    continue
+                aspects = modified.setdefault(name, [])
+                if 'types' not in aspects:
+                    aspects.append('types')
+                    aspects.sort(key=ASPECTS.index)
+
+    changed = added | set(modified)
+    affected = changed | new.graph.all_dependents(changed)
+    # Templates that required a removed template lost their target.
+    lost = old.graph.all_dependents(removed) & set(new_prints)
+    affected |= lost | new.graph.all_dependents(lost)
+    return TopologyDiff(added, removed, modified, affected, types)
@@ -0,0 +1,327 @@
+# Copyright 2014-2015 Kapil Thangavelu <kapil.foss@gmail.com>
+#
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+"""Lifecycle operation plans and their parallel execution.
+
+A Plan derives the lifecycle operations to run for a topology and the
+order between them from the node templates' requirements. A node's
+operations run in sequence, and its first operation waits for the last
+operation of every template it requires, whether hosted on, depending
+on or connecting to it. A PlanExecutor runs the plan's operations on a
+pool of worker threads as soon as their requirements are met, handing
+each to a pluggable runner.
+"""
+
+import collections
+import logging
+import os
+import Queue
+import subprocess
+import threading
+import time
+
+from pytosca.tosca import topological_levels
+
+
+log = logging.getLogger("tosca.executor")
+
+DEPLOY = ('create', 'configure', 'start')
+UNDEPLOY = ('stop', 'delete')
+
+SUCCEEDED = 'succeeded'
+FAILED = 'failed'
+SKIPPED = 'skipped'
+CANCELLED = 'cancelled'
+
+
+class OperationError(Exception):
+    """Raised by runners when an operation fails."""
+
+
+class Task(object):
+    """A lifecycle operation of a node template within a plan.
+    """
+    __slots__ = ('node', 'operation', 'implementation', 'inputs', 'host',
+                 'requires')
+
+    def __init__(self, node, operation, implementation, inputs, host):
+        self.node = node
+        self.operation = operation
+        self.implementation = implementation
+        self.inputs = inputs
+        self.host = host
+        self.requires = []
+
+    @property
+    def key(self):
+        return (self.node, self.operation)
+
+    def __repr__(self):
+        return "<Task %s.%s impl:%s>" % (
+            self.node, self.operation, self.implementation)
+
+
+class Plan(object):
+    """The lifecycle operations for a topology and their ordering.
+
+    With reverse set, as for UNDEPLOY, templates are processed before
+    the templates they require instead of after them.
+    """
+
+    def __init__(self, topology, operations=DEPLOY, reverse=False):
+        self.topology = topology
+        self.operations = operations
+        self.reverse = reverse
+        self.tasks = {}
+        self._build()
+
+    def _build(self):
+        graph = self.topology.graph
+        resolved = self.topology.resolve_all()
+
+        node_tasks = {}
+        for node in self.topology.nodetemplates:
+            interfaces = dict((op.name, op) for op in node.interfaces)
+            prefix = ('node_templates', node.name, 'interfaces')
+            tasks = node_tasks[node.name] = []
+            for name in self.operations:
+                op = interfaces.get(name)
+                if op is None:
+                    continue
+                inputs = dict([
+                    (p.name, resolved[prefix + (name, p.name)])
+                    for p in op.properties])
+                task = Task(node.name, name, op.implementation, inputs,
+                            graph.host(node.name))
+                if tasks:
+                    task.requires.append(tasks[-1].key)
+                tasks.append(task)
+                self.tasks[task.key] = task
+
+        # The tasks a template's dependents wait on, templates without
+        # operations pass through the tasks of their own requirements.
+        waits = {}
+        order = graph.sort()
+        if self.reverse:
+            order.reverse()
+        for name in order:
+            if self.reverse:
+                required = graph.sources(name)
+            else:
+                required = graph.targets(name)
+            required_waits = []
+            for r in required:
+                required_waits.extend(waits[r])
+            tasks = node_tasks.get(name)
+            if tasks:
+                tasks[0].requires.extend(sorted(set(required_waits)))
+                waits[name] = [tasks[-1].key]
+            else:
+                waits[name] = required_waits
+
+    def levels(self):
+        """Return task keys grouped in mutually independent levels.
+        """
+        return topological_levels(
+            dict((k, t.requires) for k, t in self.tasks.items()))
+
+
+class Result(object):
+
+    __slots__ = ('task', 'status', 'output', 'error', 'duration')
+
+    def __init__(self, task, status, output=None, error=None, duration=0):
+        self.task = task
+        self.status = status
+        self.output = output
+        self.error = error
+        self.duration = duration
+
+    def __repr__(self):
+        return "<Result %s.%s %s>" % (
+            self.task.node, self.task.operation, self.status)
+
+
+class PlanExecutor(object):
+    """Run a plan's operations concurrently on a thread pool.
+
+    `host_limit` caps the number of operations running at once against
+    the templates of any single host. With `fail_fast` a failure stops
+    any further operations from starting, otherwise only the operations
+    depending on the failed one are skipped.
+    """
+
+    def __init__(self, runner, max_workers=4, host_limit=None,
+                 fail_fast=True):
+        self.runner = runner
+        self.max_workers = max_workers
+        self.host_limit = host_limit
+        self.fail_fast = fail_fast
+
+    def execute(self, plan):
+        """Run the plan, returning a mapping of task key to Result.
+        """
+        pending = {}
+        dependents = collections.defaultdict(list)
+        for key, task in plan.tasks.items():
+            pending[key] = len(task.requires)
+            for r in task.requires:
+                dependents[r].append(key)
+        ready = collections.deque(sorted(k for k in pending if not pending[k]))
+        results = {}
+        host_running = collections.defaultdict(int)
+        work, done = Queue.Queue(), Queue.Queue()
+        workers = [threading.Thread(target=self._work, args=(work, done))
+                   for i in range(self.max_workers)]
+        for w in workers:
+            w.daemon = True
+            w.start()
+
+        running = 0
+        stopped = False
+        try:
+            while True:
+                deferred = collections.deque()
+                while ready and not stopped:
+                    task = plan.tasks[ready.popleft()]
+                    if self.host_limit and (
+                            host_running[task.host] >= self.host_limit):
+                        deferred.append(task.key)
+                        continue
+                    host_running[task.host] += 1
+                    running += 1
+                    work.put(task)
+                ready.extendleft(reversed(deferred))
+                if not running:
+                    break
+                result = done.get()
+                running -= 1
+                host_running[result.task.host] -= 1
+                results[result.task.key] = result
+                if result.status == SUCCEEDED:
+                    for d in dependents[result.task.key]:
+                        pending[d] -= 1
+                        if not pending[d]:
+                            ready.append(d)
+                elif self.fail_fast:
+                    stopped = True
+                else:
+                    self._skip(plan, result.task.key, dependents, results)
+        finally:
+            for w in workers:
+                work.put(None)
+            for w in workers:
+                w.join()
+
+        for key, task in plan.tasks.items():
+            if key not in results:
+                results[key] = Result(task, CANCELLED)
+        return results
+
+    def _skip(self, plan, key, dependents, results):
+        stack = list(dependents[key])
+        while stack:
+            d = stack.pop()
+            if d in results:
+                continue
+            results[d] = Result(plan.tasks[d], SKIPPED)
+            stack.extend(dependents[d])
+
+    def _work(self, work, done):
+        while True:
+            task = work.get()
+            if task is None:
+                return
+            started = time.time()
+            try:
+                output = None
+                if task.implementation:
+                    output = self.runner.run(task)
+                result = Result(task, SUCCEEDED, output)
+            except BaseException as e:
+                # Always post a result, or execute waits on it forever.
+                log.warning("Operation %s.%s failed: %s",
+                            task.node, task.operation, e)
+                result = Result(task, FAILED, error=e)
+            result.duration = time.time() - started
+            done.put(result)
+
+
+class SubprocessRunner(object):
+    """Run operation implementations as local processes.
+
+    Implementations are paths to executables relative to `base_dir`,
+    or when no such file exists, inline shell scripts. Operation inputs
+    are passed to the process as environment variables, unicode values
+    encoded as utf-8.
+    """
+
+    def __init__(self, base_dir=None, env=None):
+        self.base_dir = base_dir
+        self.env = env
+
+    def run(self, task):
+        env = dict(self.env is None and os.environ or self.env)
+        for k, v in task.inputs.items():
+            if isinstance(v, unicode):
+                env[k] = v.encode('utf-8')
+            elif v is not None:
+                env[k] = str(v)
+        impl = task.implementation
+        path = os.path.join(self.base_dir or os.getcwd(), impl)
+        if os.path.isfile(path):
+            cmd = [path]
+        else:
+            cmd = ['/bin/sh', '-c', impl]
+        process = subprocess.Popen(
+            cmd, env=env, cwd=self.base_dir,
+            stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+        output, _ = process.communicate()
+        if process.returncode:
+            raise OperationError("%s exited with %d: %s" % (
+                impl.splitlines()[0], process.returncode, output))
+        return output
+
+
+class FakeRunner(object):
+    """In memory runner recording the operations run, for tests.
+
+    Operations whose (node, operation) key is in `fail` raise an
+    OperationError.
+    """
+
+    def __init__(self, fail=(), delay=0):
+        self.fail = set(fail)
+        self.delay = delay
+        self.calls = []
+        self.running = collections.defaultdict(int)
+        self.max_running = collections.defaultdict(int)
+        self._lock = threading.Lock()
+
+    def run(self, task):
+        with self._lock:
+            self.calls.append(task.key)
+            self.running[task.host] += 1
+            self.max_running[task.host] = max(
+                self.max_running[task.host], self.running[task.host])
+        try:
+            if self.delay:
+                time.sleep(self.delay)
+            if task.key in self.fail:
+                raise OperationError("%s.%s failed" % task.key)
+            return task.implementation
+        finally:
+            with self._lock:
+                self.running[task.host] -= 1
@@ -0,0 +1,161 @@
+# Copyright 2014-2015 Kapil Thangavelu <kapil.foss@gmail.com>
+#
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+from pytosca.lazy import iter_templates
+from pytosca.tosca import (
+    get_relation_class, get_template_requirements,
+    topological_levels, topological_sort)
+
+
+class Edge(object):
+    """A requirement slot of a node template bound to another template.
+    """
+    __slots__ = ('source', 'name', 'target', 'relation')
+
+    def __init__(self, source, name, target, relation):
+        self.source = source
+        self.name = name
+        self.target = target
+        self.relation = relation
+
+    def __repr__(self):
+        return "<Edge %s.%s -> %s (%s)>" % (
+            self.source, self.name, self.target,
+            self.relation and self.relation.__name__)
+
+
+class TopologyGraph(object):
+    """Index of the requirement edges between a topology's node templates.
+
+    The graph is built once from the template data, without instantiating
+    node templates, and offers constant time lookups of a template's
+    requirements and dependents. Requirements that are unbound, or refer
+    to something other than a node template in the topology, are not
+    part of the graph.
+    """
+
+    def __init__(self, topology):
+        self.topology = topology
+        self._requirements = {}
+        self._dependents = {}
+        self._relations = {}
+        self._hosted_on = None
+
+        templates = topology.data.get('node_templates') or {}
+        for name in templates:
+            self._requirements[name] = []
+            self._dependents[name] = []
+        requirements = sorted(
+            (name, get_template_requirements(data))
+            for name, data in iter_templates(templates))
+        for name, template_requirements in requirements:
+            for slot, req in template_requirements:
+                target = req[slot]
+                if not isinstance(target, basestring) or (
+                        target not in templates):
+                    continue
+                edge = Edge(name, slot, target, get_relation_class(
+                    topology.types, slot, req))
+                self._requirements[name].append(edge)
+                self._dependents[target].append(edge)
+                self._relations.setdefault(edge.relation, []).append(edge)
+
+    def __len__(self):
+        return len(self._requirements)
+
+    def __contains__(self, name):
+        return name in self._requirements
+
+    @property
+    def nodes(self):
+        return sorted(self._requirements)
+
+    def requirements(self, name):
+        """Edges from the named template to the templates it requires.
+        """
+        return self._requirements[name]
+
+    def dependents(self, name):
+        """Edges to the named template from the templates requiring it.
+        """
+        return self._dependents[name]
+
+    def targets(self, name):
+        return [e.target for e in self._requirements[name]]
+
+    def sources(self, name):
+        return [e.source for e in self._dependents[name]]
+
+    def edges(self, relation_type=None):
+        """Return edges, optionally only those of a relation type.
+
+        The relation type may be a name or class, edges of derived
+        relation types are included, ie. DependsOn includes HostedOn.
+        """
+        if relation_type is None:
+            edges = []
+            for name in self.nodes:
+                edges.extend(self._requirements[name])
+            return edges
+        if isinstance(relation_type, basestring):
+            relation_type = self.topology.types.get(
+                relation_type, types=('relations',))
+            if relation_type is None:
+                return []
+        edges = []
+        for relation, relation_edges in self._relations.items():
+            if relation is not None and issubclass(relation, relation_type):
+                edges.extend(relation_edges)
+        edges.sort(key=lambda e: (e.source, e.name))
+        return edges
+
+    def all_dependents(self, names):
+        """Return the templates transitively requiring any of the named.
+        """
+        seen = set()
+        stack = [n for n in names if n in self._dependents]
+        while stack:
+            for e in self._dependents[stack.pop()]:
+                if e.source not in seen:
+                    seen.add(e.source)
+                    stack.append(e.source)
+        return seen
+
+    def host(self, name):
+        """Return the template at the root of a template's HostedOn chain.
+        """
+        if self._hosted_on is None:
+            self._hosted_on = dict(
+                (e.source, e.target) for e in self.edges('HostedOn'))
+        seen = set()
+        while name in self._hosted_on and name not in seen:
+            seen.add(name)
+            name = self._hosted_on[name]
+        return name
+
+    def _as_dependencies(self):
+        return dict(
+            (name, self.targets(name)) for name in self._requirements)
+
+    def sort(self):
+        """Return template names ordered with requirements first.
+        """
+        return [n for n, _ in topological_sort(self._as_dependencies())]
+
+    def levels(self):
+        """Return template names grouped in mutually independent levels.
+        """
+        return topological_levels(self._as_dependencies())
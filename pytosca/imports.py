@@ -0,0 +1,274 @@
+# Copyright 2014-2015 Kapil Thangavelu <kapil.foss@gmail.com>
+#
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+"""Resolution and loading of template imports.
+
+Imports are located relative to the directory of the importing file,
+then along the search paths, and loaded recursively. Files are read
+and parsed a level of the import graph at a time on a thread pool, and
+their types loaded dependencies first into a frozen TypeHierarchy
+layer between the normative types and the template's own.
+
+Parsed documents are cached by content hash, in process and on disk,
+and layers are shared by every topology importing the same documents,
+so templates sharing a type library don't re-parse or rebuild it. The
+in process caches keep the MAX_CACHED most recently used entries.
+"""
+
+import collections
+import hashlib
+import logging
+import os
+import Queue
+import sys
+import threading
+
+from pytosca import trace
+from pytosca.cache import ImportCache
+from pytosca.tosca import (
+    ENTITY_TYPE_MAP, TypeHierarchy, topological_sort, yaml_load)
+
+
+log = logging.getLogger("tosca.model")
+
+MAX_CACHED = 64
+
+_parsed = collections.OrderedDict()
+_layers = collections.OrderedDict()
+_lock = threading.Lock()
+
+
+def default_search_paths():
+    """Return the search paths configured via PYTOSCA_IMPORT_PATH.
+    """
+    paths = os.environ.get('PYTOSCA_IMPORT_PATH', '')
+    return [p for p in paths.split(os.pathsep) if p]
+
+
+def import_file(entry):
+    """Return the file name of an import entry.
+
+    Entries may be a file name, a mapping of an import name to a file
+    name, or a mapping with a file key.
+    """
+    if isinstance(entry, dict):
+        if 'file' in entry:
+            entry = entry['file']
+        elif len(entry) == 1:
+            entry = entry.values()[0]
+            if isinstance(entry, dict):
+                entry = entry.get('file')
+    if not isinstance(entry, basestring) or not entry:
+        raise ValueError("Invalid import %r" % (entry,))
+    return entry
+
+
+def clear():
+    """Discard parsed documents and type layers cached in process.
+    """
+    with _lock:
+        _parsed.clear()
+        _layers.clear()
+
+
+def _cache_get(cache, key):
+    with _lock:
+        value = cache.pop(key, None)
+        if value is not None:
+            cache[key] = value
+    return value
+
+
+def _cache_add(cache, key, value):
+    """Add a value unless cached meanwhile, returning the cached value.
+
+    The least recently used entries are discarded past MAX_CACHED.
+    """
+    with _lock:
+        value = cache.setdefault(key, value)
+        while len(cache) > MAX_CACHED:
+            cache.popitem(last=False)
+    return value
+
+
+class Document(object):
+
+    __slots__ = ('path', 'digest', 'data')
+
+    def __init__(self, path, digest, data):
+        self.path = path
+        self.digest = digest
+        self.data = data
+
+    @property
+    def imports(self):
+        return self.data.get('imports') or ()
+
+
+class ImportResolver(object):
+    """Locates, parses and loads the imports of a template.
+
+    `cache` may be True for the default on disk ImportCache, an
+    ImportCache instance, or False to only cache in process.
+    """
+
+    def __init__(self, search_paths=None, cache=True, max_workers=4):
+        if search_paths is None:
+            search_paths = default_search_paths()
+        self.search_paths = list(search_paths)
+        if cache is True:
+            cache = ImportCache.default()
+        self.cache = cache
+        self.max_workers = max_workers
+
+    def locate(self, entry, base_dir):
+        name = import_file(entry)
+        if '://' in name:
+            raise ValueError("Remote import %s is not supported" % name)
+        name = os.path.expanduser(name)
+        if os.path.isabs(name):
+            candidates = [name]
+        else:
+            candidates = [os.path.join(d, name) for d in (
+                [base_dir or os.getcwd()] + self.search_paths)]
+        for path in candidates:
+            if os.path.isfile(path):
+                return os.path.realpath(path)
+        raise ValueError("Import %s not found in %s" % (
+            name, ", ".join(os.path.dirname(c) for c in candidates)))
+
+    def parse(self, path):
+        with open(path, 'rb') as fh:
+            content = fh.read()
+        digest = hashlib.sha1(content).hexdigest()
+        data = _cache_get(_parsed, digest)
+        if data is None and self.cache:
+            data = self.cache.get(content)
+        if data is not None:
+            trace.count('imports.cache_hit')
+        else:
+            trace.count('imports.cache_miss')
+            data = yaml_load(content) or {}
+            if not isinstance(data, dict):
+                raise ValueError("Invalid import %s, not a mapping" % path)
+            if self.cache:
+                self.cache.put(content, data)
+        data = _cache_add(_parsed, digest, data)
+        return Document(path, digest, data)
+
+    def resolve(self, imports, base_dir=None, path=None):
+        """Return the documents imported, recursively, dependencies first.
+
+        `path` is the importing template, if any, so an import of it is
+        detected as a cycle. A file imported more than once, by path or
+        by content, is only returned once.
+        """
+        root = path and os.path.realpath(path) or None
+        documents = {}
+        graph = {root: self._locate_all(imports, base_dir, root)}
+        pending = list(graph[root])
+        while pending:
+            for document in self._parse_all(pending):
+                documents[document.path] = document
+                graph[document.path] = self._locate_all(
+                    document.imports, os.path.dirname(document.path),
+                    document.path)
+            pending = sorted(set(
+                p for deps in graph.values() for p in deps
+                if p not in graph and p != root))
+
+        result = []
+        digests = set()
+        for p, _ in topological_sort(graph):
+            if p == root or p not in documents:
+                continue
+            document = documents[p]
+            if document.digest in digests:
+                log.debug("Skipping import %s, same content as another", p)
+                continue
+            digests.add(document.digest)
+            result.append(document)
+        return result
+
+    def load(self, imports, base_dir=None, path=None, parent=None):
+        """Return a frozen TypeHierarchy of the types imported.
+
+        The hierarchy is layered over `parent`, by default the normative
+        types, and shared by all loads of the same documents.
+        """
+        from pytosca.tosca import Tosca
+        if parent is None:
+            parent = TypeHierarchy.shared(Tosca.schema_path)
+        documents = self.resolve(imports, base_dir, path)
+        key = (parent,) + tuple(d.digest for d in documents)
+        types = _cache_get(_layers, key)
+        if types is not None:
+            return types
+        with trace.span('imports.load', {'count': len(documents)}):
+            types = TypeHierarchy(parent=parent)
+            defined = {}
+            for document in documents:
+                for section in ENTITY_TYPE_MAP.values():
+                    for name in (section and document.data.get(section) or ()):
+                        if name in defined:
+                            raise ValueError(
+                                "Type %s defined by both %s and %s" % (
+                                    name, defined[name], document.path))
+                        defined[name] = document.path
+                types.load_definitions(document.data)
+            types.freeze()
+        return _cache_add(_layers, key, types)
+
+    def _locate_all(self, imports, base_dir, importer):
+        paths = []
+        for entry in imports or ():
+            path = self.locate(entry, base_dir)
+            if path in paths:
+                log.warning("Duplicate import of %s in %s", path,
+                            importer or "template")
+                continue
+            paths.append(path)
+        return paths
+
+    def _parse_all(self, paths):
+        if len(paths) == 1 or self.max_workers < 2:
+            return [self.parse(p) for p in paths]
+        queue = Queue.Queue()
+        for item in enumerate(paths):
+            queue.put(item)
+        results = [None] * len(paths)
+        errors = []
+
+        def worker():
+            while True:
+                try:
+                    i, path = queue.get_nowait()
+                except Queue.Empty:
+                    return
+                try:
+                    results[i] = self.parse(path)
+                except Exception:
+                    errors.append(sys.exc_info())
+
+        threads = [threading.Thread(target=worker)
+                   for i in range(min(len(paths), self.max_workers))]
+        for t in threads:
+            t.daemon = True
+            t.start()
+        for t in threads:
+            t.join()
+        if errors:
+            raise errors[0][0], errors[0][1], errors[0][2]
+        return results
@@ -0,0 +1,548 @@
+# Copyright 2014-2015 Kapil Thangavelu <kapil.foss@gmail.com>
+#
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+"""Stores of the realized node resources of a topology.
+
+An orchestrator creates instances for node templates, and tracks each
+instance's lifecycle state, attributes and relationship bindings, ie.
+the instance bound to each requirement slot. Stores index instances by
+template, type, host and state, so that queries like all started
+instances hosted on a server don't scan every instance::
+
+    >>> store = MemoryInstanceStore()
+    >>> store.add(Instance.for_template(
+    ...     topology.get_template('server'), 'server-0'))
+    >>> store.set_state(['server-0'], 'started')
+    >>> store.find(type='Compute', state='started')
+    [<Instance server-0 template: server state: started>]
+
+Changes made within a transaction are applied together or not at all,
+bulk operations are each a transaction.
+
+MemoryInstanceStore keeps instances in process, SQLiteInstanceStore
+in a sqlite database, in memory or on disk.
+"""
+
+import abc
+import contextlib
+import json
+import sqlite3
+import threading
+
+from pytosca.tosca import short_name
+
+NODE_STATES = (
+    'initial', 'creating', 'created', 'configuring', 'configured',
+    'starting', 'started', 'stopping', 'deleting', 'error')
+
+UPDATE_KEYS = frozenset(('host', 'state', 'attributes', 'bindings'))
+
+
+def _check_state(state):
+    if state not in NODE_STATES:
+        raise ValueError("Unknown instance state %s" % state)
+
+
+def _json_dumps(value):
+    try:
+        return json.dumps(value)
+    except TypeError as e:
+        raise ValueError("Instance value not json serializable: %s" % e)
+
+
+def _json_value(value):
+    """Return a value as json would load it back, bar string types.
+    """
+    if isinstance(value, dict):
+        return dict(
+            (k if isinstance(k, basestring) else _json_key(k),
+             _json_value(v)) for k, v in value.iteritems())
+    if isinstance(value, (list, tuple)):
+        return [_json_value(v) for v in value]
+    if value is None or isinstance(
+            value, (basestring, bool, int, long, float)):
+        return value
+    raise ValueError("Instance value not json serializable: %r" % (value,))
+
+
+def _json_key(key):
+    if key is None or isinstance(key, (bool, int, long, float)):
+        return json.dumps(key)
+    raise ValueError("Instance key not json serializable: %r" % (key,))
+
+
+def _json_copy(instance):
+    """Return the instance with attributes and bindings as loaded from json.
+    """
+    return Instance(
+        instance.id, instance.template, instance.types, instance.host,
+        instance.state, _json_value(instance.attributes),
+        _json_value(instance.bindings))
+
+
+class Instance(object):
+    """A realized node resource of a node template.
+
+    `types` are the names of the template's type and its bases, most
+    derived first. `host` is the id of the instance hosting this one,
+    and `bindings` maps requirement slot names to bound instance ids.
+
+    Instances are values, changes are made through a store, which
+    replaces the stored instance.
+    """
+
+    __slots__ = ('id', 'template', 'types', 'host', 'state', 'attributes',
+                 'bindings')
+
+    def __init__(self, id, template, types, host=None, state='initial',
+                 attributes=None, bindings=None):
+        _check_state(state)
+        if isinstance(types, basestring):
+            types = (types,)
+        self.id = id
+        self.template = template
+        self.types = tuple(types)
+        self.host = host
+        self.state = state
+        self.attributes = attributes or {}
+        self.bindings = bindings or {}
+
+    @classmethod
+    def for_template(cls, node, id, host=None, state='initial',
+                     attributes=None, bindings=None):
+        """Create an instance of a node template or snapshot node.
+        """
+        return cls(id, node.name, node.type_names, host, state,
+                   attributes, bindings)
+
+    @property
+    def type(self):
+        return self.types[0]
+
+    def type_keys(self):
+        """Names the instance's type may be queried by.
+        """
+        keys = set(self.types)
+        keys.update(short_name(t) for t in self.types)
+        return keys
+
+    def replace(self, changes):
+        """Return a copy of the instance with changes applied.
+
+        Attributes and bindings changes are merged into the existing.
+        """
+        unknown = set(changes).difference(UPDATE_KEYS)
+        if unknown:
+            raise ValueError(
+                "Unknown instance fields %s" % ", ".join(sorted(unknown)))
+        attributes = self.attributes
+        if changes.get('attributes'):
+            attributes = dict(attributes)
+            attributes.update(changes['attributes'])
+        bindings = self.bindings
+        if changes.get('bindings'):
+            bindings = dict(bindings)
+            bindings.update(changes['bindings'])
+        return Instance(
+            self.id, self.template, self.types,
+            changes.get('host', self.host), changes.get('state', self.state),
+            attributes, bindings)
+
+    def __eq__(self, other):
+        if not isinstance(other, Instance):
+            return NotImplemented
+        return all(getattr(self, k) == getattr(other, k)
+                   for k in self.__slots__)
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __repr__(self):
+        return "<Instance %s template: %s state: %s>" % (
+            self.id, self.template, self.state)
+
+
+class InstanceStore(object):
+    """Base class of instance stores.
+
+    Backends implement get, find, transaction and the bulk add_many,
+    update_many and remove_many. Query results are ordered by instance
+    id.
+
+    Attributes and bindings are stored as json, and read back as loaded
+    from it: tuples as lists and dict keys as strings, though strings
+    may be read back as str or unicode. Values json can't represent
+    raise ValueError.
+    """
+
+    __metaclass__ = abc.ABCMeta
+
+    def add(self, instance):
+        self.add_many((instance,))
+
+    def update(self, id, **changes):
+        """Change an instance's host, state, attributes or bindings.
+        """
+        self.update_many(((id, changes),))
+
+    def remove(self, id):
+        self.remove_many((id,))
+
+    def set_state(self, ids, state):
+        """Move all the given instances to a state.
+        """
+        _check_state(state)
+        self.update_many((id, {'state': state}) for id in ids)
+
+    @abc.abstractmethod
+    def add_many(self, instances):
+        """Add instances, raising ValueError for an existing id.
+        """
+
+    @abc.abstractmethod
+    def update_many(self, updates):
+        """Apply (id, changes) pairs, raising KeyError for unknown ids.
+        """
+
+    @abc.abstractmethod
+    def remove_many(self, ids):
+        """Remove instances, raising KeyError for unknown ids.
+        """
+
+    @abc.abstractmethod
+    def get(self, id):
+        """Return the instance with an id, None if there's none.
+        """
+
+    @abc.abstractmethod
+    def find(self, template=None, type=None, host=None, state=None):
+        """Return the instances matching all the given criteria.
+
+        A type matches instances of the type or a type derived from
+        it, by qualified or short name.
+        """
+
+    def count(self, template=None, type=None, host=None, state=None):
+        return len(self.find(template, type, host, state))
+
+    @abc.abstractmethod
+    def transaction(self):
+        """Context manager applying changes within it atomically.
+
+        Changes are discarded if the block raises. Nested transactions
+        join the outermost.
+        """
+
+    def __contains__(self, id):
+        return self.get(id) is not None
+
+
+class MemoryInstanceStore(InstanceStore):
+    """Instance store held in process, indexed by sets of ids.
+    """
+
+    def __init__(self):
+        self._instances = {}
+        self._indexes = {
+            'template': {}, 'type': {}, 'host': {}, 'state': {}}
+        self._type_keys = {}
+        self._lock = threading.RLock()
+        self._undo = None
+
+    def _index_keys(self, instance):
+        yield 'template', instance.template
+        yield 'host', instance.host
+        yield 'state', instance.state
+        keys = self._type_keys.get(instance.types)
+        if keys is None:
+            keys = self._type_keys[instance.types] = instance.type_keys()
+        for key in keys:
+            yield 'type', key
+
+    def _put(self, id, instance):
+        current = self._instances.get(id)
+        if self._undo is not None and id not in self._undo:
+            self._undo[id] = current
+        if current is not None:
+            for index, key in self._index_keys(current):
+                ids = self._indexes[index][key]
+                ids.discard(id)
+                if not ids:
+                    del self._indexes[index][key]
+            del self._instances[id]
+        if instance is not None:
+            for index, key in self._index_keys(instance):
+                self._indexes[index].setdefault(key, set()).add(id)
+            self._instances[id] = instance
+
+    @contextlib.contextmanager
+    def transaction(self):
+        with self._lock:
+            if self._undo is not None:
+                yield self
+                return
+            self._undo = {}
+            try:
+                yield self
+            except:
+                undo, self._undo = self._undo, None
+                for id, instance in undo.items():
+                    self._put(id, instance)
+                raise
+            finally:
+                self._undo = None
+
+    def add_many(self, instances):
+        with self.transaction():
+            for instance in instances:
+                if instance.id in self._instances:
+                    raise ValueError("Duplicate instance %s" % instance.id)
+                self._put(instance.id, _json_copy(instance))
+
+    def update_many(self, updates):
+        with self.transaction():
+            for id, changes in updates:
+                instance = self._instances.get(id)
+                if instance is None:
+                    raise KeyError("Unknown instance %s" % id)
+                instance = instance.replace(changes)
+                if changes.get('attributes') or changes.get('bindings'):
+                    instance = _json_copy(instance)
+                self._put(id, instance)
+
+    def remove_many(self, ids):
+        with self.transaction():
+            for id in ids:
+                if id not in self._instances:
+                    raise KeyError("Unknown instance %s" % id)
+                self._put(id, None)
+
+    def get(self, id):
+        return self._instances.get(id)
+
+    def _match(self, template, type, host, state):
+        criteria = (('template', template), ('type', type),
+                    ('host', host), ('state', state))
+        matches = []
+        for index, key in criteria:
+            if key is None:
+                continue
+            ids = self._indexes[index].get(key)
+            if not ids:
+                return set()
+            matches.append(ids)
+        if not matches:
+            return set(self._instances)
+        matches.sort(key=len)
+        return matches[0].intersection(*matches[1:])
+
+    def find(self, template=None, type=None, host=None, state=None):
+        with self._lock:
+            return [self._instances[id] for id in sorted(
+                self._match(template, type, host, state))]
+
+    def count(self, template=None, type=None, host=None, state=None):
+        with self._lock:
+            return len(self._match(template, type, host, state))
+
+    def __len__(self):
+        return len(self._instances)
+
+    def __iter__(self):
+        with self._lock:
+            instances = [self._instances[id] for id in sorted(self._instances)]
+        return iter(instances)
+
+
+SQLITE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS instances (
+    id TEXT PRIMARY KEY,
+    template TEXT NOT NULL,
+    types TEXT NOT NULL,
+    host TEXT,
+    state TEXT NOT NULL,
+    attributes TEXT NOT NULL,
+    bindings TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS type_keys (
+    type TEXT NOT NULL,
+    types TEXT NOT NULL,
+    PRIMARY KEY (type, types));
+CREATE INDEX IF NOT EXISTS instances_types ON instances (types);
+CREATE INDEX IF NOT EXISTS instances_template ON instances (template, state);
+CREATE INDEX IF NOT EXISTS instances_host ON instances (host, state);
+CREATE INDEX IF NOT EXISTS instances_state ON instances (state);
+"""
+
+INSTANCE_COLUMNS = (
+    "id, template, types, host, state, attributes, bindings")
+
+
+class SQLiteInstanceStore(InstanceStore):
+    """Instance store in a sqlite database, by default in memory.
+
+    Types, attributes and bindings are stored as json. Instances of a
+    template share their types, so type queries go through a table of
+    the names each distinct types value may be queried by. The store
+    may be shared between threads, not processes.
+    """
+
+    def __init__(self, path=':memory:'):
+        self.path = path
+        self._conn = sqlite3.connect(
+            path, isolation_level=None, check_same_thread=False)
+        self._conn.executescript(SQLITE_SCHEMA)
+        self._lock = threading.RLock()
+        self._depth = 0
+
+    def close(self):
+        self._conn.close()
+
+    @contextlib.contextmanager
+    def transaction(self):
+        with self._lock:
+            if self._depth:
+                self._depth += 1
+                try:
+                    yield self
+                finally:
+                    self._depth -= 1
+                return
+            self._conn.execute("BEGIN")
+            self._depth = 1
+            try:
+                yield self
+            except:
+                self._conn.execute("ROLLBACK")
+                raise
+            else:
+                self._conn.execute("COMMIT")
+            finally:
+                self._depth = 0
+
+    def _row(self, instance):
+        return (instance.id, instance.template, json.dumps(instance.types),
+                instance.host, instance.state,
+                _json_dumps(instance.attributes),
+                _json_dumps(instance.bindings))
+
+    def _instance(self, row):
+        id, template, types, host, state, attributes, bindings = row
+        return Instance(id, template, json.loads(types), host, state,
+                        json.loads(attributes), json.loads(bindings))
+
+    def add_many(self, instances):
+        instances = list(instances)
+        type_keys = {}
+        for instance in instances:
+            if instance.types not in type_keys:
+                type_keys[instance.types] = instance.type_keys()
+        with self.transaction():
+            try:
+                self._conn.executemany(
+                    "INSERT INTO instances (%s) VALUES (?, ?, ?, ?, ?, ?, ?)"
+                    % INSTANCE_COLUMNS, [self._row(i) for i in instances])
+            except sqlite3.IntegrityError:
+                raise ValueError("Duplicate instance %s" % (
+                    self._duplicate(instances)))
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO type_keys (type, types) VALUES (?, ?)",
+                [(key, json.dumps(types))
+                 for types, keys in type_keys.items() for key in keys])
+
+    def _duplicate(self, instances):
+        seen = set()
+        for instance in instances:
+            if instance.id in seen:
+                return instance.id
+            seen.add(instance.id)
+        for instance in instances:
+            if self._conn.execute(
+                    "SELECT 1 FROM instances WHERE id = ?",
+                    (instance.id,)).fetchone():
+                return instance.id
+
+    def update_many(self, updates):
+        with self.transaction():
+            for id, changes in updates:
+                instance = self.get(id)
+                if instance is None:
+                    raise KeyError("Unknown instance %s" % id)
+                instance = instance.replace(changes)
+                self._conn.execute(
+                    "UPDATE instances SET host = ?, state = ?, "
+                    "attributes = ?, bindings = ? WHERE id = ?",
+                    self._row(instance)[3:] + (id,))
+
+    def set_state(self, ids, state):
+        _check_state(state)
+        with self.transaction():
+            for id in ids:
+                cursor = self._conn.execute(
+                    "UPDATE instances SET state = ? WHERE id = ?",
+                    (state, id))
+                if not cursor.rowcount:
+                    raise KeyError("Unknown instance %s" % id)
+
+    def remove_many(self, ids):
+        with self.transaction():
+            for id in ids:
+                cursor = self._conn.execute(
+                    "DELETE FROM instances WHERE id = ?", (id,))
+                if not cursor.rowcount:
+                    raise KeyError("Unknown instance %s" % id)
+
+    def get(self, id):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT %s FROM instances WHERE id = ?" % INSTANCE_COLUMNS,
+                (id,)).fetchone()
+        return row and self._instance(row) or None
+
+    def _where(self, template, type, host, state):
+        clauses = []
+        params = []
+        for column, value in (
+                ('template', template), ('host', host), ('state', state)):
+            if value is not None:
+                clauses.append("%s = ?" % column)
+                params.append(value)
+        if type is not None:
+            clauses.append(
+                "types IN (SELECT types FROM type_keys WHERE type = ?)")
+            params.append(type)
+        if not clauses:
+            return "", params
+        return " WHERE " + " AND ".join(clauses), params
+
+    def find(self, template=None, type=None, host=None, state=None):
+        where, params = self._where(template, type, host, state)
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT %s FROM instances%s ORDER BY id" % (
+                    INSTANCE_COLUMNS, where), params).fetchall()
+        return [self._instance(row) for row in rows]
+
+    def count(self, template=None, type=None, host=None, state=None):
+        where, params = self._where(template, type, host, state)
+        with self._lock:
+            return self._conn.execute(
+                "SELECT COUNT(*) FROM instances%s" % where,
+                params).fetchone()[0]
+
+    def __len__(self):
+        return self.count()
+
+    def __iter__(self):
+        return iter(self.find())
@@ -0,0 +1,207 @@
+# Copyright 2014-2015 Kapil Thangavelu <kapil.foss@gmail.com>
+#
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+"""Lazy loading of large templates.
+
+The template is indexed with a single pass of yaml parser events, which
+records where each node template's definition lies in the document
+without constructing any of them. The other sections of the template
+are loaded as usual, while node templates are parsed from their slice
+of the document on first access.
+"""
+
+import collections
+
+from pytosca.tosca import yaml_load, yaml_loader
+
+
+class LazyTemplates(collections.MutableMapping):
+    """Node templates parsed from their source on first access.
+
+    Parsed templates are retained, so repeated access returns the same
+    data. `peek` parses a template without retaining it.
+    """
+
+    def __init__(self, content, spans):
+        self._content = content
+        self._spans = spans
+        self._loaded = {}
+
+    def _parse(self, name):
+        start, end = self._spans[name]
+        # Indent the slice as in the source, so block mappings parse.
+        return yaml_load(
+            " " * start.column + self._content[start.index:end.index])
+
+    def peek(self, name):
+        if name in self._loaded:
+            return self._loaded[name]
+        return self._parse(name)
+
+    def __getitem__(self, name):
+        try:
+            return self._loaded[name]
+        except KeyError:
+            if name not in self._spans:
+                raise
+        value = self._loaded[name] = self._parse(name)
+        return value
+
+    def __setitem__(self, name, value):
+        self._loaded[name] = value
+
+    def __delitem__(self, name):
+        if name not in self:
+            raise KeyError(name)
+        self._loaded.pop(name, None)
+        self._spans.pop(name, None)
+
+    def __contains__(self, name):
+        return name in self._loaded or name in self._spans
+
+    def __iter__(self):
+        for name in self._spans:
+            yield name
+        for name in self._loaded:
+            if name not in self._spans:
+                yield name
+
+    def __len__(self):
+        return len(set(self._spans) | set(self._loaded))
+
+    def __repr__(self):
+        return "<LazyTemplates templates:%d loaded:%d>" % (
+            len(self), len(self._loaded))
+
+
+def iter_templates(templates):
+    """Yield (name, data) for node templates, without retaining them.
+    """
+    peek = getattr(templates, 'peek', templates.__getitem__)
+    for name in templates:
+        yield name, peek(name)
+
+
+class _Frame(object):
+
+    __slots__ = ('mapping', 'start', 'expect_key', 'key')
+
+    def __init__(self, mapping, start):
+        self.mapping = mapping
+        self.start = start
+        self.expect_key = True
+        self.key = None
+
+
+class _Unindexable(Exception):
+    pass
+
+
+def index(content):
+    """Locate the node_templates section and each template in content.
+
+    Returns the section's (start, end) marks and a mapping of template
+    name to marks, or None when the document can't be loaded piecemeal
+    as it would be loaded whole: it uses anchors, repeats a top level
+    key or has a template name that isn't a scalar.
+    """
+    import yaml
+    loader = yaml_loader()('')
+    stack = []
+    section = None
+    spans = {}
+    top_keys = set()
+
+    def key(scalar):
+        """Return a template name as a full load constructs it."""
+        if scalar is None:
+            raise _Unindexable()
+        tag = scalar.tag
+        if tag is None or tag == '!':
+            tag = loader.resolve(
+                yaml.ScalarNode, scalar.value, scalar.implicit)
+        if tag == u'tag:yaml.org,2002:str':
+            return _key(scalar.value)
+        return loader.construct_object(
+            yaml.ScalarNode(tag, scalar.value, style=scalar.style))
+
+    def node(start, end, scalar=None):
+        if not stack or not stack[-1].mapping:
+            return
+        frame = stack[-1]
+        if frame.expect_key:
+            frame.key = scalar
+            frame.expect_key = False
+            if len(stack) == 1:
+                # A full load keeps a repeated key's last value only.
+                value = scalar and scalar.value
+                if value in top_keys:
+                    raise _Unindexable()
+                top_keys.add(value)
+            return
+        frame.expect_key = True
+        if not all(f.mapping for f in stack):
+            return
+        path = tuple(f.key and f.key.value for f in stack)
+        if path == ('node_templates',):
+            return (start, end)
+        elif len(path) == 2 and path[0] == 'node_templates':
+            spans[key(stack[1].key)] = (start, end)
+
+    try:
+        for event in yaml.parse(content, Loader=yaml_loader()):
+            if getattr(event, 'anchor', None) or isinstance(
+                    event, yaml.AliasEvent):
+                return None
+            if isinstance(event, (yaml.MappingStartEvent,
+                                  yaml.SequenceStartEvent)):
+                stack.append(_Frame(
+                    isinstance(event, yaml.MappingStartEvent),
+                    event.start_mark))
+            elif isinstance(event, (yaml.MappingEndEvent,
+                                    yaml.SequenceEndEvent)):
+                frame = stack.pop()
+                section = node(frame.start, event.end_mark) or section
+            elif isinstance(event, yaml.ScalarEvent):
+                section = node(
+                    event.start_mark, event.end_mark, event) or section
+    except _Unindexable:
+        return None
+    if section is None:
+        return None
+    return section, spans
+
+
+def _key(value):
+    try:
+        return str(value)
+    except UnicodeEncodeError:
+        return value
+
+
+def lazy_load(content):
+    """Load template content, deferring node templates until accessed.
+
+    Falls back to loading the whole template when it can't be indexed.
+    """
+    if isinstance(content, str):
+        content = content.decode('utf8')
+    located = index(content)
+    if located is None:
+        return yaml_load(content)
+    (start, end), spans = located
+    data = yaml_load(content[:start.index] + "{}\n" + content[end.index:])
+    data['node_templates'] = LazyTemplates(content, spans)
+    return data
@@ -0,0 +1,150 @@
+# Copyright 2014-2015 Kapil Thangavelu <kapil.foss@gmail.com>
+#
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+"""Partition a topology into independent shards for multiple workers.
+
+Templates are first grouped into units that must stay together, either
+the connected components of the requirement graph or, for a finer split,
+the HostedOn subtrees of each host. Units are then balanced across the
+requested number of shards by weight, a node count unless a cost
+function is given. Each shard carries a trimmed copy of the template
+data, so a worker process can load it without the original file.
+"""
+
+import copy
+import heapq
+
+from pytosca.tosca import Tosca
+
+# Template sections carried over to every shard.
+SHARED_SECTIONS = (
+    'tosca_definitions_version', 'description', 'imports', 'inputs',
+    'node_types', 'capability_types', 'relation_types',
+    'relationship_types', 'artifact_types')
+
+
+class Shard(object):
+    """A self contained subset of a topology's node templates.
+
+    `external` lists the requirements of the shard's templates on
+    templates in other shards, as (source, slot, target, shard index).
+    """
+
+    def __init__(self, index, nodes, data, external, weight, path=None,
+                 search_paths=None):
+        self.index = index
+        self.nodes = nodes
+        self.data = data
+        self.external = external
+        self.weight = weight
+        self.path = path
+        self.search_paths = search_paths
+
+    def load(self):
+        return Tosca(self.data, self.path, self.search_paths)
+
+    def __repr__(self):
+        return "<Shard %d nodes:%d weight:%s>" % (
+            self.index, len(self.nodes), self.weight)
+
+
+def components(graph):
+    """Return the connected components of the requirement graph.
+    """
+    parent = dict((n, n) for n in graph.nodes)
+
+    def find(n):
+        while parent[n] != n:
+            parent[n] = parent[parent[n]]
+            n = parent[n]
+        return n
+
+    for e in graph.edges():
+        a, b = find(e.source), find(e.target)
+        if a != b:
+            parent[max(a, b)] = min(a, b)
+    groups = {}
+    for n in graph.nodes:
+        groups.setdefault(find(n), []).append(n)
+    return sorted(groups.values())
+
+
+def host_subtrees(graph):
+    """Return the templates grouped by the host they are hosted on.
+    """
+    groups = {}
+    for n in graph.nodes:
+        groups.setdefault(graph.host(n), []).append(n)
+    return sorted(groups.values())
+
+
+def operation_cost(topology):
+    """Return a cost function weighing templates by their operations.
+    """
+    def cost(name):
+        node = topology.get_template(name)
+        return 1 + len([op for op in node.interfaces if op.implementation])
+    return cost
+
+
+def partition(topology, shards, by='component', cost=None):
+    """Partition a topology's node templates into at most `shards` shards.
+
+    `by` is either 'component' or 'host', and `cost` an optional function
+    returning the weight of a template by name.
+    """
+    graph = topology.graph
+    if by == 'component':
+        units = components(graph)
+    elif by == 'host':
+        units = host_subtrees(graph)
+    else:
+        raise ValueError("Unknown partitioning %s" % by)
+    if cost is None:
+        cost = lambda name: 1
+
+    # Largest units first, each onto the currently lightest shard.
+    weighted = sorted(
+        [(sum(map(cost, unit)), unit) for unit in units],
+        key=lambda u: (-u[0], u[1]))
+    heap = [(0, i, []) for i in range(min(shards, len(units)))]
+    for weight, unit in weighted:
+        total, i, nodes = heapq.heappop(heap)
+        nodes.extend(unit)
+        heapq.heappush(heap, (total + weight, i, nodes))
+
+    assigned = {}
+    for _, i, nodes in heap:
+        for n in nodes:
+            assigned[n] = i
+
+    result = []
+    templates = topology.data.get('node_templates') or {}
+    for total, i, nodes in sorted(heap, key=lambda s: s[1]):
+        nodes.sort()
+        data = dict([(k, copy.deepcopy(topology.data[k]))
+                     for k in SHARED_SECTIONS if k in topology.data])
+        data['node_templates'] = dict(
+            [(n, copy.deepcopy(templates[n])) for n in nodes])
+        external = []
+        for n in nodes:
+            for e in graph.requirements(n):
+                if assigned[e.target] != i:
+                    external.append(
+                        (e.source, e.name, e.target, assigned[e.target]))
+        result.append(Shard(
+            i, nodes, data, external, total, topology.path,
+            topology.search_paths))
+    return result
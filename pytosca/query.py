@@ -0,0 +1,167 @@
+# Copyright 2014-2015 Kapil Thangavelu <kapil.foss@gmail.com>
+#
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+"""Indexed queries over a topology's node templates.
+
+Indexes are built from the template data and node types on first use,
+without instantiating node templates, and are discarded along with
+other derived state when the topology is invalidated::
+
+    >>> topology.find_templates(type='tosca.nodes.Database')
+    [<Database name: mysql_database>]
+    >>> topology.find_templates(capability='database_endpoint')
+    [<Database name: mysql_database>]
+    >>> topology.find_templates(properties={'os_type': 'Linux'})
+    [<Compute name: server>]
+"""
+
+from pytosca.lazy import iter_templates
+
+
+def _tosca_classes(cls):
+    return [c for c in cls.__mro__ if 'tosca_name' in c.__dict__]
+
+
+def _value_key(value):
+    """Return a hashable key for a literal value, None for a function.
+    """
+    if isinstance(value, list):
+        keys = [_value_key(v) for v in value]
+        if None in keys:
+            return None
+        return ('list',) + tuple(keys)
+    if isinstance(value, dict):
+        return None
+    # Keep booleans apart from the integers they compare equal to.
+    return ('value', isinstance(value, bool), value)
+
+
+class TemplateIndex(object):
+    """Node template names indexed by type, capability and property.
+
+    Types match templates of the type or a type derived from it, and
+    likewise for capability types. Property values are matched against
+    literal template values, or the type's default where a template
+    doesn't set one, values from functions like get_input are not
+    indexed.
+    """
+
+    def __init__(self, topology):
+        self.topology = topology
+        self._classes = None
+        self._by_type = None
+        self._by_capability = None
+        self._by_capability_type = None
+        self._by_property = None
+
+    def _templates(self):
+        return self.topology.data.get('node_templates') or {}
+
+    def _template_classes(self):
+        if self._classes is None:
+            self._classes = dict(
+                (name, self.topology.template_class(name, data))
+                for name, data in iter_templates(self._templates()))
+        return self._classes
+
+    def _type_index(self):
+        if self._by_type is None:
+            by_type = {}
+            for name, cls in self._template_classes().items():
+                for c in _tosca_classes(cls):
+                    by_type.setdefault(c, set()).add(name)
+            self._by_type = by_type
+        return self._by_type
+
+    def _capability_indexes(self):
+        if self._by_capability is None:
+            by_name = {}
+            by_type = {}
+            types = self.topology.types
+            for name, cls in self._template_classes().items():
+                for cname, info in (cls._capabilities or {}).items():
+                    by_name.setdefault(cname, set()).add(name)
+                    if isinstance(info, dict):
+                        info = info.get('type')
+                    ccls = info and types.get(info, types=('capabilities',))
+                    for c in ccls and _tosca_classes(ccls) or ():
+                        by_type.setdefault(c, set()).add(name)
+            self._by_capability = by_name
+            self._by_capability_type = by_type
+        return self._by_capability, self._by_capability_type
+
+    def _property_index(self):
+        if self._by_property is None:
+            by_property = {}
+            classes = self._template_classes()
+            for name, data in iter_templates(self._templates()):
+                schemas = classes[name]._properties
+                if not isinstance(schemas, dict):
+                    continue
+                values = data.get('properties') or {}
+                for pname, schema in schemas.items():
+                    value = values.get(pname)
+                    if value is None and isinstance(schema, dict):
+                        value = schema.get('default')
+                    key = _value_key(value)
+                    if key is not None:
+                        by_property.setdefault(pname, {}).setdefault(
+                            key, set()).add(name)
+            self._by_property = by_property
+        return self._by_property
+
+    def _resolve_type(self, type, kind):
+        if not isinstance(type, basestring):
+            return type
+        cls = self.topology.types.get(type, types=(kind,))
+        if cls is None:
+            raise ValueError("Unknown %s type %s" % (kind, type))
+        return cls
+
+    def names(self, type=None, capability=None, capability_type=None,
+              properties=None):
+        """Return the sorted names of the templates matching all criteria.
+        """
+        matches = []
+        if type is not None:
+            matches.append(self._type_index().get(
+                self._resolve_type(type, 'nodes'), ()))
+        if capability is not None:
+            matches.append(self._capability_indexes()[0].get(capability, ()))
+        if capability_type is not None:
+            matches.append(self._capability_indexes()[1].get(
+                self._resolve_type(capability_type, 'capabilities'), ()))
+        for pname, value in sorted((properties or {}).items()):
+            key = _value_key(value)
+            if key is None:
+                raise ValueError(
+                    "Property %s queried by an unindexed value %r" % (
+                        pname, value))
+            matches.append(
+                self._property_index().get(pname, {}).get(key, ()))
+        if not matches:
+            return sorted(self._templates())
+        matches.sort(key=len)
+        return sorted(set(matches[0]).intersection(*matches[1:]))
+
+    def find(self, type=None, capability=None, capability_type=None,
+             properties=None):
+        """Return the templates matching all the given criteria.
+
+        `type` and `capability_type` may be given by name or class,
+        `properties` maps property names to literal values.
+        """
+        return [self.topology.get_template(name) for name in self.names(
+            type, capability, capability_type, properties)]
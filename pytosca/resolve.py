@@ -0,0 +1,176 @@
+# Copyright 2014-2015 Kapil Thangavelu <kapil.foss@gmail.com>
+#
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import collections
+import copy
+
+from pytosca.tosca import topological_sort
+
+
+class ResolvedTopology(collections.Mapping):
+    """Read only snapshot of the resolved values of a topology.
+
+    Keys are paths into the template data, ie.
+
+      ('node_templates', 'server', 'properties', 'num_cpus')
+      ('node_templates', 'db', 'capabilities', 'database_endpoint', 'port')
+      ('node_templates', 'wordpress', 'interfaces', 'configure', 'db_user')
+      ('outputs', 'website_url')
+
+    List and map values are copied on access, so callers modifying
+    them don't change the snapshot.
+    """
+
+    def __init__(self, values):
+        self._values = dict(values)
+
+    def __getitem__(self, key):
+        value = self._values[key]
+        if isinstance(value, (dict, list)):
+            return copy.deepcopy(value)
+        return value
+
+    def __iter__(self):
+        return iter(self._values)
+
+    def __len__(self):
+        return len(self._values)
+
+    def __repr__(self):
+        return "<ResolvedTopology values:%d>" % len(self._values)
+
+    def as_dict(self):
+        """Return the values as a nested dict mirroring the template.
+        """
+        result = {}
+        for key in sorted(self._values):
+            container = result
+            for k in key[:-1]:
+                container = container.setdefault(k, {})
+            container[key[-1]] = copy.deepcopy(self._values[key])
+        return result
+
+
+class TopologyResolver(object):
+    """Resolve every value in a topology in a single pass.
+
+    All property, capability property, operation input and output
+    values are collected, and the references between them through
+    get_property and get_ref_property form a dependency graph. Values
+    are then evaluated once each in dependency order, a reference cycle
+    raises CyclicDependencyError naming the values involved.
+
+    Unlike lazy resolution, get_ref_property is resolved against the
+    owning node template's requirements for capability properties and
+    operation inputs as well.
+    """
+
+    def __init__(self, topology):
+        self.topology = topology
+        self.graph = topology.graph
+        self.sites = {}
+        self.references = {}
+
+    def resolve(self):
+        self.collect()
+        dependencies = {}
+        for key, (owner, raw) in self.sites.items():
+            ref = self.references[key] = self.reference(key, owner, raw)
+            dependencies[key] = ref in self.sites and [ref] or []
+        values = {}
+        for key, _ in topological_sort(dependencies):
+            values[key] = self.evaluate(key, values)
+        return ResolvedTopology(values)
+
+    def collect(self):
+        for node in self.topology.nodetemplates:
+            prefix = ('node_templates', node.name)
+            self._collect(node.name, prefix + ('properties',), node)
+            for c in node.capabilities:
+                if c is not None:
+                    self._collect(
+                        node.name, prefix + ('capabilities', c.name), c)
+            for op in node.interfaces:
+                self._collect(
+                    node.name, prefix + ('interfaces', op.name), op)
+        for name, attrs in (self.topology.data.get('outputs') or {}).items():
+            self.sites[('outputs', name)] = (None, attrs.get('value'))
+
+    def _collect(self, owner, prefix, container):
+        for p in container.properties:
+            self.sites[prefix + (p.name,)] = (owner, p._value)
+
+    def reference(self, key, owner, raw):
+        """Return the input name or value key a value refers to.
+        """
+        if not isinstance(raw, dict):
+            return None
+        if 'get_input' in raw:
+            name = raw['get_input']
+            if self.topology.get_input(name) is None:
+                raise ValueError(
+                    "Unknown input: %s in %s" % (name, _path(key)))
+            return name
+        elif 'get_ref_property' in raw:
+            return self._ref_property(key, owner, *raw['get_ref_property'])
+        elif 'get_property' in raw:
+            entity_name, property_name = raw['get_property']
+            ref = ('node_templates', entity_name, 'properties', property_name)
+            if ref not in self.sites:
+                raise ValueError(
+                    "Unknown entity property: %s, %s in %s" % (
+                        entity_name, property_name, _path(key)))
+            return ref
+        return None
+
+    def _ref_property(self, key, owner, slot_name, capability,
+                      property_name=None):
+        if property_name is None:
+            property_name = capability
+            capability = None
+        if owner is None:
+            raise ValueError(
+                "Ref property outside of a node template in %s" % (
+                    _path(key)))
+        for edge in self.graph.requirements(owner):
+            if edge.name != slot_name:
+                continue
+            if capability:
+                ref = ('node_templates', edge.target, 'capabilities',
+                       capability, property_name)
+            else:
+                ref = ('node_templates', edge.target, 'properties',
+                       property_name)
+            if ref not in self.sites:
+                raise ValueError(
+                    "Unknown property: %s referenced via slot: %s from %s" % (
+                        _path(ref[2:]), slot_name, _path(key)))
+            return ref
+        raise ValueError(
+            "Unknown requirement slot: %s from %s" % (slot_name, _path(key)))
+
+    def evaluate(self, key, values):
+        raw = self.sites[key][1]
+        ref = self.references[key]
+        if ref is None:
+            return copy.deepcopy(raw)
+        elif 'get_input' in raw:
+            return copy.deepcopy(self.topology.get_input(ref).value)
+        return values[ref]
+
+
+def _path(key):
+    return ".".join(key)
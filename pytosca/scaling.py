@@ -0,0 +1,276 @@
+# Copyright 2014-2015 Kapil Thangavelu <kapil.foss@gmail.com>
+#
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+"""Flyweight replicas of scaled node templates.
+
+A node template deployed as many identical replicas is scaled by its
+ReplicaSet, which holds a replica count and, for the replicas that
+have them, their overrides: an instance id, property values and
+attributes. Everything else, the template data, types, requirements
+and resolved property values, is shared with the node template, so
+scaling out or in only changes the count::
+
+    >>> webserver = topology.get_template('webserver')
+    >>> webserver.scale(100)
+    >>> replica = webserver.replicas[42]
+    >>> replica.id
+    'webserver-42'
+    >>> replica.set_attribute('ip_address', '10.0.0.42')
+
+Replicas are created on access, as views over the set.
+
+A template may bound its replica count with the properties of a
+`scalable` capability, scaling outside them raises ValueError::
+
+    webserver:
+      type: tosca.nodes.WebServer
+      capabilities:
+        scalable:
+          properties: {min_instances: 1, max_instances: 10}
+
+`default_instances` sets the initial count, by default the minimum.
+"""
+
+import collections
+
+SCALABLE = 'scalable'
+
+
+class ValuesView(collections.Mapping):
+    """A read only view of property values.
+    """
+
+    __slots__ = ('_values',)
+
+    def __init__(self, values):
+        self._values = values
+
+    def __getitem__(self, name):
+        return self._values[name]
+
+    def __iter__(self):
+        return iter(self._values)
+
+    def __len__(self):
+        return len(self._values)
+
+    def __repr__(self):
+        return "<ValuesView %r>" % (self._values,)
+
+
+class Replica(object):
+    """A replica of a node template, reading through to the template.
+    """
+
+    __slots__ = ('replicas', 'index')
+
+    def __init__(self, replicas, index):
+        self.replicas = replicas
+        self.index = index
+
+    @property
+    def node(self):
+        return self.replicas.node
+
+    @property
+    def name(self):
+        return self.replicas.name
+
+    @property
+    def tosca_name(self):
+        return self.node.tosca_name
+
+    @property
+    def type_names(self):
+        return self.node.type_names
+
+    @property
+    def overrides(self):
+        return self.replicas._overrides.get(self.index) or {}
+
+    @property
+    def id(self):
+        return self.overrides.get('id') or "%s-%d" % (self.name, self.index)
+
+    @property
+    def values(self):
+        """Property values, shared by replicas that don't override them.
+
+        Returns a read only mapping.
+        """
+        properties = self.overrides.get('properties')
+        if not properties:
+            return self.replicas.values
+        values = dict(
+            (name, self.replicas.get_value(name))
+            for name in self.replicas.property_names
+            if name not in properties)
+        values.update(properties)
+        return ValuesView(values)
+
+    def get_value(self, name):
+        properties = self.overrides.get('properties') or {}
+        if name in properties:
+            return properties[name]
+        return self.replicas.get_value(name)
+
+    @property
+    def attributes(self):
+        return self.overrides.get('attributes') or {}
+
+    def set_id(self, id):
+        self.replicas._override(self.index)['id'] = id
+
+    def set_value(self, name, value):
+        self.replicas._override(self.index).setdefault(
+            'properties', {})[name] = value
+
+    def set_attribute(self, name, value):
+        self.replicas._override(self.index).setdefault(
+            'attributes', {})[name] = value
+
+    @property
+    def requirements(self):
+        return self.node.requirements
+
+    @property
+    def capabilities(self):
+        return self.node.capabilities
+
+    @property
+    def interfaces(self):
+        return self.node.interfaces
+
+    def __repr__(self):
+        return "<Replica %s of: %s>" % (self.id, self.name)
+
+
+class ReplicaSet(object):
+    """The replicas of a node template in a topology.
+
+    Only replica overrides are stored, sparsely by index. Property
+    values are resolved once per template and shared by all replicas,
+    they are resolved again when the topology's node template is
+    replaced, ie. on binding inputs or invalidate(). Each property is
+    resolved on its own, on first access, so one that can't be
+    resolved doesn't keep the others from being read.
+    """
+
+    def __init__(self, topology, name, count=None):
+        self.topology = topology
+        self.name = name
+        self.count = 0
+        self._overrides = {}
+        self._node = None
+        self._values = None
+        self._view = None
+        if count is None:
+            count = self._scalable().get('default_instances')
+        if count is None:
+            count = max(self.bounds[0], 1)
+        self.scale(count)
+
+    @property
+    def node(self):
+        return self.topology.get_template(self.name)
+
+    def _scalable(self):
+        capabilities = self.node.data.get('capabilities') or {}
+        return (capabilities.get(SCALABLE) or {}).get('properties') or {}
+
+    @property
+    def bounds(self):
+        """The (minimum, maximum) replica count, maximum None if unbounded.
+        """
+        scalable = self._scalable()
+        maximum = scalable.get('max_instances')
+        if maximum == 'unbounded':
+            maximum = None
+        return scalable.get('min_instances') or 0, maximum
+
+    def _node_values(self):
+        node = self.node
+        if self._node is not node:
+            self._values = {}
+            self._view = ValuesView(self._values)
+            self._node = node
+        return self._values
+
+    @property
+    def property_names(self):
+        return [p.name for p in self.node.properties]
+
+    def get_value(self, name):
+        """Return the resolved value of a property, None if undefined.
+        """
+        values = self._node_values()
+        if name not in values:
+            p = self._node.get_property(name)
+            if p is None:
+                return None
+            values[name] = p.value
+        return values[name]
+
+    @property
+    def values(self):
+        """Resolved property values, as a read only mapping.
+        """
+        self._node_values()
+        for name in self.property_names:
+            self.get_value(name)
+        return self._view
+
+    def _override(self, index):
+        return self._overrides.setdefault(index, {})
+
+    def scale(self, count):
+        """Set the number of replicas.
+
+        Scaling in discards the overrides of the removed replicas.
+        """
+        minimum, maximum = self.bounds
+        if count < max(minimum, 0) or (
+                maximum is not None and count > maximum):
+            raise ValueError(
+                "Invalid replica count %s for %s, expected %s to %s" % (
+                    count, self.name, minimum,
+                    'unbounded' if maximum is None else maximum))
+        if count < self.count:
+            for index in [i for i in self._overrides if i >= count]:
+                del self._overrides[index]
+        self.count = count
+
+    def scale_out(self, count=1):
+        self.scale(self.count + count)
+
+    def scale_in(self, count=1):
+        self.scale(max(self.count - count, 0))
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += self.count
+        if not 0 <= index < self.count:
+            raise IndexError("Replica index out of range")
+        return Replica(self, index)
+
+    def __iter__(self):
+        for index in xrange(self.count):
+            yield Replica(self, index)
+
+    def __repr__(self):
+        return "<ReplicaSet %s replicas:%d>" % (self.name, self.count)
@@ -0,0 +1,353 @@
+# Copyright 2014-2015 Kapil Thangavelu <kapil.foss@gmail.com>
+#
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+"""Compiled topology snapshots for fast reload.
+
+A snapshot reduces a loaded topology, with its inputs bound, to plain
+data: resolved property, capability property, operation input and
+output values, requirement targets and relation types, operation
+implementations and the names of the types used. Reloading it is a
+single json parse, without parsing the template's yaml, building
+types or resolving values, and gives a read only topology answering
+the same queries as Tosca::
+
+    >>> Snapshot.compile(topology).dump('topology.snapshot')
+    >>> snapshot = Snapshot.load('topology.snapshot')
+    >>> snapshot.get_template('server').get_property('num_cpus').value
+    2
+
+The file is a json header line, holding the snapshot format and a
+sha1 checksum of the remainder, followed by the json topology.
+Values without a json form, ie. dates, are stored as strings.
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+
+from pytosca import __version__, trace
+from pytosca.tosca import Input
+
+# Bumped whenever the layout of snapshot data changes.
+SNAPSHOT_FORMAT = 1
+
+METADATA_KEYS = (
+    'tosca_definitions_version', 'template_name', 'template_author',
+    'template_version', 'description')
+
+
+class SnapshotError(ValueError):
+    """A snapshot is unreadable, corrupt or of another format."""
+
+
+def _compile_node(node, values):
+    capabilities = {}
+    capability_values = values.get('capabilities') or {}
+    for c in node.capabilities:
+        if c is None:
+            continue
+        capabilities[c.name] = {
+            'type': c.tosca_name,
+            'properties': capability_values.get(c.name) or {}}
+    templates = node.topology.data.get('node_templates') or {}
+    requirements = []
+    for r in node.requirements:
+        target = r.data.get(r.name)
+        if not isinstance(target, basestring) or target not in templates:
+            target = None
+        requirements.append([r.name, target, r.tosca_name])
+    operation_values = values.get('interfaces') or {}
+    interfaces = []
+    for op in node.interfaces:
+        interfaces.append(
+            [op.name, op.implementation, operation_values.get(op.name) or {}])
+    return {
+        'types': node.type_names,
+        'properties': values.get('properties') or {},
+        'capabilities': capabilities,
+        'requirements': requirements,
+        'interfaces': interfaces}
+
+
+class SnapshotValue(object):
+    """A resolved property, operation input or output value."""
+
+    __slots__ = ('name', 'value', 'description')
+
+    def __init__(self, name, value, description=None):
+        self.name = name
+        self.value = value
+        self.description = description
+
+    def __repr__(self):
+        return "<%s name: %s>" % (self.__class__.__name__, self.name)
+
+
+class SnapshotEntity(object):
+
+    __slots__ = ('name', 'data', 'snapshot')
+    _property_key = 'properties'
+
+    def __init__(self, name, data, snapshot):
+        self.name = name
+        self.data = data
+        self.snapshot = snapshot
+
+    @property
+    def properties(self):
+        return [SnapshotValue(k, v) for k, v in sorted(
+            self.data[self._property_key].items())]
+
+    def get_property(self, name):
+        values = self.data[self._property_key]
+        if name not in values:
+            return None
+        return SnapshotValue(name, values[name])
+
+    def __repr__(self):
+        return "<%s name: %s>" % (self.__class__.__name__, self.name)
+
+
+class SnapshotCapability(SnapshotEntity):
+
+    __slots__ = ()
+
+    @property
+    def tosca_name(self):
+        return self.data['type']
+
+
+class SnapshotOperation(SnapshotEntity):
+
+    __slots__ = ('implementation',)
+    _property_key = 'input'
+
+    def __init__(self, name, implementation, inputs, snapshot):
+        super(SnapshotOperation, self).__init__(
+            name, {'input': inputs}, snapshot)
+        self.implementation = implementation
+
+
+class SnapshotRelation(object):
+
+    __slots__ = ('name', 'target_name', 'tosca_name', 'snapshot')
+
+    def __init__(self, name, target_name, tosca_name, snapshot):
+        self.name = name
+        self.target_name = target_name
+        self.tosca_name = tosca_name
+        self.snapshot = snapshot
+
+    @property
+    def target(self):
+        """The required node template, None for an unbound requirement.
+        """
+        if self.target_name is None:
+            return None
+        return self.snapshot.get_template(self.target_name)
+
+    def __repr__(self):
+        return "<%s name: %s>" % (self.__class__.__name__, self.name)
+
+
+class SnapshotNode(SnapshotEntity):
+    """Read only node template of a snapshot."""
+
+    __slots__ = ()
+
+    @property
+    def tosca_name(self):
+        return self.data['types'][0]
+
+    @property
+    def type_names(self):
+        """Names of the node's type and its bases, most derived first.
+        """
+        return self.data['types']
+
+    def derives_from(self, name):
+        """Whether the node's type is or derives from the named type.
+
+        The name may be qualified or short.
+        """
+        for type_name in self.data['types']:
+            if type_name == name or type_name.split('.')[-1] == name:
+                return True
+        return False
+
+    @property
+    def capabilities(self):
+        return [self.get_capability(k)
+                for k in sorted(self.data['capabilities'])]
+
+    def get_capability(self, name):
+        data = self.data['capabilities'].get(name)
+        if data is None:
+            return None
+        return SnapshotCapability(name, data, self.snapshot)
+
+    @property
+    def requirements(self):
+        return [SnapshotRelation(name, target, tosca_name, self.snapshot)
+                for name, target, tosca_name in self.data['requirements']]
+
+    @property
+    def interfaces(self):
+        return [SnapshotOperation(name, implementation, inputs, self.snapshot)
+                for name, implementation, inputs in self.data['interfaces']]
+
+
+class Snapshot(object):
+    """Read only topology reloaded from compiled snapshot data.
+
+    Values are as resolved when the snapshot was compiled, node
+    templates and values returned should not be modified.
+    """
+
+    def __init__(self, data):
+        self.data = data
+        self._templates = {}
+        self._nodetemplates = None
+
+    @classmethod
+    def compile(cls, topology):
+        """Compile a topology, with its inputs bound, into a snapshot.
+        """
+        with trace.span('snapshot.compile'):
+            resolved = topology.resolve_all().as_dict()
+            node_values = resolved.get('node_templates') or {}
+            output_values = resolved.get('outputs') or {}
+            data = dict((k, topology.data.get(k)) for k in METADATA_KEYS)
+            data['inputs'] = dict(
+                (i.name, i.attrs) for i in topology.inputs)
+            data['outputs'] = dict(
+                (o.name, {'description': o.attrs.get('description'),
+                          'value': output_values.get(o.name)})
+                for o in topology.outputs)
+            data['node_templates'] = dict(
+                (node.name, _compile_node(node, node_values.get(
+                    node.name) or {}))
+                for node in topology.nodetemplates)
+            return cls(data)
+
+    def dumps(self):
+        body = json.dumps(
+            self.data, sort_keys=True, separators=(',', ':'), default=str)
+        header = json.dumps({
+            'format': SNAPSHOT_FORMAT, 'pytosca': __version__,
+            'checksum': hashlib.sha1(body).hexdigest()}, sort_keys=True)
+        return "%s\n%s" % (header, body)
+
+    def dump(self, path):
+        """Write the snapshot to a file, replacing it atomically.
+
+        The file gets the mode a plain open() would give it, mkstemp
+        creates the temporary file readable by its owner only.
+        """
+        fd, tmp_path = tempfile.mkstemp(
+            dir=os.path.dirname(os.path.abspath(path)))
+        try:
+            with os.fdopen(fd, 'wb') as fh:
+                fh.write(self.dumps())
+            umask = os.umask(0)
+            os.umask(umask)
+            os.chmod(tmp_path, 0o666 & ~umask)
+            os.rename(tmp_path, path)
+        except Exception:
+            os.remove(tmp_path)
+            raise
+
+    @classmethod
+    def loads(cls, content):
+        header, _, body = content.partition('\n')
+        try:
+            header = json.loads(header)
+        except ValueError:
+            raise SnapshotError("Not a topology snapshot")
+        if not isinstance(header, dict) or (
+                header.get('format') != SNAPSHOT_FORMAT):
+            raise SnapshotError(
+                "Unsupported snapshot format %s, expected %s" % (
+                    isinstance(header, dict) and header.get('format'),
+                    SNAPSHOT_FORMAT))
+        if hashlib.sha1(body).hexdigest() != header.get('checksum'):
+            raise SnapshotError("Snapshot checksum mismatch")
+        return cls(json.loads(body))
+
+    @classmethod
+    def load(cls, path):
+        with trace.span('snapshot.load', {'path': path}):
+            with open(path, 'rb') as fh:
+                return cls.loads(fh.read())
+
+    @property
+    def tosca_version(self):
+        return self.data['tosca_definitions_version']
+
+    @property
+    def template_name(self):
+        return self.data.get('template_name')
+
+    @property
+    def template_author(self):
+        return self.data.get('template_author')
+
+    @property
+    def template_version(self):
+        return self.data.get('template_version')
+
+    @property
+    def description(self):
+        return self.data['description']
+
+    @property
+    def inputs(self):
+        return [Input(k, v) for k, v in self.data['inputs'].items()]
+
+    def get_input(self, name):
+        value = self.data['inputs'].get(name)
+        if value is None:
+            return value
+        return Input(name, value)
+
+    @property
+    def outputs(self):
+        return [self.get_output(k) for k in self.data['outputs']]
+
+    def get_output(self, name):
+        value = self.data['outputs'].get(name)
+        if value is None:
+            return value
+        return SnapshotValue(name, value['value'], value['description'])
+
+    @property
+    def nodetemplates(self):
+        """All node templates, the returned list is shared and read only.
+        """
+        if self._nodetemplates is None:
+            self._nodetemplates = [
+                self.get_template(k) for k in self.data['node_templates']]
+        return self._nodetemplates
+
+    def get_template(self, name):
+        node = self._templates.get(name)
+        if node is not None:
+            return node
+        data = self.data['node_templates'].get(name)
+        if data is None:
+            return None
+        node = self._templates[name] = SnapshotNode(name, data, self)
+        return node
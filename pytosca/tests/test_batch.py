@@ -0,0 +1,75 @@
+# Copyright 2014-2015 Kapil Thangavelu <kapil.foss@gmail.com>
+#
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import logging
+import os
+
+from pytosca import tosca
+from pytosca.tests.test_tosca import BaseTest, TEST_DATA
+
+
+class TestInputValidator(BaseTest):
+
+    def setUp(self):
+        super(TestInputValidator, self).setUp()
+        self.log_output = self.capture_logging(
+            'tosca.model', level=logging.DEBUG)
+        self.topology = tosca.Tosca.load(
+            os.path.join(TEST_DATA, 'tosca_single_instance_wordpress.yaml'))
+        self.valid = {
+            'cpus': 2, 'db_name': 'blog', 'db_user': 'wpadmin',
+            'db_pwd': 'secret', 'db_root_pwd': 'supersecret',
+            'db_port': 3107}
+
+    def test_validate_input_sets(self):
+        results = list(self.topology.validate_inputs([
+            self.valid,
+            dict(self.valid, cpus=3),
+            dict(self.valid, db_port=70000, extra=1),
+            dict(self.valid, db_port='3107')]))
+        self.assertEqual(results[0], [])
+        self.assertEqual(
+            results[1],
+            ["Input cpus value 3 violates valid_values: [1, 2, 4, 8]"])
+        self.assertEqual(
+            sorted(results[2]),
+            ["Input db_port value 70000 violates less_or_equal: 65535"
+             " (mysql_database.database_endpoint.port)",
+             "Unknown input extra"])
+        self.assertEqual(
+            results[3],
+            ["Input db_port value '3107' is not of type integer"])
+
+    def test_missing_inputs(self):
+        values = dict(self.valid)
+        del values['db_name']
+        self.assertEqual(
+            list(self.topology.validate_inputs(iter([values]))),
+            [["Missing input db_name"]])
+
+    def test_does_not_bind(self):
+        list(self.topology.validate_inputs([self.valid]))
+        self.assertEqual(self.topology.get_input('cpus').value, None)
+        self.topology.bind_inputs(self.valid)
+
+    def test_property_constraints(self):
+        topology = tosca.Tosca.load(
+            os.path.join(TEST_DATA, 'tosca_compute_only.yaml'))
+        self.assertEqual(
+            list(topology.validate_inputs([{'cpus': 0}])),
+            [["Input cpus value 0 violates valid_values: [1, 2, 4, 8]",
+              "Input cpus value 0 violates greater_or_equal: 1"
+              " (my_server.num_cpus)"]])
@@ -0,0 +1,84 @@
+# Copyright 2014-2015 Kapil Thangavelu <kapil.foss@gmail.com>
+#
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import json
+import logging
+import os
+import shutil
+import tempfile
+
+from StringIO import StringIO
+
+from pytosca.cli import find_templates, main
+from pytosca.tests.test_tosca import BaseTest, TEST_DATA
+
+
+class TestCli(BaseTest):
+
+    def setUp(self):
+        super(TestCli, self).setUp()
+        self.log_output = self.capture_logging(
+            'tosca.model', level=logging.ERROR)
+        # main configures logging on the root logger, restore it after,
+        # pool workers forked meanwhile inherit both.
+        handlers = logging.root.handlers[:]
+        self.addCleanup(setattr, logging.root, 'handlers', handlers)
+
+    def run_cli(self, *args):
+        output = StringIO()
+        status = main(list(args), output=output)
+        results = [json.loads(l) for l in output.getvalue().splitlines()]
+        return status, dict(
+            (os.path.basename(r['path']), r) for r in results)
+
+    def test_find_templates(self):
+        files = list(find_templates([TEST_DATA]))
+        self.assertIn(
+            os.path.join(TEST_DATA, 'tosca_compute_only.yaml'), files)
+        self.assertEqual(
+            list(find_templates([os.path.join(TEST_DATA, 'tosca_c*.yaml')])),
+            [os.path.join(TEST_DATA, 'tosca_compute_only.yaml'),
+             os.path.join(TEST_DATA, 'tosca_custom_relations.yaml')])
+
+    def test_validate_directory(self):
+        status, results = self.run_cli('validate', TEST_DATA, '-j', '2')
+        self.assertEqual(status, 1)
+        self.assertTrue(results['tosca_compute_only.yaml']['valid'])
+        self.assertIn('my_cpus', results['mongo-node.yaml']['error'])
+
+    def test_resolve_with_inputs(self):
+        tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmp)
+        inputs = os.path.join(tmp, 'inputs.json')
+        with open(inputs, 'w') as fh:
+            json.dump({'cpus': 4}, fh)
+        status, results = self.run_cli(
+            'resolve', os.path.join(TEST_DATA, 'tosca_compute_only.yaml'),
+            '-i', inputs, '-j', '1')
+        self.assertEqual(status, 0)
+        values = results['tosca_compute_only.yaml']['values']
+        self.assertEqual(
+            values['node_templates']['my_server']['properties']['num_cpus'],
+            4)
+
+    def test_plan(self):
+        status, results = self.run_cli(
+            'plan', os.path.join(TEST_DATA, 'tosca_compute_only.yaml'),
+            '-j', '1')
+        self.assertEqual(status, 0)
+        self.assertEqual(
+            results['tosca_compute_only.yaml']['levels'][0],
+            ['my_server.create'])
@@ -0,0 +1,119 @@
+# Copyright 2014-2015 Kapil Thangavelu <kapil.foss@gmail.com>
+#
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import logging
+import os
+
+from pytosca import tosca
+from pytosca.diff import diff
+from pytosca.tests.test_tosca import BaseTest, TEST_DATA
+
+
+class TestDiff(BaseTest):
+
+    def setUp(self):
+        super(TestDiff, self).setUp()
+        self.log_output = self.capture_logging(
+            'tosca.model', level=logging.DEBUG)
+
+    def load(self, name='tosca_single_instance_wordpress.yaml'):
+        return tosca.Tosca.load(os.path.join(TEST_DATA, name))
+
+    def test_unchanged(self):
+        result = diff(self.load(), self.load())
+        self.assertFalse(result.changed)
+        self.assertEqual(result.affected, set())
+
+    def test_modified_property_affects_dependents(self):
+        old, new = self.load(), self.load()
+        new.data['node_templates']['mysql_dbms']['interfaces'][
+            'start'] = 'mysql_dbms_start_v2.sh'
+        result = diff(old, new)
+        self.assertEqual(result.modified, {'mysql_dbms': ['interfaces']})
+        self.assertEqual(
+            result.affected,
+            set(['mysql_dbms', 'mysql_database', 'wordpress']))
+
+    def test_resolved_input_change(self):
+        old, new = self.load(), self.load()
+        old.bind_inputs({'cpus': 2})
+        new.bind_inputs({'cpus': 4})
+        result = diff(old, new)
+        self.assertEqual(result.modified, {'server': ['properties']})
+        self.assertEqual(len(result.affected), 5)
+
+    def test_added_removed(self):
+        old, new = self.load(), self.load()
+        templates = new.data['node_templates']
+        templates['cache'] = {'type': 'tosca.nodes.SoftwareComponent',
+                              'requirements': [{'host': 'server'}]}
+        del templates['webserver']
+        new.invalidate()
+        result = diff(old, new)
+        self.assertEqual(result.added, set(['cache']))
+        self.assertEqual(result.removed, set(['webserver']))
+        self.assertEqual(result.modified, {})
+        self.assertEqual(result.affected, set(['cache', 'wordpress']))
+
+    def test_template_type_change(self):
+        old, new = self.load('mongo-node.yaml'), self.load('mongo-node.yaml')
+        for t in (old, new):
+            t.data['inputs'] = {'my_cpus': {'type': 'integer'}}
+        new.data['node_types']['tosca.nodes.DBMS.MongoDB']['properties'][
+            'replica_set'] = {'type': 'string', 'default': 'rs0'}
+        new.data = new.data
+        result = diff(old, new)
+        self.assertEqual(result.types, set(['tosca.nodes.DBMS.MongoDB']))
+        self.assertEqual(
+            result.modified['mongo_dbms'], ['types', 'properties'])
+        self.assertEqual(
+            result.affected, set(['mongo_dbms', 'mongo_db', 'app']))
+
+    def test_capability_type_change(self):
+        old, new = self.load('mongo-node.yaml'), self.load('mongo-node.yaml')
+        for t in (old, new):
+            t.data['inputs'] = {'my_cpus': {'type': 'integer'}}
+            # Base type capabilities take precedence, so use a name
+            # the base Database type doesn't define.
+            t.data['node_types']['tosca.nodes.Database.MongoDB'][
+                'capabilities'] = {
+                    'mongo_endpoint': 'tosca.capabilities.MongoEndpoint'}
+        new.data['capability_types']['tosca.capabilities.MongoEndpoint'][
+            'description'] = 'MongoDB wire protocol endpoint'
+        for t in (old, new):
+            t.data = t.data
+        result = diff(old, new)
+        self.assertEqual(
+            result.types, set(['tosca.capabilities.MongoEndpoint']))
+        self.assertEqual(result.modified['mongo_db'], ['types'])
+        self.assertTrue('mongo_db' in result.affected)
+        self.assertTrue('mongo_dbms' not in result.modified)
+
+    def test_relation_type_change(self):
+        old, new = self.load(), self.load()
+        for t in (old, new):
+            t.data['relation_types'] = {'acme.relations.Database': {
+                'derived_from': 'tosca.relationships.ConnectsTo'}}
+            t.data['node_templates']['wordpress']['requirements'][1][
+                'relation_type'] = 'acme.relations.Database'
+            t.data = t.data
+        new.data['relation_types']['acme.relations.Database'][
+            'valid_targets'] = ['tosca.nodes.Database']
+        new.data = new.data
+        result = diff(old, new)
+        self.assertEqual(result.types, set(['acme.relations.Database']))
+        self.assertEqual(result.modified, {'wordpress': ['types']})
+        self.assertEqual(result.affected, set(['wordpress']))
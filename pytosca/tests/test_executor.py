@@ -0,0 +1,123 @@
+# Copyright 2014-2015 Kapil Thangavelu <kapil.foss@gmail.com>
+#
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import logging
+import os
+import shutil
+import tempfile
+
+from pytosca import tosca
+from pytosca.executor import (
+    Plan, PlanExecutor, FakeRunner, SubprocessRunner, Task, OperationError,
+    UNDEPLOY, SUCCEEDED, FAILED, SKIPPED, CANCELLED)
+from pytosca.tests.test_tosca import BaseTest, TEST_DATA
+
+
+class TestPlanExecutor(BaseTest):
+
+    def setUp(self):
+        super(TestPlanExecutor, self).setUp()
+        self.log_output = self.capture_logging(
+            'tosca', level=logging.DEBUG)
+        self.topology = tosca.Tosca.load(
+            os.path.join(TEST_DATA, 'tosca_single_instance_wordpress.yaml'))
+        self.topology.bind_inputs(
+            {'cpus': 2, 'db_name': 'blog', 'db_user': 'wpadmin',
+             'db_pwd': 'secret', 'db_root_pwd': 'supersecret',
+             'db_port': 3107})
+        self.plan = Plan(self.topology)
+
+    def test_plan(self):
+        self.assertEqual(len(self.plan.tasks), 15)
+        self.assertEqual(
+            self.plan.tasks['wordpress', 'create'].requires,
+            [('mysql_database', 'start'), ('webserver', 'start')])
+        self.assertEqual(
+            self.plan.tasks['wordpress', 'configure'].requires,
+            [('wordpress', 'create')])
+        configure = self.plan.tasks['wordpress', 'configure']
+        self.assertEqual(configure.inputs['db_port'], 3107)
+        self.assertEqual(configure.host, 'server')
+        self.assertEqual(self.plan.levels()[3],
+                         [('mysql_dbms', 'create'), ('webserver', 'create')])
+
+    def test_reverse_plan(self):
+        plan = Plan(self.topology, UNDEPLOY, reverse=True)
+        self.assertEqual(
+            plan.tasks['server', 'stop'].requires,
+            [('mysql_dbms', 'delete'), ('webserver', 'delete')])
+        self.assertEqual(plan.levels()[0], [('wordpress', 'stop')])
+
+    def test_execute(self):
+        runner = FakeRunner(delay=0.001)
+        results = PlanExecutor(runner, max_workers=4).execute(self.plan)
+        self.assertEqual(
+            set([r.status for r in results.values()]), set([SUCCEEDED]))
+        order = dict((k, i) for i, k in enumerate(runner.calls))
+        self.assertTrue(
+            order['mysql_dbms', 'start'] < order['mysql_database', 'configure']
+            < order['wordpress', 'create'] < order['wordpress', 'configure'])
+        self.assertEqual(results['wordpress', 'create'].output,
+                         'wordpress_install.sh')
+
+    def test_host_limit(self):
+        runner = FakeRunner(delay=0.01)
+        PlanExecutor(runner, max_workers=4, host_limit=1).execute(self.plan)
+        self.assertEqual(runner.max_running['server'], 1)
+
+    def test_fail_fast(self):
+        runner = FakeRunner(fail=[('mysql_dbms', 'create')])
+        results = PlanExecutor(runner, max_workers=1).execute(self.plan)
+        self.assertEqual(results['mysql_dbms', 'create'].status, FAILED)
+        self.assertEqual(results['wordpress', 'create'].status, CANCELLED)
+
+    def test_continue_on_error(self):
+        runner = FakeRunner(fail=[('mysql_dbms', 'create')])
+        results = PlanExecutor(runner, fail_fast=False).execute(self.plan)
+        self.assertEqual(results['mysql_dbms', 'start'].status, SKIPPED)
+        self.assertEqual(results['wordpress', 'start'].status, SKIPPED)
+        self.assertEqual(results['webserver', 'start'].status, SUCCEEDED)
+
+    def test_subprocess_runner(self):
+        task = Task('app', 'configure', '#!/bin/sh\necho port=$port\n',
+                    {'port': 8080}, 'server')
+        self.assertEqual(SubprocessRunner().run(task), 'port=8080\n')
+        task.implementation = '#!/bin/sh\nexit 3\n'
+        self.assertRaises(OperationError, SubprocessRunner().run, task)
+
+    def test_subprocess_runner_implementations(self):
+        base_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, base_dir)
+        script = os.path.join(base_dir, 'configure.sh')
+        with open(script, 'w') as fh:
+            fh.write('#!/bin/sh\necho file $name\n')
+        os.chmod(script, 0o755)
+        runner = SubprocessRunner(base_dir)
+        task = Task('app', 'configure', 'configure.sh',
+                    {'name': u'caf\xe9'}, 'server')
+        self.assertEqual(runner.run(task), 'file caf\xc3\xa9\n')
+        task.implementation = 'echo inline $name'
+        self.assertEqual(runner.run(task), 'inline caf\xc3\xa9\n')
+
+    def test_runner_base_exception(self):
+        class InterruptedRunner(object):
+            def run(self, task):
+                raise KeyboardInterrupt()
+        results = PlanExecutor(InterruptedRunner()).execute(self.plan)
+        failed = [r for r in results.values() if r.status == FAILED]
+        self.assertTrue(failed)
+        for r in failed:
+            self.assertTrue(isinstance(r.error, KeyboardInterrupt))
@@ -0,0 +1,75 @@
+# Copyright 2014-2015 Kapil Thangavelu <kapil.foss@gmail.com>
+#
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import logging
+import os
+
+from pytosca import tosca
+from pytosca.tests.test_tosca import BaseTest, TEST_DATA
+
+
+class TestTopologyGraph(BaseTest):
+
+    def setUp(self):
+        super(TestTopologyGraph, self).setUp()
+        self.log_output = self.capture_logging(
+            'tosca.model', level=logging.DEBUG)
+        self.topology = tosca.Tosca.load(
+            os.path.join(TEST_DATA, 'tosca_single_instance_wordpress.yaml'))
+        self.graph = self.topology.graph
+
+    def test_graph_cached(self):
+        self.assertTrue(self.topology.graph is self.graph)
+        self.topology.invalidate()
+        self.assertFalse(self.topology.graph is self.graph)
+
+    def test_requirements_and_dependents(self):
+        self.assertEqual(
+            sorted(self.graph.targets('wordpress')),
+            ['mysql_database', 'webserver'])
+        self.assertEqual(
+            sorted(self.graph.sources('server')), ['mysql_dbms', 'webserver'])
+        self.assertEqual(self.graph.dependents('wordpress'), [])
+        edge = [e for e in self.graph.requirements('wordpress')
+                if e.name == 'database_endpoint'][0]
+        self.assertTrue(edge.relation is self.topology.types.get('ConnectsTo'))
+
+    def test_edges_by_relation(self):
+        self.assertEqual(
+            [(e.source, e.target) for e in self.graph.edges('HostedOn')],
+            [('mysql_database', 'mysql_dbms'), ('mysql_dbms', 'server'),
+             ('webserver', 'server'), ('wordpress', 'webserver')])
+        self.assertEqual(
+            [(e.source, e.target) for e in self.graph.edges('ConnectsTo')],
+            [('wordpress', 'mysql_database')])
+        self.assertEqual(
+            len(self.graph.edges('DependsOn')), len(self.graph.edges()))
+
+    def test_sort(self):
+        self.assertEqual(
+            self.graph.levels(),
+            [['server'], ['mysql_dbms', 'webserver'],
+             ['mysql_database'], ['wordpress']])
+        self.assertEqual(self.graph.sort()[-1], 'wordpress')
+
+    def test_mapping_requirements(self):
+        topology = tosca.Tosca.load(os.path.join(TEST_DATA, 'mongo-node.yaml'))
+        self.assertEqual(
+            sorted(topology.graph.targets('app')), ['app_server', 'mongo_db'])
+        self.assertEqual(
+            topology.graph.levels(),
+            [['app_server', 'mongo_server'], ['mongo_dbms'],
+             ['mongo_db'], ['app']])
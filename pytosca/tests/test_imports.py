@@ -0,0 +1,174 @@
+# Copyright 2014-2015 Kapil Thangavelu <kapil.foss@gmail.com>
+#
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import logging
+import os
+import shutil
+import tempfile
+
+from pytosca import imports, trace, tosca
+from pytosca.cache import ImportCache
+from pytosca.tests.test_tosca import BaseTest
+
+BASE_TYPES = """
+node_types:
+  acme.nodes.Base:
+    derived_from: tosca.nodes.SoftwareComponent
+    properties:
+      port:
+        type: integer
+"""
+
+APP_TYPES = """
+imports:
+  - base.yaml
+node_types:
+  acme.nodes.App:
+    derived_from: acme.nodes.Base
+"""
+
+TEMPLATE = """
+tosca_definitions_version: tosca_simple_1_0
+imports:
+  - %s
+  - base: lib/base.yaml
+node_templates:
+  server:
+    type: tosca.nodes.Compute
+  app:
+    type: acme.nodes.App
+    properties:
+      port: 8080
+    requirements:
+      - host: server
+"""
+
+
+class TestImports(BaseTest):
+
+    def setUp(self):
+        super(TestImports, self).setUp()
+        self.log_output = self.capture_logging(
+            'tosca.model', level=logging.DEBUG)
+        self.dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.dir)
+        self.addCleanup(imports.clear)
+        self.cache = ImportCache(os.path.join(self.dir, 'cache'))
+        self.set_environ(PYTOSCA_CACHE_DIR=self.cache.path)
+        os.environ.pop('PYTOSCA_IMPORT_PATH', None)
+        os.mkdir(os.path.join(self.dir, 'lib'))
+        self.write('lib/base.yaml', BASE_TYPES)
+        self.write('lib/app.yaml', APP_TYPES)
+        self.write('template.yaml', TEMPLATE % 'lib/app.yaml')
+
+    def write(self, name, content):
+        path = os.path.join(self.dir, name)
+        with open(path, 'w') as fh:
+            fh.write(content)
+        return path
+
+    def test_load_recursive(self):
+        topology = tosca.Tosca.load(os.path.join(self.dir, 'template.yaml'))
+        app = topology.get_template('app')
+        self.assertTrue(isinstance(app, topology.types.get('acme.nodes.Base')))
+        self.assertTrue(
+            isinstance(app, topology.types.get('SoftwareComponent')))
+        self.assertEqual(app.get_property('port').value, 8080)
+        self.assertEqual(
+            [r.target.name for r in app.requirements if r.name == 'host'],
+            ['server'])
+        self.assertTrue('Duplicate import' not in self.log_output.getvalue())
+
+    def test_resolve_order(self):
+        resolver = imports.ImportResolver(cache=False)
+        documents = resolver.resolve(
+            ['lib/app.yaml', 'lib/base.yaml'], self.dir)
+        self.assertEqual(
+            [os.path.basename(d.path) for d in documents],
+            ['base.yaml', 'app.yaml'])
+        resolver.resolve(['lib/base.yaml', 'lib/base.yaml'], self.dir)
+        self.assertTrue('Duplicate import' in self.log_output.getvalue())
+
+    def test_search_paths(self):
+        path = self.write('other.yaml', TEMPLATE % 'app.yaml')
+        self.assertRaises(ValueError, tosca.Tosca.load, path)
+        topology = tosca.Tosca.load(
+            path, search_paths=[os.path.join(self.dir, 'lib')])
+        self.assertEqual(
+            topology.get_template('app').tosca_name, 'acme.nodes.App')
+        os.environ['PYTOSCA_IMPORT_PATH'] = os.path.join(self.dir, 'lib')
+        self.assertEqual(
+            tosca.Tosca.load(path).get_template('app').tosca_name,
+            'acme.nodes.App')
+
+    def test_data_without_path(self):
+        data = tosca.yaml_load(TEMPLATE % 'app.yaml')
+        topology = tosca.Tosca(data)
+        self.assertEqual(
+            topology.get_template('server').tosca_name,
+            'tosca.nodes.Compute')
+        self.assertEqual(topology.types.get('acme.nodes.App'), None)
+        topology = tosca.Tosca(data, search_paths=[
+            os.path.join(self.dir, 'lib'), self.dir])
+        self.assertEqual(
+            topology.get_template('app').tosca_name, 'acme.nodes.App')
+
+    def test_cache_bounded(self):
+        self.addCleanup(setattr, imports, 'MAX_CACHED', imports.MAX_CACHED)
+        imports.MAX_CACHED = 1
+        tosca.Tosca.load(os.path.join(self.dir, 'template.yaml'))
+        self.assertEqual(len(imports._parsed), 1)
+        self.assertEqual(len(imports._layers), 1)
+
+    def test_cycle(self):
+        self.write('lib/base.yaml', "imports: [app.yaml]\n" + BASE_TYPES)
+        try:
+            tosca.Tosca.load(os.path.join(self.dir, 'template.yaml'))
+        except tosca.CyclicDependencyError as e:
+            self.assertEqual(
+                sorted(os.path.basename(p) for p in set(e.cycle)),
+                ['app.yaml', 'base.yaml'])
+        else:
+            self.fail("import cycle not detected")
+
+    def test_conflicting_definitions(self):
+        self.write('lib/app.yaml', APP_TYPES + BASE_TYPES.replace(
+            'node_types:\n', ''))
+        self.assertRaises(
+            ValueError, tosca.Tosca.load,
+            os.path.join(self.dir, 'template.yaml'))
+
+    def test_shared_parse_and_types(self):
+        path = os.path.join(self.dir, 'template.yaml')
+        trace.enable()
+        self.addCleanup(trace.disable)
+        t1 = tosca.Tosca.load(path)
+        t2 = tosca.Tosca.load(path)
+        self.assertTrue(t1.types.parent is t2.types.parent)
+        self.assertTrue(t1.types.parent.frozen)
+        counters = trace.stats()['counters']
+        self.assertEqual(counters['imports.cache_miss'], 2)
+        self.assertEqual(counters['imports.cache_hit'], 2)
+
+        # Parsed documents persist across processes in the on disk cache
+        imports.clear()
+        with open(os.path.join(self.dir, 'lib', 'base.yaml')) as fh:
+            self.assertEqual(
+                self.cache.get(fh.read()),
+                tosca.yaml_load(BASE_TYPES))
+        tosca.Tosca.load(path)
+        self.assertEqual(
+            trace.stats()['counters']['imports.cache_hit'], 4)
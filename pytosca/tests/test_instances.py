@@ -0,0 +1,192 @@
+# Copyright 2014-2015 Kapil Thangavelu <kapil.foss@gmail.com>
+#
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import datetime
+import logging
+import os
+import shutil
+import tempfile
+
+from pytosca import tosca
+from pytosca.instances import (
+    Instance, InstanceStore, MemoryInstanceStore, SQLiteInstanceStore)
+from pytosca.tests.test_tosca import BaseTest, TEST_DATA
+
+
+class InstanceStoreTests(object):
+
+    def setUp(self):
+        super(InstanceStoreTests, self).setUp()
+        self.log_output = self.capture_logging(
+            'tosca.model', level=logging.DEBUG)
+        self.topology = tosca.Tosca.load(
+            os.path.join(TEST_DATA, 'tosca_single_instance_wordpress.yaml'))
+        self.store = self.create_store()
+        instances = []
+        for i in range(3):
+            server = 'server-%d' % i
+            instances.append(self.instance('server', server))
+            instances.append(
+                self.instance('webserver', 'webserver-%d' % i, host=server))
+            instances.append(self.instance(
+                'wordpress', 'wordpress-%d' % i, host='webserver-%d' % i,
+                bindings={'host': 'webserver-%d' % i}))
+        self.store.add_many(instances)
+
+    def instance(self, template, id, **kw):
+        return Instance.for_template(
+            self.topology.get_template(template), id, **kw)
+
+    def ids(self, instances):
+        return [i.id for i in instances]
+
+    def test_find(self):
+        self.assertEqual(len(self.store), 9)
+        self.assertEqual(
+            self.ids(self.store.find(template='server')),
+            ['server-0', 'server-1', 'server-2'])
+        self.assertEqual(
+            self.ids(self.store.find(host='server-1')), ['webserver-1'])
+        self.assertEqual(self.store.find(template='nope'), [])
+        self.assertEqual(self.store.count(state='initial'), 9)
+        self.assertEqual(
+            self.store.get('wordpress-2').bindings, {'host': 'webserver-2'})
+        self.assertEqual(
+            self.store.get('webserver-0').type, 'tosca.nodes.WebServer')
+        self.assertEqual(self.store.get('nope'), None)
+        self.assertTrue('server-0' in self.store)
+
+    def test_find_by_type(self):
+        self.assertEqual(
+            self.ids(self.store.find(type='Compute')),
+            ['server-0', 'server-1', 'server-2'])
+        self.assertEqual(
+            self.store.count(type='tosca.nodes.SoftwareComponent'), 3)
+        self.assertEqual(self.store.count(type='Root'), 9)
+
+    def test_update(self):
+        self.store.set_state(['webserver-0', 'webserver-2'], 'started')
+        self.store.update(
+            'webserver-0', attributes={'ip': '10.0.0.1'})
+        self.store.update(
+            'webserver-0', attributes={'port': 80}, host='server-2')
+        self.assertEqual(
+            self.ids(self.store.find(state='started', host='server-2')),
+            ['webserver-0', 'webserver-2'])
+        self.assertEqual(self.store.find(state='started', host='server-0'), [])
+        webserver = self.store.get('webserver-0')
+        self.assertEqual(webserver.attributes, {'ip': '10.0.0.1', 'port': 80})
+        self.assertEqual(webserver.state, 'started')
+        self.assertRaises(
+            ValueError, self.store.set_state, ['server-0'], 'running')
+        self.assertRaises(
+            ValueError, self.store.update, 'server-0', status='started')
+        self.assertRaises(
+            KeyError, self.store.update, 'nope', state='started')
+
+    def test_json_values(self):
+        self.store.add(self.instance(
+            'server', 'server-3',
+            attributes={'ports': (80, 443), 'tags': {'a': [u'caf\xe9']}}))
+        self.store.update(
+            'server-0', attributes={'sizes': {1: (2,), None: 1.5}})
+        sizes = {'sizes': {'1': [2], 'null': 1.5}}
+        self.assertEqual(
+            self.store.get('server-3').attributes,
+            {'ports': [80, 443], 'tags': {'a': [u'caf\xe9']}})
+        self.assertEqual(self.store.get('server-0').attributes, sizes)
+        self.assertEqual(
+            self.store.find(template='server')[0].attributes, sizes)
+        self.assertRaises(
+            ValueError, self.store.add, self.instance(
+                'server', 'server-4',
+                attributes={'created': datetime.date(2015, 1, 1)}))
+        self.assertRaises(
+            ValueError, self.store.update, 'server-0',
+            bindings={'host': object()})
+        self.assertEqual(self.store.get('server-4'), None)
+        self.assertEqual(self.store.get('server-0').attributes, sizes)
+
+    def test_abstract(self):
+        self.assertRaises(TypeError, InstanceStore)
+
+    def test_remove(self):
+        self.store.remove('server-0')
+        self.assertEqual(self.store.get('server-0'), None)
+        self.assertEqual(self.store.count(type='Compute'), 2)
+        self.assertRaises(KeyError, self.store.remove, 'server-0')
+
+    def test_bulk_atomic(self):
+        self.assertRaises(
+            ValueError, self.store.add_many,
+            [self.instance('server', 'server-3'),
+             self.instance('server', 'server-0')])
+        self.assertEqual(self.store.get('server-3'), None)
+        self.assertRaises(
+            KeyError, self.store.set_state, ['server-0', 'nope'], 'started')
+        self.assertEqual(self.store.get('server-0').state, 'initial')
+
+    def test_transaction(self):
+        with self.store.transaction():
+            self.store.set_state(['server-0'], 'started')
+            self.store.remove('server-1')
+            self.store.add(self.instance('server', 'server-3'))
+        self.assertEqual(
+            self.ids(self.store.find(template='server')),
+            ['server-0', 'server-2', 'server-3'])
+
+        try:
+            with self.store.transaction():
+                self.store.set_state(['server-2'], 'started')
+                self.store.remove('server-3')
+                self.store.add(self.instance('server', 'server-1'))
+                self.store.update('server-0', state='stopping')
+                raise RuntimeError()
+        except RuntimeError:
+            pass
+        self.assertEqual(
+            self.ids(self.store.find(template='server')),
+            ['server-0', 'server-2', 'server-3'])
+        self.assertEqual(
+            self.ids(self.store.find(state='started')), ['server-0'])
+        self.assertEqual(self.store.count(type='Compute'), 3)
+
+
+class TestMemoryInstanceStore(InstanceStoreTests, BaseTest):
+
+    def create_store(self):
+        return MemoryInstanceStore()
+
+
+class TestSQLiteInstanceStore(InstanceStoreTests, BaseTest):
+
+    def create_store(self):
+        store = SQLiteInstanceStore()
+        self.addCleanup(store.close)
+        return store
+
+    def test_persistent(self):
+        path = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, path)
+        db_path = os.path.join(path, 'instances.db')
+        store = SQLiteInstanceStore(db_path)
+        store.add(self.instance('server', 'server-0', state='started'))
+        store.close()
+        store = SQLiteInstanceStore(db_path)
+        self.addCleanup(store.close)
+        self.assertEqual(
+            self.ids(store.find(type='Compute', state='started')),
+            ['server-0'])
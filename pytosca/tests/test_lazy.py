@@ -0,0 +1,148 @@
+# Copyright 2014-2015 Kapil Thangavelu <kapil.foss@gmail.com>
+#
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import logging
+import os
+
+from pytosca import tosca
+from pytosca.lazy import LazyTemplates, lazy_load
+from pytosca.tests.test_tosca import BaseTest, TEST_DATA
+
+WORDPRESS = os.path.join(TEST_DATA, 'tosca_single_instance_wordpress.yaml')
+
+
+class TestLazyLoading(BaseTest):
+
+    def setUp(self):
+        super(TestLazyLoading, self).setUp()
+        self.log_output = self.capture_logging(
+            'tosca.model', level=logging.DEBUG)
+        self.topology = tosca.Tosca.load(WORDPRESS, lazy=True)
+        self.templates = self.topology.data['node_templates']
+
+    def test_templates_deferred(self):
+        self.assertTrue(isinstance(self.templates, LazyTemplates))
+        self.assertEqual(self.templates._loaded, {})
+        self.assertEqual(
+            sorted(self.templates),
+            ['mysql_database', 'mysql_dbms', 'server', 'webserver',
+             'wordpress'])
+        server = self.topology.get_template('server')
+        self.assertEqual(self.templates._loaded.keys(), ['server'])
+        self.assertTrue(self.topology.get_template('server') is server)
+        self.assertEqual(server.get_property('os_type').value, 'Linux')
+
+    def test_matches_eager_load(self):
+        eager = tosca.Tosca.load(WORDPRESS)
+        self.assertEqual(
+            dict(self.templates), eager.data['node_templates'])
+        self.assertEqual(
+            self.topology.data['inputs'], eager.data['inputs'])
+        self.assertEqual(
+            dict(self.topology.resolve_all()), dict(eager.resolve_all()))
+
+    def test_iter_nodetemplates(self):
+        names = [n.name for n in self.topology.iter_nodetemplates()]
+        self.assertEqual(len(names), 5)
+        self.assertEqual(self.templates._loaded, {})
+        self.assertEqual(
+            sorted(self.topology.graph.targets('wordpress')),
+            ['mysql_database', 'webserver'])
+        self.assertEqual(self.templates._loaded, {})
+
+    def test_iteration_memory_bounded(self):
+        topology = tosca.Tosca(lazy_load(
+            "inputs:\n"
+            "  cpus: {type: integer}\n"
+            "node_templates:\n"
+            "  server:\n"
+            "    type: tosca.nodes.Compute\n"
+            "    properties: {num_cpus: {get_input: cpus}}\n"
+            "  replica:\n"
+            "    type: tosca.nodes.Compute\n"
+            "    properties: {num_cpus: {get_property: [server, num_cpus]}}\n"
+        ))
+        topology.bind_inputs({'cpus': 2})
+        templates = topology.data['node_templates']
+        for i in range(3):
+            values = [p.value for node in topology.iter_nodetemplates()
+                      for p in node.properties if p.name == 'num_cpus']
+            self.assertEqual(values, [2, 2])
+            self.assertEqual(topology._values, {})
+            self.assertEqual(topology._templates, {})
+            self.assertEqual(templates._loaded, {})
+
+        # Values of retained templates are memoized, unless they read
+        # templates that aren't retained.
+        replica = topology.get_template('replica')
+        self.assertEqual(replica.get_property('num_cpus').value, 2)
+        self.assertEqual(topology._values, {})
+        topology.get_template('server')
+        self.assertEqual(replica.get_property('num_cpus').value, 2)
+        self.assertEqual(len(topology._values), 2)
+
+    def test_mutation(self):
+        self.templates['cache'] = {'type': 'tosca.nodes.SoftwareComponent'}
+        del self.templates['webserver']
+        self.assertEqual(
+            sorted(self.templates),
+            ['cache', 'mysql_database', 'mysql_dbms', 'server', 'wordpress'])
+
+    def test_anchors_load_eagerly(self):
+        data = lazy_load(
+            "base: &base {type: tosca.nodes.Compute}\n"
+            "node_templates:\n"
+            "  server: *base\n")
+        self.assertEqual(
+            data['node_templates'],
+            {'server': {'type': 'tosca.nodes.Compute'}})
+
+    def test_flow_style(self):
+        data = lazy_load(
+            "node_templates: {a: {type: x}, b: {type: y, properties: {}}}\n"
+            "outputs: {}\n")
+        self.assertEqual(data['node_templates']['b'],
+                         {'type': 'y', 'properties': {}})
+        self.assertEqual(data['outputs'], {})
+
+    def test_duplicate_keys_load_eagerly(self):
+        data = lazy_load(
+            "node_templates:\n"
+            "  a: {type: x}\n"
+            "node_templates:\n"
+            "  b: {type: y}\n")
+        self.assertEqual(data['node_templates'], {'b': {'type': 'y'}})
+        data = lazy_load(
+            "node_templates:\n"
+            "  a: {type: x}\n"
+            "  a: {type: y}\n")
+        self.assertEqual(dict(data['node_templates']), {'a': {'type': 'y'}})
+
+    def test_key_types(self):
+        content = (
+            "node_templates:\n"
+            "  1: {type: x}\n"
+            "  '2': {type: y}\n"
+            "  true: {type: z}\n"
+            "  caf\xc3\xa9: {type: w}\n")
+        data = lazy_load(content)
+        self.assertTrue(isinstance(data['node_templates'], LazyTemplates))
+        self.assertEqual(
+            dict(data['node_templates']),
+            tosca.yaml_load(content)['node_templates'])
+        self.assertEqual(
+            sorted(data['node_templates'], key=repr),
+            sorted(tosca.yaml_load(content)['node_templates'], key=repr))
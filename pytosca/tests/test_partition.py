@@ -0,0 +1,77 @@
+# Copyright 2014-2015 Kapil Thangavelu <kapil.foss@gmail.com>
+#
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import logging
+import os
+import pickle
+
+from pytosca import tosca
+from pytosca.partition import partition, operation_cost
+from pytosca.tests.test_tosca import BaseTest, TEST_DATA
+
+
+class TestPartition(BaseTest):
+
+    def setUp(self):
+        super(TestPartition, self).setUp()
+        self.log_output = self.capture_logging(
+            'tosca.model', level=logging.DEBUG)
+        self.topology = tosca.Tosca.load(
+            os.path.join(TEST_DATA, 'tosca_single_instance_wordpress.yaml'))
+        templates = self.topology.data['node_templates']
+        templates['backup'] = {
+            'type': 'tosca.nodes.Compute',
+            'properties': {'os_type': 'Linux'}}
+        templates['backup_agent'] = {
+            'type': 'tosca.nodes.SoftwareComponent',
+            'requirements': [{'host': 'backup'}]}
+        self.topology.invalidate()
+
+    def test_components(self):
+        shards = partition(self.topology, 4)
+        self.assertEqual(
+            [s.nodes for s in shards],
+            [['mysql_database', 'mysql_dbms', 'server', 'webserver',
+              'wordpress'], ['backup', 'backup_agent']])
+        self.assertEqual([s.external for s in shards], [[], []])
+
+    def test_host_subtrees(self):
+        self.topology.data['node_templates']['webserver']['requirements'] = [
+            {'host': 'backup'}]
+        self.topology.invalidate()
+        shards = partition(self.topology, 2, by='host')
+        self.assertEqual(
+            [s.nodes for s in shards],
+            [['backup', 'backup_agent', 'webserver', 'wordpress'],
+             ['mysql_database', 'mysql_dbms', 'server']])
+        self.assertEqual(
+            shards[0].external,
+            [('wordpress', 'database_endpoint', 'mysql_database', 1)])
+
+    def test_balance_by_cost(self):
+        shards = partition(
+            self.topology, 2, cost=operation_cost(self.topology))
+        self.assertEqual([s.weight for s in shards], [13, 2])
+
+    def test_shard_loads_standalone(self):
+        self.topology.bind_inputs({'cpus': 4})
+        shard = pickle.loads(pickle.dumps(partition(self.topology, 2)[0]))
+        topology = shard.load()
+        self.assertEqual(
+            sorted([n.name for n in topology.nodetemplates]), shard.nodes)
+        self.assertEqual(
+            topology.get_template('server').get_property('num_cpus').value,
+            4)
@@ -0,0 +1,110 @@
+# Copyright 2014-2015 Kapil Thangavelu <kapil.foss@gmail.com>
+#
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import logging
+import os
+
+from pytosca import tosca
+from pytosca.tests.test_tosca import BaseTest, TEST_DATA
+
+WORDPRESS = os.path.join(TEST_DATA, 'tosca_single_instance_wordpress.yaml')
+
+
+class TestTemplateIndex(BaseTest):
+
+    def setUp(self):
+        super(TestTemplateIndex, self).setUp()
+        self.log_output = self.capture_logging(
+            'tosca.model', level=logging.DEBUG)
+        self.topology = tosca.Tosca.load(WORDPRESS)
+
+    def names(self, **criteria):
+        return [n.name for n in self.topology.find_templates(**criteria)]
+
+    def test_find_by_type(self):
+        self.assertEqual(
+            self.topology.index.names(type='tosca.nodes.Database'),
+            ['mysql_database'])
+        # Indexes are built without instantiating templates.
+        self.assertEqual(self.topology._templates, {})
+        self.assertEqual(
+            self.names(type='SoftwareComponent'), ['mysql_dbms', 'webserver'])
+        self.assertEqual(len(self.names(type='Root')), 5)
+        self.assertEqual(
+            self.names(type=self.topology.types.get('Compute')), ['server'])
+        self.assertRaises(ValueError, self.names, type='Nope')
+
+    def test_find_by_capability(self):
+        self.assertEqual(
+            self.names(capability='database_endpoint'), ['mysql_database'])
+        self.assertEqual(
+            self.names(capability_type='tosca.capabilities.Container'),
+            ['mysql_dbms', 'server', 'webserver'])
+        self.assertEqual(
+            self.names(capability='database_endpoint', type='Compute'), [])
+
+    def test_find_by_property(self):
+        self.assertEqual(
+            self.names(properties={'os_type': 'Linux', 'num_cpus': None}),
+            [])
+        self.assertEqual(
+            self.names(properties={'os_type': 'Linux', 'mem_size': 4096}),
+            ['server'])
+        self.assertEqual(self.names(properties={'os_type': 'Windows'}), [])
+        self.assertRaises(
+            ValueError, self.names,
+            properties={'num_cpus': {'get_input': 'cpus'}})
+
+    def test_find_by_falsy_property(self):
+        server = self.topology.data['node_templates']['server']
+        server['properties']['num_cpus'] = 0
+        server['properties']['os_type'] = ''
+        self.topology.invalidate()
+        self.assertEqual(self.names(properties={'num_cpus': 0}), ['server'])
+        self.assertEqual(self.names(properties={'os_type': ''}), ['server'])
+        self.assertEqual(self.names(properties={'num_cpus': False}), [])
+        self.assertEqual(self.names(properties={'os_type': 'Linux'}), [])
+
+    def test_matches_scan(self):
+        server = self.topology.data['node_templates']['server']
+        server['properties'].update({'num_cpus': 0, 'os_type': ''})
+        self.topology.invalidate()
+        self.assertEqual(
+            self.topology.get_template('server').get_property(
+                'num_cpus').value, 0)
+        for node in self.topology.nodetemplates:
+            for p in node.properties:
+                if isinstance(p._value, dict):
+                    continue
+                self.assertIn(node.name, self.topology.index.names(
+                    type=node.tosca_name, properties={p.name: p.value}))
+
+    def test_invalidate(self):
+        self.assertEqual(self.names(properties={'os_type': 'Linux'}),
+                         ['server'])
+        server = self.topology.data['node_templates']['server']
+        server['properties']['os_type'] = 'Windows'
+        self.topology.invalidate()
+        self.assertEqual(self.names(properties={'os_type': 'Linux'}), [])
+        self.assertEqual(self.names(properties={'os_type': 'Windows'}),
+                         ['server'])
+
+    def test_lazy(self):
+        topology = tosca.Tosca.load(WORDPRESS, lazy=True)
+        self.assertEqual(
+            [n.name for n in topology.find_templates(
+                type='Compute', properties={'os_type': 'Linux'})],
+            ['server'])
@@ -0,0 +1,93 @@
+# Copyright 2014-2015 Kapil Thangavelu <kapil.foss@gmail.com>
+#
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import logging
+import os
+
+from pytosca import tosca
+from pytosca.tests.test_tosca import BaseTest, TEST_DATA
+
+
+class TestResolveAll(BaseTest):
+
+    def setUp(self):
+        super(TestResolveAll, self).setUp()
+        self.log_output = self.capture_logging(
+            'tosca.model', level=logging.DEBUG)
+        self.topology = tosca.Tosca.load(
+            os.path.join(TEST_DATA, 'tosca_single_instance_wordpress.yaml'))
+        self.topology.bind_inputs(
+            {'cpus': 2, 'db_name': 'blog', 'db_user': 'wpadmin',
+             'db_pwd': 'secret', 'db_root_pwd': 'supersecret',
+             'db_port': 3107})
+
+    def test_resolve_all(self):
+        resolved = self.topology.resolve_all()
+        self.assertEqual(
+            resolved['node_templates', 'server', 'properties', 'num_cpus'], 2)
+        self.assertEqual(
+            resolved['node_templates', 'mysql_database', 'capabilities',
+                     'database_endpoint', 'port'], 3107)
+        self.assertEqual(
+            resolved['node_templates', 'wordpress', 'interfaces',
+                     'configure', 'db_password'], 'secret')
+        self.assertEqual(
+            resolved['node_templates', 'wordpress', 'interfaces',
+                     'configure', 'db_port'], 3107)
+        self.assertEqual(resolved['outputs', 'website_url'], None)
+        self.assertEqual(
+            resolved.as_dict()['node_templates']['server']['properties'][
+                'os_type'], 'Linux')
+        self.assertFalse(hasattr(resolved, '__setitem__'))
+
+    def test_values_copied(self):
+        server = self.topology.data['node_templates']['server']
+        server['properties']['os_version'] = ['18', '19']
+        self.topology.invalidate()
+        resolved = self.topology.resolve_all()
+        key = ('node_templates', 'server', 'properties', 'os_version')
+        resolved[key].append('20')
+        self.assertEqual(resolved[key], ['18', '19'])
+        self.assertEqual(dict(resolved.items())[key], ['18', '19'])
+        self.assertEqual(server['properties']['os_version'], ['18', '19'])
+
+    def test_matches_lazy_resolution(self):
+        resolved = self.topology.resolve_all()
+        for node in self.topology.nodetemplates:
+            for p in node.properties:
+                self.assertEqual(
+                    resolved['node_templates', node.name, 'properties',
+                             p.name], p.value)
+
+    def test_reference_cycle(self):
+        server = self.topology.data['node_templates']['server']
+        server['properties']['ip_address'] = {
+            'get_property': ['server', 'os_type']}
+        server['properties']['os_type'] = {
+            'get_property': ['server', 'ip_address']}
+        try:
+            self.topology.resolve_all()
+        except tosca.CyclicDependencyError as e:
+            self.assertEqual(len(e.cycle), 3)
+            self.assertEqual(
+                set([k[-1] for k in e.cycle]), set(['ip_address', 'os_type']))
+        else:
+            self.fail("cycle not detected")
+
+    def test_unknown_reference(self):
+        self.topology.data['outputs']['website_url']['value'] = {
+            'get_property': ['server', 'url']}
+        self.assertRaises(ValueError, self.topology.resolve_all)
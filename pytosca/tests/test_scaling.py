@@ -0,0 +1,120 @@
+# Copyright 2014-2015 Kapil Thangavelu <kapil.foss@gmail.com>
+#
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import logging
+import os
+
+from pytosca import tosca
+from pytosca.instances import Instance
+from pytosca.tests.test_tosca import BaseTest, TEST_DATA
+
+
+class TestScaling(BaseTest):
+
+    def setUp(self):
+        super(TestScaling, self).setUp()
+        self.log_output = self.capture_logging(
+            'tosca.model', level=logging.DEBUG)
+        self.topology = tosca.Tosca.load(
+            os.path.join(TEST_DATA, 'tosca_single_instance_wordpress.yaml'))
+        self.topology.bind_inputs(
+            {'cpus': 2, 'db_name': 'blog', 'db_user': 'wpadmin',
+             'db_pwd': 'secret', 'db_root_pwd': 'supersecret',
+             'db_port': 3107})
+
+    def test_scale(self):
+        server = self.topology.get_template('server')
+        self.assertEqual(len(server.replicas), 1)
+        replicas = server.scale(100)
+        self.assertIs(replicas, self.topology.replicas('server'))
+        self.assertEqual(len(replicas), 100)
+        self.assertEqual(replicas[-1].id, 'server-99')
+        replicas.scale_out(5)
+        replicas.scale_in()
+        self.assertEqual(
+            [r.id for r in replicas][-2:], ['server-102', 'server-103'])
+        self.assertRaises(IndexError, replicas.__getitem__, 104)
+        self.assertRaises(ValueError, server.scale, -1)
+        self.assertRaises(ValueError, self.topology.replicas, 'nope')
+
+    def test_shared_values(self):
+        replicas = self.topology.get_template('server').scale(3)
+        self.assertEqual(replicas[0].get_value('num_cpus'), 2)
+        self.assertIs(replicas[0].values, replicas[2].values)
+        self.assertFalse(hasattr(replicas[0].values, '__setitem__'))
+        self.assertEqual(replicas[1].tosca_name, 'tosca.nodes.Compute')
+        self.assertEqual(
+            [r.name for r in replicas[1].requirements], ['dependency'])
+
+        replicas[1].set_value('num_cpus', 4)
+        replicas[1].set_attribute('ip_address', '10.0.0.2')
+        replicas[2].set_id('server-blue')
+        self.assertEqual(replicas[1].get_value('num_cpus'), 4)
+        self.assertEqual(replicas[1].values['os_type'], 'Linux')
+        self.assertEqual(replicas[0].get_value('num_cpus'), 2)
+        self.assertEqual(replicas[0].attributes, {})
+        self.assertEqual(replicas[1].attributes, {'ip_address': '10.0.0.2'})
+        self.assertEqual(replicas[2].id, 'server-blue')
+
+        replicas.scale(2)
+        replicas.scale(3)
+        self.assertEqual(replicas[2].id, 'server-2')
+        self.assertEqual(replicas[1].get_value('num_cpus'), 4)
+
+    def test_values_follow_template(self):
+        replicas = self.topology.get_template('server').scale(10)
+        self.assertEqual(replicas[5].get_value('mem_size'), 4096)
+        self.topology.data['node_templates']['server']['properties'][
+            'mem_size'] = 8192
+        self.topology.invalidate()
+        self.assertEqual(len(replicas), 10)
+        self.assertEqual(replicas[5].get_value('mem_size'), 8192)
+        self.assertIs(self.topology.get_template('server').replicas, replicas)
+
+    def test_unresolvable_value(self):
+        self.topology.data['node_templates']['server']['properties'][
+            'mem_size'] = {'get_property': ['nope', 'mem_size']}
+        self.topology.invalidate()
+        replicas = self.topology.get_template('server').scale(2)
+        self.assertEqual(replicas[0].get_value('os_type'), 'Linux')
+        self.assertRaises(ValueError, getattr, replicas[0], 'values')
+        replicas[1].set_value('mem_size', 2048)
+        self.assertEqual(replicas[1].values['mem_size'], 2048)
+        self.assertEqual(replicas[1].values['num_cpus'], 2)
+        self.assertFalse(hasattr(replicas[1].values, '__setitem__'))
+
+    def test_bounds(self):
+        self.topology.data['node_templates']['server']['capabilities'] = {
+            'scalable': {'properties': {
+                'min_instances': 2, 'max_instances': 5}}}
+        self.topology.invalidate()
+        replicas = self.topology.replicas('server')
+        self.assertEqual(replicas.bounds, (2, 5))
+        self.assertEqual(len(replicas), 2)
+        replicas.scale_out(3)
+        self.assertRaises(ValueError, replicas.scale_out)
+        self.assertRaises(ValueError, replicas.scale, 1)
+        self.assertEqual(len(replicas), 5)
+        self.assertEqual(
+            self.topology.get_template('webserver').replicas.bounds,
+            (0, None))
+
+    def test_replica_instances(self):
+        replicas = self.topology.get_template('webserver').scale(2)
+        instance = Instance.for_template(replicas[1], replicas[1].id)
+        self.assertEqual(instance.id, 'webserver-1')
+        self.assertEqual(instance.template, 'webserver')
+        self.assertEqual(instance.type, 'tosca.nodes.WebServer')
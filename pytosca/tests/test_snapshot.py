@@ -0,0 +1,123 @@
+# Copyright 2014-2015 Kapil Thangavelu <kapil.foss@gmail.com>
+#
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import logging
+import os
+import shutil
+import tempfile
+
+from pytosca import tosca
+from pytosca.snapshot import Snapshot, SnapshotError
+from pytosca.tests.test_tosca import BaseTest, TEST_DATA
+
+
+class TestSnapshot(BaseTest):
+
+    def setUp(self):
+        super(TestSnapshot, self).setUp()
+        self.log_output = self.capture_logging(
+            'tosca.model', level=logging.DEBUG)
+        self.topology = tosca.Tosca.load(
+            os.path.join(TEST_DATA, 'tosca_single_instance_wordpress.yaml'))
+        self.topology.bind_inputs(
+            {'cpus': 2, 'db_name': 'blog', 'db_user': 'wpadmin',
+             'db_pwd': 'secret', 'db_root_pwd': 'supersecret',
+             'db_port': 3107})
+
+    def reload(self):
+        return Snapshot.loads(self.topology.snapshot().dumps())
+
+    def test_matches_topology(self):
+        snapshot = self.reload()
+        self.assertEqual(snapshot.tosca_version, 'tosca_simple_1.0')
+        self.assertEqual(
+            sorted(n.name for n in snapshot.nodetemplates),
+            sorted(n.name for n in self.topology.nodetemplates))
+        for node in self.topology.nodetemplates:
+            frozen = snapshot.get_template(node.name)
+            self.assertEqual(frozen.tosca_name, node.tosca_name)
+            self.assertEqual(
+                dict((p.name, p.value) for p in frozen.properties),
+                dict((p.name, p.value) for p in node.properties))
+            self.assertEqual(
+                [(r.name, r.target and r.target.name)
+                 for r in frozen.requirements],
+                [(r.name, r.target and r.target.name)
+                 for r in node.requirements])
+            self.assertEqual(
+                [(op.name, op.implementation) for op in frozen.interfaces],
+                [(op.name, op.implementation) for op in node.interfaces])
+        self.assertEqual(snapshot.get_template('nope'), None)
+
+    def test_resolved_values(self):
+        snapshot = self.reload()
+        server = snapshot.get_template('server')
+        self.assertEqual(server.get_property('num_cpus').value, 2)
+        self.assertTrue(server.derives_from('Compute'))
+        self.assertFalse(server.derives_from('tosca.nodes.Database'))
+
+        db = snapshot.get_template('mysql_database')
+        self.assertEqual(
+            db.get_capability('database_endpoint').get_property(
+                'port').value, 3107)
+
+        wordpress = snapshot.get_template('wordpress')
+        self.assertTrue(wordpress.derives_from('tosca.nodes.WebApplication'))
+        requirements = dict((r.name, r) for r in wordpress.requirements)
+        self.assertEqual(
+            requirements['host'].tosca_name, 'tosca.relationships.HostedOn')
+        self.assertIs(requirements['host'].target,
+                      snapshot.get_template('webserver'))
+        self.assertEqual(requirements['dependency'].target, None)
+        configure = [
+            op for op in wordpress.interfaces if op.name == 'configure'][0]
+        self.assertEqual(configure.implementation, 'wordpress_configure.sh')
+        self.assertEqual(configure.get_property('db_password').value, 'secret')
+        self.assertEqual(configure.get_property('db_port').value, 3107)
+
+        self.assertEqual(snapshot.get_input('db_user').value, 'wpadmin')
+        output = snapshot.get_output('website_url')
+        self.assertEqual(output.description, 'URL for Wordpress wiki.')
+        self.assertEqual(output.value, None)
+
+    def test_dump_load(self):
+        path = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, path)
+        snapshot_path = os.path.join(path, 'wordpress.snapshot')
+        self.topology.snapshot().dump(snapshot_path)
+        snapshot = Snapshot.load(snapshot_path)
+        self.assertEqual(
+            snapshot.get_template('server').get_property('os_type').value,
+            'Linux')
+        self.assertEqual(os.listdir(path), ['wordpress.snapshot'])
+
+    def test_dump_mode(self):
+        path = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, path)
+        snapshot_path = os.path.join(path, 'wordpress.snapshot')
+        self.addCleanup(os.umask, os.umask(0o027))
+        self.topology.snapshot().dump(snapshot_path)
+        self.assertEqual(os.stat(snapshot_path).st_mode & 0o777, 0o640)
+
+    def test_invalid(self):
+        content = self.topology.snapshot().dumps()
+        self.assertRaises(SnapshotError, Snapshot.loads, "garbage")
+        self.assertRaises(
+            SnapshotError, Snapshot.loads,
+            content.replace('"format": 1', '"format": 0', 1))
+        self.assertRaises(
+            SnapshotError, Snapshot.loads,
+            content.replace('supersecret', 'notsecret', 1))
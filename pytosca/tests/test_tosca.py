@@ -14,12 +14,20 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import contextlib
+import copy
+import datetime
 import logging
 import inspect
 import StringIO
 import os
+import shutil
+import subprocess
+import sys
+import tempfile
 
 from pytosca import tosca
+from pytosca.cache import SchemaCache
 from unittest import TestCase
 
 
@@ -29,6 +37,18 @@ TEST_DATA = os.path.join(
 
 class BaseTest(TestCase):
 
+    def setUp(self):
+        # Keep schema and import caches out of the user's home.
+        cache_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, cache_dir)
+        self.set_environ(PYTOSCA_CACHE_DIR=cache_dir)
+
+    def set_environ(self, **values):
+        environ = dict(os.environ)
+        self.addCleanup(os.environ.update, environ)
+        self.addCleanup(os.environ.clear)
+        os.environ.update(values)
+
     def capture_logging(self, name="", level=logging.INFO,
                         log_file=None, formatter=None):
         if log_file is None:
@@ -48,9 +68,63 @@ class BaseTest(TestCase):
         return log_file
 
 
+class TestTopologicalSort(BaseTest):
+
+    def test_sort_deterministic(self):
+        graph = {'c': ['a'], 'b': ['a'], 'a': [], 'd': ['b', 'c', 'x']}
+        self.assertEqual(
+            tosca.topological_sort(graph),
+            [('a', []), ('b', ['a']), ('c', ['a']), ('d', ['b', 'c', 'x'])])
+
+    def test_levels(self):
+        graph = {'web': ['server'], 'db': ['dbms'], 'dbms': ['server'],
+                 'server': [], 'app': ['web', 'db'], 'lb': []}
+        self.assertEqual(
+            tosca.topological_levels(graph),
+            [['lb', 'server'], ['dbms', 'web'], ['db'], ['app']])
+
+    def test_cycle_path(self):
+        graph = {'a': ['b'], 'b': ['c'], 'c': ['a'], 'd': ['a'], 'e': []}
+        try:
+            tosca.topological_sort(graph)
+        except tosca.CyclicDependencyError as e:
+            self.assertEqual(e.cycle, ['a', 'b', 'c', 'a'])
+            self.assertTrue('a -> b -> c -> a' in str(e))
+        else:
+            self.fail("cycle not detected")
+        self.assertRaises(
+            RuntimeError, tosca.topological_sort, {'a': ['a']})
+
+
+class TestMerge(BaseTest):
+
+    def test_merge(self):
+        self.assertEqual(
+            tosca.merge({'a': 1}, {'b': 2, 'c': 2}),
+            {'a': 1, 'b': 2, 'c': 2})
+        self.assertEqual(
+            tosca.merge([{'host': 'Compute'}], [{'db': 'Database'}]),
+            [{'db': 'Database'}, {'host': 'Compute'}])
+        self.assertEqual(tosca.merge(None, {'b': 2}), {'b': 2})
+        self.assertEqual(tosca.merge({'a': 1}, None), {'a': 1})
+        self.assertEqual(tosca.merge(['a'], None), ['a'])
+        self.assertEqual(tosca.merge(['a'], {'b': 2}), {'b': 2})
+
+    def test_no_mutation(self):
+        for x, y in (({'a': 1, 'b': 1}, {'b': 2}),
+                     (['a'], ['b']),
+                     ({'a': 1}, None),
+                     (['a'], None)):
+            x_copy, y_copy = copy.deepcopy(x), copy.deepcopy(y)
+            merged = tosca.merge(x, y)
+            self.assertEqual((x, y), (x_copy, y_copy))
+            self.assertFalse(merged is x or merged is y)
+
+
 class TestTypeHierarchy(BaseTest):
 
     def setUp(self):
+        super(TestTypeHierarchy, self).setUp()
         self.log_output = self.capture_logging(
             'tosca.model', level=logging.DEBUG)
         self.types = tosca.TypeHierarchy()
@@ -83,9 +157,95 @@ class TestTypeHierarchy(BaseTest):
         self.assertEqual(
             ops.get_property('db_password').value, None)
 
+    def test_qualified_lookup(self):
+        compute = self.types.get('tosca.nodes.Compute')
+        self.assertTrue(self.types.get('Compute') is compute)
+        self.assertTrue(
+            self.types.get('tosca.nodes.Compute', qualified=True) is compute)
+        self.assertEqual(self.types.get('Compute', qualified=True), None)
+        self.assertTrue(self.types.get('Root') is self.types.get(
+            'tosca.nodes.Root'))
+        self.assertTrue(
+            self.types.get('Root', types='relations') is
+            self.types.get('tosca.relationships.Root'))
+        self.assertEqual(self.types.get('Compute', types='relations'), None)
+
+    def test_name_collisions(self):
+        types = tosca.TypeHierarchy(parent=self.types)
+        types.load_nodes(['acme.nodes.Compute', 'acme.nodes.Database'], {
+            'acme.nodes.Compute': {'derived_from': 'tosca.nodes.Compute'},
+            'acme.nodes.Database': {'derived_from': 'tosca.nodes.Database'}})
+        self.assertEqual(types.collisions(), {})
+        # Overlay types shadow short names of their parent's
+        self.assertEqual(
+            types.get('Compute').tosca_name, 'acme.nodes.Compute')
+        types.load_nodes(['other.nodes.Compute'], {
+            'other.nodes.Compute': {'derived_from': 'tosca.nodes.Compute'}})
+        self.assertEqual(
+            types.collisions(),
+            {('nodes', 'Compute'): ['acme.nodes.Compute',
+                                    'other.nodes.Compute']})
+        self.assertTrue('ambiguous' in self.log_output.getvalue())
+        self.assertRaises(ValueError, types.get, 'Compute')
+        self.assertEqual(
+            types.get('other.nodes.Compute').tosca_name,
+            'other.nodes.Compute')
+
+    def test_subclasses(self):
+        self.assertEqual(
+            [c.tosca_name for c in self.types.subclasses('DBMS')], [])
+        self.assertEqual(
+            [c.tosca_name for c in self.types.subclasses(
+                'tosca.relationships.DependsOn')],
+            ['tosca.relations.ConnectsTo', 'tosca.relationships.HostedOn'])
+        types = tosca.TypeHierarchy(parent=self.types)
+        types.load_nodes(['acme.nodes.MySQL'], {
+            'acme.nodes.MySQL': {'derived_from': 'tosca.nodes.DBMS'}})
+        software = types.subclasses(types.get('SoftwareComponent'))
+        self.assertEqual(
+            [c.tosca_name for c in software],
+            ['acme.nodes.MySQL', 'tosca.nodes.DBMS', 'tosca.nodes.WebServer'])
+        self.assertTrue(all(
+            issubclass(c, types.get('SoftwareComponent')) for c in software))
+
+
+class TestConstraints(BaseTest):
+
+    def setUp(self):
+        super(TestConstraints, self).setUp()
+        self.log_output = self.capture_logging(
+            'tosca.model', level=logging.DEBUG)
+
+    def test_compiled_checks(self):
+        validator = tosca.Constraint.compile_all([
+            {'greater_or_equal': 1}, {'less_or_equal': 65535}])
+        self.assertEqual(validator(80), [])
+        self.assertEqual(validator(0), [('greater_or_equal', 1)])
+        self.assertEqual(
+            tosca.Constraint.compile_all([{'in_range': [0.5, 1.5]}])(1.25),
+            [])
+        self.assertEqual(
+            tosca.Constraint.compile_all([{'valid_values': [1, 2]}])([1]),
+            [('valid_values', [1, 2])])
+        pattern = tosca.Constraint.compile_all([{'pattern': '[a-z]+$'}])
+        self.assertEqual(pattern('abc'), [])
+        self.assertEqual(pattern(42), [('pattern', '[a-z]+$')])
+        self.assertTrue(tosca.Constraint.validate('max_length', 2, 'ab'))
+
+    def test_validators_compiled_on_type_load(self):
+        types = tosca.TypeHierarchy()
+        types.load_schema(tosca.Tosca.schema_path, cache=False)
+        compute = types.get('Compute')
+        self.assertEqual(
+            sorted(compute._validators), ['disk_size', 'mem_size', 'num_cpus'])
+        endpoint = types.get('Endpoint')
+        self.assertEqual(endpoint._validators['port'](70000),
+                         [('less_or_equal', 65535)])
+
 
 class TestComputeOnlyTosca(BaseTest):
     def setUp(self):
+        super(TestComputeOnlyTosca, self).setUp()
         self.log_output = self.capture_logging(
             'tosca.model', level=logging.DEBUG)
         self.topology = tosca.Tosca.load(
@@ -97,6 +257,13 @@ class TestComputeOnlyTosca(BaseTest):
         p = server.get_property('num_cpus')
         self.assertEqual(p.value, 4)
 
+    def test_property_constraint_validation(self):
+        self.topology.bind_inputs({'cpus': 0})
+        server = self.topology.get_template('my_server')
+        self.assertEqual(
+            server.validate(),
+            ["Property num_cpus value 0 violates greater_or_equal: 1"])
+
     def test_output_value_resolution(self):
         instance_ip = self.topology.get_output('instance_ip')
         self.assertEqual(instance_ip.value, None)
@@ -109,6 +276,7 @@ class TestComputeOnlyTosca(BaseTest):
 class TestWordpressMysqlTosca(BaseTest):
 
     def setUp(self):
+        super(TestWordpressMysqlTosca, self).setUp()
         self.log_output = self.capture_logging(
             'tosca.model', level=logging.DEBUG)
         self.topology = tosca.Tosca.load(
@@ -141,6 +309,52 @@ class TestWordpressMysqlTosca(BaseTest):
             set([r.name for r in wordpress.requirements]),
             set(['database_endpoint', 'dependency', 'host']))
 
+    def test_node_template_identity(self):
+        wordpress = self.topology.get_template('wordpress')
+        self.assertTrue(self.topology.get_template('wordpress') is wordpress)
+        self.assertTrue(
+            self.topology.nodetemplates is self.topology.nodetemplates)
+        self.assertTrue(wordpress in self.topology.nodetemplates)
+        for r in wordpress.requirements:
+            if r.name == 'host':
+                self.assertTrue(
+                    r.target is self.topology.get_template('webserver'))
+
+    def test_node_template_invalidation(self):
+        wordpress = self.topology.get_template('wordpress')
+        self.topology.data['node_templates']['wordpress'] = dict(
+            wordpress.data)
+        self.assertFalse(self.topology.get_template('wordpress') is wordpress)
+        wordpress = self.topology.get_template('wordpress')
+        self.assertTrue(wordpress in self.topology.nodetemplates)
+
+        # Replaced without get_template() being called for it.
+        self.topology.data['node_templates']['wordpress'] = dict(
+            wordpress.data)
+        nodes = self.topology.nodetemplates
+        self.assertFalse(wordpress in nodes)
+        self.assertTrue(self.topology.get_template('wordpress') in nodes)
+        self.topology.data['node_templates']['cache'] = {
+            'type': 'tosca.nodes.SoftwareComponent'}
+        self.assertTrue(self.topology.get_template('cache') in
+                        self.topology.nodetemplates)
+
+        wordpress = self.topology.get_template('wordpress')
+        self.topology.invalidate()
+        self.assertFalse(self.topology.get_template('wordpress') is wordpress)
+
+    def test_node_requirement_relation_type(self):
+        wordpress = self.topology.get_template('wordpress')
+        wordpress.data['requirements'].append(
+            {'dependency': 'server', 'relation_type': 'ConnectsTo'})
+        relations = dict((r.name, r) for r in wordpress.requirements)
+        self.assertTrue(isinstance(
+            relations['dependency'], self.topology.types.get('ConnectsTo')))
+        self.assertTrue(relations['dependency'].target is
+                        self.topology.get_template('server'))
+        self.assertTrue(isinstance(
+            relations['host'], self.topology.types.get('HostedOn')))
+
     def test_node_requirements_resolution(self):
         wordpress = self.topology.get_template('wordpress')
         req_map = dict([
@@ -178,10 +392,74 @@ class TestWordpressMysqlTosca(BaseTest):
         self.assertEqual(
             endpoint.get_property('port').value, 3107)
 
+    def test_runtime_objects_slotted(self):
+        wordpress = self.topology.get_template('wordpress')
+        objects = [wordpress, self.topology.get_input('cpus'),
+                   self.topology.get_output('website_url')]
+        objects.extend(wordpress.properties)
+        objects.extend(wordpress.requirements)
+        objects.extend(wordpress.capabilities)
+        objects.extend(wordpress.interfaces)
+        for o in objects:
+            self.assertFalse(hasattr(o, '__dict__'), o)
+
+
+class TestPropertyValueCache(BaseTest):
+
+    def setUp(self):
+        super(TestPropertyValueCache, self).setUp()
+        self.log_output = self.capture_logging(
+            'tosca.model', level=logging.DEBUG)
+        self.topology = tosca.Tosca.load(
+            os.path.join(TEST_DATA, 'tosca_single_instance_wordpress.yaml'))
+        self.resolved = []
+        original = tosca.ValueResolver.resolve
+
+        def resolve(property, value):
+            self.resolved.append((property.parent.name, property.name))
+            return original(property, value)
+        tosca.ValueResolver.resolve = staticmethod(resolve)
+        self.addCleanup(
+            setattr, tosca.ValueResolver, 'resolve', staticmethod(original))
+
+    def get_operation_input(self, name):
+        wordpress = self.topology.get_template('wordpress')
+        ops = [i for i in wordpress.interfaces if i.name == 'configure']
+        return ops[0].get_property(name)
+
+    def test_value_memoized(self):
+        self.topology.bind_inputs({'db_user': 'wpadmin', 'db_name': 'blog'})
+        self.assertEqual(self.get_operation_input('db_user').value, 'wpadmin')
+        self.assertEqual(self.get_operation_input('db_name').value, 'blog')
+        count = len(self.resolved)
+        self.assertEqual(self.get_operation_input('db_user').value, 'wpadmin')
+        self.assertEqual(self.get_operation_input('db_name').value, 'blog')
+        self.assertEqual(len(self.resolved), count)
+
+    def test_bind_inputs_invalidates_dependents(self):
+        db = self.topology.get_template('mysql_database')
+        self.assertEqual(db.get_property('db_user').value, None)
+        self.assertEqual(db.get_property('db_name').value, None)
+        self.topology.bind_inputs({'db_user': 'wpadmin'})
+        del self.resolved[:]
+        self.assertEqual(db.get_property('db_user').value, 'wpadmin')
+        self.assertEqual(db.get_property('db_name').value, None)
+        self.assertEqual(self.resolved, [('mysql_database', 'db_user')])
+
+    def test_literal_change_detected(self):
+        self.topology.bind_inputs({'cpus': 2})
+        server = self.topology.get_template('server')
+        server.data['properties']['ip_address'] = {
+            'get_property': ['server', 'os_type']}
+        self.assertEqual(server.get_property('ip_address').value, 'Linux')
+        server.data['properties']['os_type'] = 'Windows'
+        self.assertEqual(server.get_property('ip_address').value, 'Windows')
+
 
 class TestMongoNode(BaseTest):
 
     def setUp(self):
+        super(TestMongoNode, self).setUp()
         self.log_output = self.capture_logging(
             'tosca.model', level=logging.DEBUG)
         self.topology = tosca.Tosca.load(
@@ -193,3 +471,151 @@ class TestMongoNode(BaseTest):
                 nt.name for nt in self.topology.nodetemplates]),
             ['app', 'app_server', 'mongo_db',
              'mongo_dbms', 'mongo_server'])
+
+    def test_requirement_slots(self):
+        dbms = self.topology.types.get('tosca.nodes.DBMS.MongoDB')
+        self.assertEqual(
+            [(s.name, s.target) for s in dbms._requirement_slots],
+            [('host', 'tosca.nodes.Compute'),
+             ('dependency', 'tosca.capabilties.Feature')])
+        host, dependency = dbms._requirement_slots
+        self.assertTrue(
+            host.relation is self.topology.types.get('HostedOn'))
+        self.assertEqual((host.lower_bound, host.upper_bound), (1, 1))
+        self.assertEqual(
+            (dependency.lower_bound, dependency.upper_bound),
+            (0, 'unbounded'))
+        self.assertEqual(
+            host.constraints['os_distribution']('Fedora'),
+            [('valid_values', ['Ubuntu'])])
+
+
+class TestSharedTypeHierarchy(BaseTest):
+
+    def setUp(self):
+        super(TestSharedTypeHierarchy, self).setUp()
+        self.log_output = self.capture_logging(
+            'tosca.model', level=logging.DEBUG)
+
+    def test_normative_types_shared(self):
+        t1 = tosca.Tosca.load(
+            os.path.join(TEST_DATA, 'tosca_compute_only.yaml'))
+        t2 = tosca.Tosca.load(
+            os.path.join(TEST_DATA, 'mongo-node.yaml'))
+        self.assertTrue(t1.types.parent is t2.types.parent)
+        self.assertTrue(
+            t1.types.get('Compute') is t2.types.get('Compute'))
+        self.assertTrue(t1.types.parent.frozen)
+        self.assertRaises(
+            RuntimeError, t1.types.parent.load_nodes, [], {})
+
+    def test_template_types_in_overlay(self):
+        topology = tosca.Tosca.load(
+            os.path.join(TEST_DATA, 'mongo-node.yaml'))
+        self.assertTrue('tosca.nodes.Nodejs' in topology.types.nodes)
+        self.assertFalse('tosca.nodes.Nodejs' in topology.types.parent.nodes)
+        mongo = topology.types.get('tosca.nodes.Database.MongoDB')
+        self.assertTrue(issubclass(
+            mongo, topology.types.get('tosca.nodes.Database')))
+        self.assertTrue(mongo.types is topology.types)
+
+    def test_warmup(self):
+        types = tosca.warmup()
+        self.assertTrue(types is tosca.TypeHierarchy.shared(
+            tosca.Tosca.schema_path))
+        self.assertEqual(types._pending, {})
+        self.assertTrue('tosca.relationships.HostedOn' in types.relations)
+
+    def test_import_defers_yaml(self):
+        self.assertEqual(subprocess.call([
+            sys.executable, '-c',
+            "import sys, pytosca.tosca; sys.exit('yaml' in sys.modules)"]),
+            0)
+        self.assertEqual(subprocess.call([
+            sys.executable, '-c',
+            "import sys, pytosca.graph, pytosca.query, pytosca.snapshot;"
+            " sys.exit('yaml' in sys.modules)"]),
+            0)
+
+
+class TestSchemaCache(BaseTest):
+
+    def setUp(self):
+        super(TestSchemaCache, self).setUp()
+        self.log_output = self.capture_logging(
+            'tosca.model', level=logging.DEBUG)
+        self.cache = SchemaCache(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.cache.path)
+
+    def test_cached_schema_matches_parsed(self):
+        parsed = tosca.TypeHierarchy()
+        parsed.load_schema(tosca.Tosca.schema_path, cache=self.cache)
+        self.assertEqual(len(os.listdir(self.cache.path)), 1)
+        # Types are built on first use with or without a cache entry.
+        self.assertEqual(parsed.nodes, {})
+        parsed.warmup()
+
+        cached = tosca.TypeHierarchy()
+        with mock_yaml_load() as calls:
+            cached.load_schema(tosca.Tosca.schema_path, cache=self.cache)
+        self.assertEqual(calls, [])
+        self.assertEqual(cached.nodes, {})
+        wordpress = cached.get('WordPress')
+        self.assertTrue(issubclass(wordpress, cached.get('WebApplication')))
+        self.assertEqual(
+            wordpress._properties, parsed.get('WordPress')._properties)
+        self.assertTrue(wordpress.types is cached)
+        self.assertFalse('tosca.nodes.DBMS' in cached.nodes)
+        cached.warmup()
+        self.assertEqual(sorted(parsed.nodes), sorted(cached.nodes))
+        self.assertTrue(cached.get('WordPress') is wordpress)
+
+    def test_cache_keyed_by_content(self):
+        self.assertNotEqual(
+            self.cache.key("tosca.nodes.Root: {}"),
+            self.cache.key("tosca.nodes.Root: {}\n"))
+        self.assertEqual(self.cache.get("tosca.nodes.Root: {}"), None)
+
+    def test_entries_stored_as_json(self):
+        cache = SchemaCache(os.path.join(self.cache.path, 'sub'))
+        compiled = [('nodes', 'a.B', None, {'x': [1, u'caf\xe9', 'y']})]
+        cache.put("content", compiled)
+        self.assertEqual(os.stat(cache.path).st_mode & 0o777, 0o700)
+        self.assertEqual(
+            cache.get("content"),
+            [['nodes', 'a.B', None, {'x': [1, u'caf\xe9', 'y']}]])
+        self.assertTrue(isinstance(cache.get("content")[0][1], str))
+        with open(cache._entry_path("content")) as fh:
+            self.assertEqual(fh.read()[:2], '[[')
+
+        cache.put("dates", [{'when': datetime.date(2014, 1, 1)}])
+        cache.put("keys", [{1: 'one'}])
+        self.assertEqual(cache.get("dates"), None)
+        self.assertEqual(cache.get("keys"), None)
+
+    def test_compile_schema(self):
+        tosca.TypeHierarchy.compile_schema(
+            tosca.Tosca.schema_path, cache=self.cache)
+        with open(tosca.Tosca.schema_path, 'rb') as fh:
+            compiled = self.cache.get(fh.read())
+        names = [e[1] for e in compiled if e[0] == 'nodes']
+        self.assertTrue(
+            names.index('tosca.nodes.Root') <
+            names.index('tosca.nodes.WebApplication.WordPress'))
+        self.cache.clear()
+        self.assertEqual(os.listdir(self.cache.path), [])
+
+
+@contextlib.contextmanager
+def mock_yaml_load():
+    calls = []
+    original = tosca.yaml_load
+
+    def yaml_load(content):
+        calls.append(content)
+        return original(content)
+    tosca.yaml_load = yaml_load
+    try:
+        yield calls
+    finally:
+        tosca.yaml_load = original
@@ -0,0 +1,96 @@
+# Copyright 2014-2015 Kapil Thangavelu <kapil.foss@gmail.com>
+#
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import json
+import logging
+import os
+import shutil
+import tempfile
+
+from pytosca import trace, tosca
+from pytosca.cache import SchemaCache
+from pytosca.tests.test_tosca import BaseTest, TEST_DATA
+
+WORDPRESS = os.path.join(TEST_DATA, 'tosca_single_instance_wordpress.yaml')
+
+
+class TestTrace(BaseTest):
+
+    def setUp(self):
+        super(TestTrace, self).setUp()
+        self.log_output = self.capture_logging(
+            'tosca.model', level=logging.DEBUG)
+        self.addCleanup(trace.disable)
+
+    def test_disabled_noop(self):
+        self.assertFalse(trace.enabled())
+        with trace.span('topology.load'):
+            trace.count('template.create')
+        tosca.Tosca.load(WORDPRESS).nodetemplates
+        self.assertEqual(trace.stats(), {'counters': {}, 'timers': {}})
+        self.assertRaises(RuntimeError, trace.export_chrome, 'trace.json')
+
+    def test_phase_stats(self):
+        trace.enable()
+        topology = tosca.Tosca.load(WORDPRESS)
+        topology.bind_inputs({'cpus': 2})
+        for node in topology.nodetemplates:
+            node.validate()
+        topology.get_template('wordpress').validate()
+        server = topology.get_template('server')
+        self.assertEqual(server.get_property('num_cpus').value, 2)
+        stats = trace.stats()
+        self.assertEqual(stats['counters']['template.create'], 5)
+        self.assertTrue(stats['counters']['property.cache_hit'] > 0)
+        self.assertTrue(stats['counters']['property.cache_miss'] > 0)
+        for name in ('topology.load', 'yaml.parse', 'property.resolve'):
+            self.assertTrue(stats['timers'][name]['count'] >= 1, name)
+        self.assertEqual(stats['timers']['node.validate']['count'], 6)
+        self.assertTrue(
+            stats['timers']['topology.load']['total'] >=
+            stats['timers']['yaml.parse']['total'])
+
+    def test_schema_cache_counters(self):
+        cache = SchemaCache(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, cache.path)
+        trace.enable(events=False)
+        tosca.TypeHierarchy().load_schema(tosca.Tosca.schema_path, cache)
+        types = tosca.TypeHierarchy()
+        types.load_schema(tosca.Tosca.schema_path, cache)
+        types.get('WordPress')
+        stats = trace.stats()
+        self.assertEqual(stats['counters']['schema.cache_miss'], 1)
+        self.assertEqual(stats['counters']['schema.cache_hit'], 1)
+        self.assertEqual(stats['timers']['schema.load']['count'], 2)
+        self.assertTrue(stats['timers']['types.derive']['count'] > 1)
+
+    def test_export_chrome(self):
+        tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmp)
+        path = os.path.join(tmp, 'trace.json')
+        trace.enable()
+        tosca.Tosca.load(WORDPRESS).nodetemplates
+        trace.export_chrome(path)
+        with open(path) as fh:
+            events = json.load(fh)['traceEvents']
+        spans = [e for e in events if e['ph'] == 'X']
+        self.assertTrue(
+            [e for e in spans if e['name'] == 'topology.load' and
+             e['args'] == {'path': WORDPRESS}])
+        self.assertTrue(all(e['dur'] >= 0 for e in spans))
+        self.assertEqual(
+            [e['args']['value'] for e in events
+             if e['ph'] == 'C' and e['name'] == 'template.create'], [5])
@@ -15,15 +15,12 @@
 #    under the License.
 
 import logging
-import operator
 import os
 import re
-import yaml
+import threading
 
-try:
-    from yaml import CSafeLoader as Loader
-except ImportError:
-    from yaml import SafeLoader as Loader
+from pytosca import trace
+from pytosca.cache import SchemaCache
 
 
 log = logging.getLogger("tosca.model")
@@ -34,63 +31,225 @@ ENTITY_TYPE_MAP = dict(zip(
     ENTITY_KINDS,
     ('node_types', 'capability_types', 'relation_types', '')))
 
+PROPERTY_SCHEMA_KEYS = ('description', 'required', 'constraints', 'default')
+
+REQUIREMENT_KEYS = frozenset((
+    'interfaces', 'relationship_type', 'relation_type', 'derived_from',
+    'constraints', 'lower_bound', 'upper_bound', 'type'))
+
+_Loader = None
+
+
+def yaml_loader():
+    """Return the yaml loader class, importing yaml on first use.
+    """
+    global _Loader
+    if _Loader is None:
+        try:
+            from yaml import CSafeLoader as _Loader
+        except ImportError:
+            from yaml import SafeLoader as _Loader
+    return _Loader
+
 
 def yaml_load(content):
-    return yaml.load(content, Loader=Loader)
+    import yaml
+    with trace.span('yaml.parse'):
+        return yaml.load(content, Loader=yaml_loader())
+
+
+class CyclicDependencyError(RuntimeError):
+    """Raised when a dependency graph contains a cycle.
+
+    The offending path is available as `cycle`, starting and ending
+    with the same node.
+    """
+
+    def __init__(self, cycle):
+        self.cycle = cycle
+        super(CyclicDependencyError, self).__init__(
+            "A cyclic dependency occurred: %s" % (
+                " -> ".join(map(str, cycle))))
 
 
 def topological_sort(graph_unsorted):
-    """Return sorted nodes. http://bit.ly/1kewbsu
+    """Return sorted nodes, dependencies before their dependents.
+
+    The graph maps each node to the nodes it depends on, edges to
+    nodes outside the graph are ignored. Returns a list of (node, edges)
+    in a deterministic order, nodes with no ordering constraint between
+    them are sorted by name. Runs in O(V+E), excluding the initial sort.
     """
     graph_sorted = []
     graph_unsorted = dict(graph_unsorted)
-    while graph_unsorted:
-        acyclic = False
-        for node, edges in graph_unsorted.items():
-            for edge in edges:
-                if edge in graph_unsorted:
-                    break
-            else:
-                acyclic = True
-                del graph_unsorted[node]
-                graph_sorted.append((node, edges))
-        if not acyclic:
-            raise RuntimeError("A cyclic dependency occurred")
+    for level in topological_levels(graph_unsorted):
+        graph_sorted.extend([(n, graph_unsorted[n]) for n in level])
     return graph_sorted
 
 
+def topological_levels(graph):
+    """Return the graph's nodes as a list of levels.
+
+    Each level contains nodes whose dependencies are all in earlier
+    levels, so the nodes within a level are mutually independent and
+    may be processed concurrently.
+    """
+    dependents = {}
+    pending = {}
+    for node in sorted(graph):
+        deps = set(e for e in graph[node] if e in graph)
+        pending[node] = len(deps)
+        for d in deps:
+            dependents.setdefault(d, []).append(node)
+
+    levels = []
+    level = [n for n in sorted(graph) if not pending[n]]
+    while level:
+        levels.append(level)
+        next_level = []
+        for node in level:
+            for d in dependents.get(node, ()):
+                pending[d] -= 1
+                if not pending[d]:
+                    next_level.append(d)
+        next_level.sort()
+        level = next_level
+
+    if sum(map(len, levels)) != len(graph):
+        raise CyclicDependencyError(
+            _find_cycle(graph, set(n for n in graph if pending[n])))
+    return levels
+
+
+def _find_cycle(graph, remaining):
+    # Every remaining node has an unsatisfied dependency on another
+    # remaining node, so walking those edges must revisit a node.
+    node = min(remaining)
+    path = []
+    seen = {}
+    while node not in seen:
+        seen[node] = len(path)
+        path.append(node)
+        node = min(e for e in graph[node] if e in remaining)
+    return path[seen[node]:] + [node]
+
+
 def merge(x, y):
     """merge container types x and y, with y having precendence and return.
 
-    Only y is modified.
+    Neither x nor y is modified, as y is typically part of the template
+    data.
     """
     if x is None:
         return y
     elif y is None:
         if isinstance(x, list):
-            return list(y)
+            return list(x)
         elif isinstance(x, dict):
             return dict(x)
     elif type(x) != type(y):
         log.warning("Can't merge type values %s and %s" % (x, y))
         return y
     elif isinstance(y, dict):
-        y.update(x)
-        return y
+        merged = dict(y)
+        merged.update(x)
+        return merged
     else:
-        y.extend(x)
-        return y
+        return y + x
 
 
 def get_named_slot(req):
-    framework = set((
-        'interfaces', 'relationship_type', 'derived_from', 'constraints',
-        'lower_bound', 'upper_bound', 'type'))
-    keys = set(req.keys())
-    remainder = keys - framework
-    if len(remainder) != 1:
-        raise ValueError("Ambigious relation name %s" % (remainder))
-    return remainder.pop()
+    names = [k for k in req if k not in REQUIREMENT_KEYS]
+    if len(names) != 1:
+        raise ValueError("Ambigious relation name %s" % (set(names)))
+    return names[0]
+
+
+def get_template_requirements(data):
+    """Return a template's requirements as (slot name, requirement) pairs.
+
+    Requirements may be given either as a list of single slot mappings
+    or as a mapping of slot name to target.
+    """
+    reqs = data.get('requirements') or ()
+    if isinstance(reqs, dict):
+        return [(k, {k: v}) for k, v in reqs.items()]
+    return [(get_named_slot(r), r) for r in reqs]
+
+
+def get_relation_class(types, name, template_data):
+    """Return the relation class for a requirement slot of a template.
+    """
+    rel_type = template_data.get('relation_type')
+    if rel_type:
+        return types.get(rel_type, types=('relations',))
+    if name == 'host':
+        return types.get('HostedOn', types=('relations',))
+    elif name == 'dependency':
+        return types.get('DependsOn', types=('relations',))
+    else:
+        return types.get("ConnectsTo", types=('relations',))
+
+
+class RequirementSlot(object):
+    """A requirement declared by a node type.
+
+    Slots are computed once per node type, from its requirements
+    merged with those of its bases, where a derived type's declaration
+    of a slot overrides its base's.
+    """
+    __slots__ = ('name', 'data', 'target', 'lower_bound', 'upper_bound',
+                 'constraints', 'types', '_relation')
+
+    def __init__(self, name, data, types):
+        self.name = name
+        self.data = data
+        self.target = data[name]
+        self.lower_bound = data.get('lower_bound', 1)
+        self.upper_bound = data.get('upper_bound', 1)
+        constraints = data.get('constraints')
+        if not isinstance(constraints, dict):
+            constraints = {}
+        self.constraints = dict(
+            (k, Constraint.compile_all(v)) for k, v in constraints.items())
+        self.types = types
+        self._relation = None
+
+    @property
+    def relation(self):
+        """Relation class used for the slot if a template doesn't specify.
+        """
+        # Resolved on first use, as node types load before relations.
+        if self._relation is None:
+            self._relation = get_relation_class(self.types, self.name, {})
+        return self._relation
+
+    def __repr__(self):
+        return "<RequirementSlot %s: %s>" % (self.name, self.target)
+
+
+def requirement_slots(requirements, types):
+    slots = []
+    seen = set()
+    for req in requirements or ():
+        name = get_named_slot(req)
+        if name not in seen:
+            seen.add(name)
+            slots.append(RequirementSlot(name, req, types))
+    return tuple(slots)
+
+
+def short_name(name):
+    """Return the short name of a qualified type name.
+    """
+    return name.split('.')[-1]
+
+
+def type_names(cls):
+    """Return the tosca names of a type and its bases, most derived first.
+    """
+    return [c.tosca_name for c in cls.__mro__
+            if 'tosca_name' in c.__dict__]
 
 
 class TypeHierarchy(object):
@@ -103,98 +262,368 @@ class TypeHierarchy(object):
 
     The type hierarchy models all the entities to be utilized in
     a topology.
+
+    A hierarchy may be layered over a parent, in which case lookups
+    fall through to the parent and any types loaded are registered
+    only on the overlay. This allows the normative types to be loaded
+    once per process and shared by every topology, with each topology
+    carrying only its own template defined types.
+
+    Types loaded from compiled entries are kept pending and their
+    classes built on first lookup, so only the types a process uses
+    are built. `warmup` builds any that remain.
+
+    Types are indexed by both their qualified and short names. A short
+    name shared by types of the same kind can only be looked up by the
+    qualified names, see `collisions`.
     """
 
-    def __init__(self):
+    _shared = {}
+    _shared_lock = threading.Lock()
+
+    def __init__(self, parent=None):
+        self.parent = parent
+        self.frozen = False
         self.nodes = {}
         self.interfaces = {}
         self.relations = {}
         self.capabilities = {}
+        self._pending = {}
+        self._index = {}
+        self._derived = {}
+        self._collisions = {}
+        self._resolved = {}
+        self._build_lock = threading.RLock()
+
+    @classmethod
+    def shared(cls, resource):
+        """Return the process wide frozen hierarchy for a schema file.
+        """
+        types = cls._shared.get(resource)
+        if types is not None:
+            return types
+        with cls._shared_lock:
+            types = cls._shared.get(resource)
+            if types is None:
+                types = cls()
+                types.load_schema(resource)
+                types.freeze()
+                cls._shared[resource] = types
+        return types
+
+    def freeze(self):
+        self.frozen = True
+
+    def warmup(self):
+        """Build the classes of all pending types.
+        """
+        for kind, pending in self._pending.items():
+            for name in list(pending):
+                self._build(kind, name)
 
     def get(self, name, qualified=False, types=None):
+        """Return a type by its qualified or short name.
+
+        With `qualified` set, short names are not matched. `types` may
+        limit the lookup to one or more entity kinds, otherwise kinds
+        are searched in ENTITY_KINDS order, ie. 'Root' is the root node
+        type. Raises ValueError for a short name shared by several
+        types of the same kind.
+        """
+        if types is None:
+            types = ENTITY_KINDS
+        elif isinstance(types, basestring):
+            types = (types,)
+        elif not isinstance(types, tuple):
+            types = tuple(types)
+        key = (name, qualified, types)
+        cls = self._resolved.get(key)
+        if cls is not None:
+            return cls
+        found = self._find(name, types, qualified)
+        if found is None:
+            return None
+        cls = found[0]._get_type(found[1], found[2])
+        # Parents are normally frozen, else lookups can't be memoized
+        # as types registered on them don't clear this cache.
+        if self.parent is None or self.parent.frozen:
+            self._resolved[key] = cls
+        return cls
+
+    def subclasses(self, name, types=None):
+        """Return the types derived directly or indirectly from a type.
+
+        The type may be given by name or class. Types derived in this
+        hierarchy from those of its parents are included.
+        """
+        if not isinstance(name, basestring):
+            name = name.tosca_name
         if types is None:
             types = ENTITY_KINDS
         elif isinstance(types, basestring):
-            types = [types]
-        for t in types:
-            assert t in ENTITY_KINDS
-            tmap = getattr(self, t)
-            cls = tmap.get(name)
-            if cls is not None:
-                return cls
-            if not qualified:
-                cls = tmap.get(name)
-                if cls is not None:
-                    return cls
-
-    def load_schema(self, resource):
-        with open(resource) as fh:
-            data = yaml_load(fh.read())
+            types = (types,)
+        found = self._find(name, types)
+        if found is None:
+            return []
+        _, kind, base = found
+        result = []
+        seen = set()
+        bases = [base]
+        while bases:
+            base = bases.pop()
+            level = self
+            while level is not None:
+                for entry in level._derived.get(base, ()):
+                    if entry[0] == kind and entry[1] not in seen:
+                        seen.add(entry[1])
+                        bases.append(entry[1])
+                        result.append(self._lookup(kind, entry[1]))
+                level = level.parent
+        result.sort(key=lambda cls: cls.tosca_name)
+        return result
+
+    def collisions(self):
+        """Return the short names shared by types of the same kind.
+
+        Maps (kind, short name) to the sorted qualified names sharing
+        it, for this hierarchy and its parents.
+        """
+        collisions = {}
+        level = self
+        while level is not None:
+            for key, names in level._collisions.items():
+                collisions.setdefault(key, set()).update(names)
+            level = level.parent
+        return dict((k, sorted(v)) for k, v in collisions.items())
+
+    def _find(self, name, kinds, qualified=False):
+        """Find the hierarchy, kind and qualified name a name refers to.
+
+        Earlier kinds take precedence, then nearer hierarchies.
+        """
+        best = None
+        level = self
+        while level is not None:
+            for kind, qname in level._index.get(name, ()):
+                if kind not in kinds or (qualified and qname != name):
+                    continue
+                rank = kinds.index(kind)
+                if best is None or rank < best[0]:
+                    best = (rank, level, kind, [qname])
+                elif rank == best[0] and level is best[1]:
+                    best[3].append(qname)
+            level = level.parent
+        if best is None:
+            return None
+        _, level, kind, names = best
+        if len(names) > 1:
+            raise ValueError("Ambiguous %s type name %s, one of %s" % (
+                kind, name, ", ".join(sorted(names))))
+        return level, kind, names[0]
+
+    def _lookup(self, kind, name, default=None):
+        found = self._find(name, (kind,))
+        if found is None:
+            return default
+        return found[0]._get_type(kind, found[2])
+
+    def _get_type(self, kind, qualified):
+        cls = getattr(self, kind).get(qualified)
+        if cls is None:
+            cls = self._build(kind, qualified)
+        return cls
+
+    def _build(self, kind, qualified):
+        with self._build_lock:
+            pending = self._pending.get(kind, {})
+            if qualified not in pending:
+                # Built by another thread meanwhile.
+                return getattr(self, kind).get(qualified)
+            base_name, attrs = pending[qualified]
+            base = self._lookup(kind, base_name, TYPE_ROOTS[kind])
+            cls = self._add_type(kind, qualified, base, attrs)
+            del pending[qualified]
+            if not pending:
+                del self._pending[kind]
+            return cls
+
+    def _register(self, kind, name, base_name=None):
+        """Index a type by its qualified and short names.
+        """
+        entry = (kind, name)
+        if entry in self._index.get(name, ()):
+            return
+        self._resolved.clear()
+        self._index.setdefault(name, []).append(entry)
+        short = short_name(name)
+        if short != name:
+            entries = self._index.setdefault(short, [])
+            for other_kind, other in entries:
+                if other_kind == kind:
+                    log.warning(
+                        "Type name %s is ambiguous between %s and %s,"
+                        " use the qualified name", short, other, name)
+                    self._collisions.setdefault(
+                        (kind, short), set()).update((other, name))
+            entries.append(entry)
+        if base_name:
+            self._derived.setdefault(base_name, []).append(entry)
+
+    def _check_mutable(self):
+        if self.frozen:
+            raise RuntimeError("Type hierarchy is frozen")
+
+    def load_schema(self, resource, cache=True):
+        """Load the types defined in a schema file.
+
+        The processed types are stored in and loaded from an on disk
+        cache keyed by the file content. `cache` may be True for the
+        default SchemaCache, a SchemaCache instance, or False to always
+        parse the schema.
+        """
+        with trace.span('schema.load', {'resource': resource}):
+            with open(resource, 'rb') as fh:
+                content = fh.read()
+            if cache is True:
+                cache = SchemaCache.default()
+            compiled = cache and cache.get(content) or None
+            if compiled is not None:
+                trace.count('schema.cache_hit')
+                self.load_compiled(compiled)
+                return
+            if cache:
+                trace.count('schema.cache_miss')
+            compiled = self._compile(content)
+            self.load_compiled(compiled)
+            if cache:
+                cache.put(content, compiled)
+
+    @classmethod
+    def compile_schema(cls, resource, cache=None):
+        """Rebuild the on disk cache entry for a schema file.
+        """
+        if cache is None:
+            cache = SchemaCache.default()
+        with open(resource, 'rb') as fh:
+            content = fh.read()
+        cache.put(content, cls()._compile(content))
+
+    def _compile(self, content):
+        """Return the compiled entries of the types in schema content.
+
+        Entries are (kind, name, base name, class attributes) in load
+        order, with attributes already merged with the base type's. No
+        classes are built, see load_compiled().
+        """
+        data = yaml_load(content)
+        compiled = []
         # Process by group
         entity_keys = data.keys()
         for c in ENTITY_KINDS:
             group = [k for k in entity_keys if k.startswith('tosca.%s' % c)]
-            getattr(self, 'load_%s' % c)(group, data)
+            if c == 'interfaces':
+                compiled.extend(
+                    ('interfaces', n, None, data[n]) for n in group)
+            else:
+                compiled.extend(self._compile_types(c, group, data))
+        return compiled
 
-    def load_nodes(self, names, data):
+    def _compile_types(self, kind, names, data):
+        """Yield the compiled entries of type definitions of one kind.
+
+        Bases are looked up among the given definitions, then in the
+        hierarchy.
+        """
+        compiled = {}
         for n in self._derived_sort(names, data):
             type_info = data[n]
-            base = self.nodes.get(type_info.get('derived_from'), Node)
-
-            # Some basic validation of the type info
-            for t in type_info.get('capabilities', {}):
-                if not 'type' in t:
-                    log.warning('Malformed capability type %s %s', n, t)
-
-            cls = type(n.split(".")[-1], (base,), {
-                'types': self,
-                'tosca_name': n,
-                '_requirements': merge(
-                    base._requirements, type_info.get('requirements', [])),
-                '_interfaces': merge(
-                    base._interfaces, type_info.get('interfaces', [])),
-                '_properties': merge(
-                    base._properties, type_info.get('properties', {})),
-                '_capabilities': merge(
-                    base._capabilities, type_info.get('capabilities', {}))})
-            self.nodes[n] = cls
-            self.nodes[cls.__name__] = cls
+            base_name = type_info.get('derived_from')
+            base_attrs = compiled.get(base_name)
+            if base_attrs is None:
+                base = self._lookup(kind, base_name, TYPE_ROOTS[kind])
+                base_name = getattr(base, 'tosca_name', None)
+                base_attrs = dict(
+                    (attr, getattr(base, attr))
+                    for attr, _, _ in TYPE_ATTRS[kind])
+            if kind == 'nodes':
+                # Some basic validation of the type info
+                for t in type_info.get('capabilities', {}):
+                    if not 'type' in t:
+                        log.warning('Malformed capability type %s %s', n, t)
+            attrs = compiled[n] = dict(
+                (attr, merge(base_attrs[attr], type_info.get(key, empty())))
+                for attr, key, empty in TYPE_ATTRS[kind])
+            yield kind, n, base_name, attrs
+
+    def load_compiled(self, compiled):
+        """Load types from compiled entries.
+
+        Interfaces are added directly, other types are left pending
+        until first looked up.
+        """
+        self._check_mutable()
+        for kind, name, base_name, attrs in compiled:
+            if kind == 'interfaces':
+                self._add_interface(name, attrs)
+                continue
+            self._pending.setdefault(kind, {})[name] = (base_name, attrs)
+            self._register(kind, name, base_name)
+
+    def _add_type(self, kind, name, base, attrs):
+        with trace.span('types.derive', {'type': name}):
+            class_attrs = dict(attrs)
+            class_attrs.update(
+                {'types': self, 'tosca_name': name, '__slots__': ()})
+            if '_properties' in attrs:
+                class_attrs['_validators'] = compile_validators(
+                    attrs['_properties'])
+            if '_requirements' in attrs:
+                class_attrs['_requirement_slots'] = requirement_slots(
+                    attrs['_requirements'], self)
+            cls = type(short_name(name), (base,), class_attrs)
+        tmap = getattr(self, kind)
+        tmap[name] = cls
+        alias = tmap.get(cls.__name__)
+        if alias is None or alias.tosca_name != cls.__name__:
+            tmap[cls.__name__] = cls
+        base_name = getattr(base, 'tosca_name', None)
+        self._register(kind, name, base_name)
+        return cls
+
+    def _add_interface(self, name, data):
+        self.interfaces[name] = interface = InterfaceType(name, data)
+        self.interfaces[short_name(name)] = interface
+        self._register('interfaces', name)
+        return interface
+
+    def _load_types(self, kind, names, data):
+        self._check_mutable()
+        for _, name, base_name, attrs in self._compile_types(
+                kind, names, data):
+            base = self._lookup(kind, base_name, TYPE_ROOTS[kind])
+            self._add_type(kind, name, base, attrs)
+
+    def load_nodes(self, names, data):
+        self._load_types('nodes', names, data)
 
     def load_relations(self, names, data):
-        for n in self._derived_sort(names, data):
-            type_info = data[n]
-            base = self.relations.get(
-                type_info.get('derived_from'), Relation)
-            cls = type(n.split(".")[-1], (base,), {
-                'types': self,
-                'tosca_name': n,
-                '_valid_targets': merge(
-                    base._valid_targets, type_info.get('valid_targets', [])),
-                '_interfaces': merge(
-                    base._interfaces, type_info.get('interfaces', {}))})
-            self.relations[n] = cls
-            self.relations[cls.__name__] = cls
-
-        cls.type_interfaces = [InterfaceType(k, v) for k, v in data.items()]
+        self._load_types('relations', names, data)
 
     def load_capabilities(self, names, data):
-        for n in self._derived_sort(names, data):
-            type_info = data[n]
-            base = self.capabilities.get(
-                type_info.get('derived_from'), Capability)
-            cls = type(n.split(".")[-1], (base,), {
-                'types': self,
-                'tosca_name': n,
-                '_properties': merge(
-                    base._properties, type_info.get('properties', {}))})
-            self.capabilities[n] = cls
-            self.capabilities[cls.__name__] = cls
+        self._load_types('capabilities', names, data)
+
+    def load_definitions(self, data):
+        """Load the types defined in a template or imported document.
+        """
+        for k, v in ENTITY_TYPE_MAP.items():
+            if not v or not data.get(v):
+                continue
+            getattr(self, 'load_%s' % k)(data[v].keys(), data[v])
 
     def load_interfaces(self, names, data):
+        self._check_mutable()
         for n in names:
-            self.interfaces[n] = interface = InterfaceType(n, data[n])
-            self.interfaces[n.split('.')[-1]] = interface
-            interface.tosca_name = n
+            self._add_interface(n, data[n])
 
     def _derived_sort(self, names, data):
         graph = {}
@@ -213,6 +642,7 @@ class ValueResolver(object):
         if input is None:
             raise ValueError("Unknown input: %s in property %s" % (
                 input_name, self))
+        self.topology.track_read(input.attrs, 'value', input_name)
         return input.value
 
     @staticmethod
@@ -225,10 +655,11 @@ class ValueResolver(object):
         template = self.parent
         for req in template.requirements:
             if req.name == slot_name:
+                target = req.peek_target()
                 if not capability:
-                    p = req.target.get_property(property_name)
+                    p = target.get_property(property_name)
                     if p is not None:
-                        return p.value
+                        return ValueResolver.read(p)
                     raise ValueError(
                         ("Unknown property: %s referenced on: %s"
                          " via slot: %s from: %s") % (
@@ -237,11 +668,10 @@ class ValueResolver(object):
                              slot_name,
                              "%s.%s" % (template.name, self.name)))
 
-                for c in req.target.capabilities:
-                    if c.name == capability:
-                        for p in c.properties:
-                            if p.name == property_name:
-                                return p.value
+                c = target.get_capability(capability)
+                p = c and c.get_property(property_name)
+                if p is not None:
+                    return ValueResolver.read(p)
                 raise ValueError(
                     ("Unknown capability property %s referenced on %s"
                      " via slot: %s from %s") % (
@@ -255,17 +685,29 @@ class ValueResolver(object):
 
     @staticmethod
     def get_property(self, entity_name, property_name):
-        entity = self.topology.get_template(entity_name)
+        entity = self.topology.peek_template(entity_name)
         if entity is None:
             raise ValueError(
                 "Unknown entity: %s in property %s" % (
                     entity_name, self))
-        for p in entity.properties:
-            if p.name == property_name:
-                return p.value
+        p = entity.get_property(property_name)
+        if p is not None:
+            return ValueResolver.read(p)
         raise ValueError("Unknown entity property: %s, %s in property %s" % (
             entity_name, property_name, self))
 
+    @staticmethod
+    def read(property):
+        """Return a property's value, recording literal values read.
+        """
+        container = property.parent
+        if not isinstance(property._value, dict) and (
+                property.topology is not None) and (
+                isinstance(container.data, dict)):
+            property.topology.track_property(
+                container.data, container._property_key, property.name)
+        return property.value
+
     @staticmethod
     def resolve(property, value):
         if 'get_input' in value:
@@ -284,6 +726,9 @@ class ValueResolver(object):
 
 class Property(object):
 
+    __slots__ = ('name', 'required', 'type', 'constraints', 'description',
+                 'default', 'topology', '_value', '_parent', '_validator')
+
     def __init__(self, name, type, description="",
                  required=False, constraints=None,
                  default=None, topology=None, value=None):
@@ -294,14 +739,17 @@ class Property(object):
         self.description = description
         self.default = default
         self.topology = topology
-        self._value = value or self.default
+        self._value = self.default if value is None else value
         self._parent = None
+        self._validator = None
 
     @property
     def value(self):
         if not isinstance(self._value, dict):
             return self._value
-        return ValueResolver.resolve(self, self._value)
+        if self.topology is None:
+            return ValueResolver.resolve(self, self._value)
+        return self.topology.resolve_property(self)
 
     @property
     def parent(self):
@@ -310,35 +758,131 @@ class Property(object):
     def set_parent(self, parent):
         self._parent = parent
 
+    def validate(self):
+        if not self.constraints:
+            return []
+        try:
+            value = self.value
+        except ValueError as e:
+            return [str(e)]
+        if value is None:
+            return []
+        if self._validator is None:
+            self._validator = Constraint.compile_all(self.constraints)
+        return ["Property %s value %r violates %s: %s" % (
+            self.name, value, constraint_type, constraint)
+            for constraint_type, constraint in self._validator(value)]
+
     def __repr__(self):
         return "<tosca.Property name:%s type:%s rvalue:%s>" % (
             self.name, self.type, self._value)
 
 
+def _in_range(bounds):
+    low, high = bounds
+    return lambda value: low <= value <= high
+
+
+def _valid_values(values):
+    try:
+        return frozenset(values).__contains__
+    except TypeError:
+        # Unhashable valid values, fallback to a scan.
+        return list(values).__contains__
+
+
+def _pattern(pattern):
+    match = re.compile(pattern).match
+    return lambda value: match(value) is not None
+
+
+def _no_constraints(value):
+    return []
+
+
 class Constraint(object):
+    """Property value constraints.
 
-    operator_map = {
-        'equal': operator.eq,
-        'greater_than': operator.gt,
-        'greater_or_equal': operator.ge,
-        'less_than': operator.lt,
-        'less_or_equal': operator.le,
-        'in_range': lambda x, y: y in range(x[0], x[1]),
-        'valid_values': operator.contains,
-        'length': lambda x, y: len(y) == x,
-        'min_length': lambda x, y: len(y) > x,
-        'max_length': lambda x, y: len(y) < x,
-        'pattern': lambda x, y: bool(re.match(x, y))}
+    Each constraint type has a compiler, which given the constraint's
+    argument returns a check function taking a value and returning
+    whether the value satisfies the constraint.
+    """
+
+    compilers = {
+        'equal': lambda c: lambda v: v == c,
+        'greater_than': lambda c: lambda v: v > c,
+        'greater_or_equal': lambda c: lambda v: v >= c,
+        'less_than': lambda c: lambda v: v < c,
+        'less_or_equal': lambda c: lambda v: v <= c,
+        'in_range': _in_range,
+        'valid_values': _valid_values,
+        'length': lambda c: lambda v: len(v) == c,
+        'min_length': lambda c: lambda v: len(v) >= c,
+        'max_length': lambda c: lambda v: len(v) <= c,
+        'pattern': _pattern}
 
     @classmethod
-    def validate(cls, constraint_type, constraint, value):
-        if constraint_type not in cls.operator_map:
+    def compile(cls, constraint_type, constraint):
+        if constraint_type not in cls.compilers:
             raise ValueError("Unknown constraint type %s" % constraint_type)
-        op = cls.operator_map[constraint_type]
-        return op(constraint, value)
+        return cls.compilers[constraint_type](constraint)
+
+    @classmethod
+    def validate(cls, constraint_type, constraint, value):
+        return cls.compile(constraint_type, constraint)(value)
+
+    @classmethod
+    def compile_all(cls, constraints):
+        """Compile a property's list of constraints into a validator.
+
+        The validator takes a value and returns the (type, constraint)
+        pairs the value violates. Malformed constraints are logged and
+        skipped.
+        """
+        checks = []
+        for c in constraints or ():
+            if not isinstance(c, dict):
+                log.warning("Malformed constraint %s", c)
+                continue
+            for constraint_type, constraint in c.items():
+                try:
+                    check = cls.compile(constraint_type, constraint)
+                except (TypeError, ValueError, re.error) as e:
+                    log.warning("Invalid constraint %s: %s", c, e)
+                    continue
+                checks.append((check, constraint_type, constraint))
+        if not checks:
+            return _no_constraints
+
+        def validator(value):
+            failed = []
+            for check, constraint_type, constraint in checks:
+                try:
+                    if check(value):
+                        continue
+                except (TypeError, ValueError):
+                    pass
+                failed.append((constraint_type, constraint))
+            return failed
+        return validator
+
+
+def compile_validators(schemas):
+    """Return validators for the constrained properties of a schema.
+    """
+    validators = {}
+    if not isinstance(schemas, dict):
+        return validators
+    for name, schema in schemas.items():
+        if isinstance(schema, dict) and schema.get('constraints'):
+            validators[name] = Constraint.compile_all(schema['constraints'])
+    return validators
 
 
 class Value(object):
+
+    __slots__ = ('name', 'attrs', '_value')
+
     def __init__(self, name, attrs):
         self.name = name
         self.attrs = attrs
@@ -372,10 +916,14 @@ class Value(object):
 class Input(Value):
     """Topology template input value."""
 
+    __slots__ = ()
+
 
 class Output(Value):
     """Topology template output value."""
 
+    __slots__ = ('topology',)
+
     def __init__(self, name, attrs, topology=None):
         self.name = name
         self.attrs = attrs
@@ -391,6 +939,8 @@ class Output(Value):
 
 class Entity(object):
 
+    __slots__ = ('name', 'data', 'topology')
+
     def __init__(self, name, data, topology=None):
         self.name = name
         self.data = data
@@ -402,42 +952,62 @@ class Entity(object):
 
 class PropertyContainer(Entity):
 
+    __slots__ = ()
     _properties = None
     _property_key = "properties"
     _property_attr = "_properties"
     _parent = None
+    _validators = None
 
     @property
     def properties(self):
         properties = []
-        template_properties = self.data.get(self._property_key, {})
-        for k, schema in getattr(self, self._property_attr).items():
-            v = None
-            if k in template_properties:
-                v = template_properties[k]
-            p = Property(k, topology=self.topology, value=v, **schema)
-            # Need parent to resolve get_ref_property functions
-            p.set_parent(self._parent or self)
-            properties.append(p)
+        template_properties = self._template_properties()
+        for k, schema in self._property_schemas().items():
+            properties.append(
+                self._make_property(k, schema, template_properties.get(k)))
         return properties
 
     def get_property(self, name):
-        schema = getattr(self, self._property_attr).get(name)
+        schema = self._property_schemas().get(name)
         if schema is None:
             return None
-        if isinstance(schema, basestring):
+        return self._make_property(
+            name, schema, self._template_properties().get(name))
+
+    def _property_schemas(self):
+        schemas = getattr(self, self._property_attr)
+        if not isinstance(schemas, dict):
+            return {}
+        return schemas
+
+    def _template_properties(self):
+        if not isinstance(self.data, dict):
+            return {}
+        return self.data.get(self._property_key) or {}
+
+    def _make_property(self, name, schema, value):
+        if not isinstance(schema, dict):
             schema = {'type': schema}
-        v = self.data.get(self._property_key, {}).get(name, None)
-        p = Property(name, topology=self.topology, value=v, **schema)
+        p = Property(
+            name, schema.get('type'), topology=self.topology, value=value,
+            **dict([(k, schema[k]) for k in PROPERTY_SCHEMA_KEYS
+                    if k in schema]))
+        # Need parent to resolve get_ref_property functions
         p.set_parent(self._parent or self)
+        if self._validators:
+            p._validator = self._validators.get(name)
         return p
 
 
 class InterfaceType(object):
 
+    __slots__ = ('name', 'data', 'tosca_name')
+
     def __init__(self, name, data):
         self.name = name
         self.data = data
+        self.tosca_name = name
 
     @property
     def operations(self):
@@ -449,6 +1019,7 @@ class InterfaceType(object):
 
 class InterfaceOperation(PropertyContainer):
 
+    __slots__ = ('_properties',)
     _property_key = 'input'
 
     def __init__(self, name, data, topology, properties=None):
@@ -476,10 +1047,26 @@ class InterfaceOperation(PropertyContainer):
 
 class Node(PropertyContainer):
 
+    __slots__ = ()
     _requirements = None
+    _requirement_slots = ()
     _capabilities = None
     _interfaces = None
 
+    @property
+    def type_hierarchy(self):
+        """Types visible to this node, including template defined types.
+        """
+        if self.topology is not None:
+            return self.topology.types
+        return self.types
+
+    @property
+    def type_names(self):
+        """Names of the node's type and its bases, most derived first.
+        """
+        return type_names(self.__class__)
+
     @property
     def capabilities(self):
         capabilities = []
@@ -492,35 +1079,35 @@ class Node(PropertyContainer):
         ctype_info = self._capabilities.get(name)
         if ctype_info is None:
             return
-        capability_class = self.types.get(ctype_info['type'])
+        if not isinstance(ctype_info, dict):
+            ctype_info = {'type': ctype_info}
+        capability_class = self.type_hierarchy.get(
+            ctype_info['type'], types=('capabilities',))
         data = template_capabilities.get(name, {})
         return capability_class(name, data, self.topology)
 
     @property
     def requirements(self):
         requirements = []
-        template_reqs = {}
-        for tmpl_req in self.data.get('requirements', []):
-            template_reqs[get_named_slot(tmpl_req)] = tmpl_req
-        for req in self._requirements:
-            req = dict(req)
-            name = get_named_slot(req)
-            data = template_reqs.get(name, {})
+        template_reqs = dict(get_template_requirements(self.data))
+        for slot in self._requirement_slots:
+            data = template_reqs.get(slot.name)
+            if not data:
+                # Relations share the type's data for unbound slots.
+                requirements.append(
+                    slot.relation(slot.name, slot.data, self.topology))
+                continue
+            req = dict(slot.data)
             req.update(data)
-            rel_class = self._get_relation_class(name, req, data)
-            requirements.append(rel_class(name, req, self.topology))
+            if data.get('relation_type'):
+                rel_class = self._get_relation_class(slot.name, req, data)
+            else:
+                rel_class = slot.relation
+            requirements.append(rel_class(slot.name, req, self.topology))
         return requirements
 
     def _get_relation_class(self, name, type_req, template_data):
-        rel_type = template_data.get('relation_type')
-        if rel_type:
-            return self.types.get(rel_type)
-        if name == 'host':
-            return self.types.get('HostedOn')
-        elif name == 'dependency':
-            return self.types.get('DependsOn')
-        else:
-            return self.types.get("ConnectsTo")
+        return get_relation_class(self.type_hierarchy, name, template_data)
 
     @property
     def interfaces(self):
@@ -528,16 +1115,21 @@ class Node(PropertyContainer):
         # interface usage by templates typically isn't scoped enough
         # to allow for multiple interfaces. intended usage is a single
         # lifecycle per node or relation.
+        types = self.type_hierarchy
         if isinstance(self._interfaces, list):
-            interface_type = self.types.get(
+            interface_type = types.get(
                 self._interfaces[0], types=('interfaces',))
             idata = {}
         else:
             idata = self._interfaces[self._interfaces.keys()[0]]
-            interface_type = self.types.get(
+            interface_type = types.get(
                 self._interfaces.keys()[0], types=('interfaces',))
+        if interface_type is None:
+            log.warning("Unknown interface type for %s: %s",
+                        self.name, self._interfaces)
+            return interfaces
 
-        template_data = self.data.get('interfaces', {})
+        template_data = self.data.get('interfaces') or {}
         # TODO: Carry forward interface level properties to operation
         for op in interface_type.operations:
             interfaces.append(
@@ -546,23 +1138,42 @@ class Node(PropertyContainer):
                     self.topology, idata.get('inputs')))
         return interfaces
 
+    @property
+    def replicas(self):
+        """The template's replicas, by default a single one.
+        """
+        return self.topology.replicas(self.name)
+
+    def scale(self, count):
+        """Set the number of replicas of the template.
+        """
+        replicas = self.replicas
+        replicas.scale(count)
+        return replicas
+
     def validate(self):
-        errors = []
-        for r in self.requirements:
-            errors.extend(r.validate())
-        for p in self.properties:
-            errors.extend(r.validate())
-        for i in self.interfaces:
-            errors.extend(i.validate())
-        for c in self.capabilities:
-            errors.extend(c.validate())
-        return errors
+        with trace.span('node.validate', {'node': self.name}):
+            errors = []
+            for r in self.requirements:
+                errors.extend(r.validate())
+            for p in self.properties:
+                errors.extend(p.validate())
+            for i in self.interfaces:
+                errors.extend(i.validate())
+            for c in self.capabilities:
+                errors.extend(c.validate())
+            return errors
 
 
 class Capability(PropertyContainer):
 
+    __slots__ = ()
+
     def validate(self):
-        return []
+        errors = []
+        for p in self.properties:
+            errors.extend(p.validate())
+        return errors
 
 
 class Relation(Entity):
@@ -570,17 +1181,26 @@ class Relation(Entity):
     A relation can point to another tmpleate within the graph, or
     be defined as unbound resource for the engine to fill.
     """
+    __slots__ = ()
     _valid_targets = None
     _interfaces = None
 
     @property
     def target(self):
+        return self._target(self.topology.get_template)
+
+    def peek_target(self):
+        """Return the target template, see Tosca.peek_template.
+        """
+        return self._target(self.topology.peek_template)
+
+    def _target(self, get_template):
         entity_name = self.data[self.name]
         if isinstance(entity_name, basestring):
             if entity_name.startswith('tosca.'):  # also unbound
                 log.info("Unbound relation reference %s" % self.data)
                 return None
-            return self.topology.get_template(entity_name)
+            return get_template(entity_name)
         else:
             log.info("Unbound relation reference %s" % self.data)
         # If we have an anonymous requirement specification, it needs
@@ -591,24 +1211,107 @@ class Relation(Entity):
         return []
 
 
+class _ResolvedValue(object):
+    """A memoized property value and the reads it was derived from.
+    """
+    __slots__ = ('raw', 'value', 'inputs', 'reads', 'cacheable')
+
+    def __init__(self, raw):
+        self.raw = raw
+        self.value = None
+        self.inputs = set()
+        self.reads = []
+        self.cacheable = True
+
+    def current(self):
+        for mapping, key, value in self.reads:
+            if mapping.get(key) is not value:
+                return False
+        return True
+
+
+TYPE_ROOTS = {
+    'nodes': Node, 'relations': Relation, 'capabilities': Capability}
+
+# The class attributes of each kind of type, merged with the base
+# type's from a key of the type definition, or an empty value.
+TYPE_ATTRS = {
+    'nodes': (
+        ('_requirements', 'requirements', list),
+        ('_interfaces', 'interfaces', list),
+        ('_properties', 'properties', dict),
+        ('_capabilities', 'capabilities', dict)),
+    'relations': (
+        ('_valid_targets', 'valid_targets', list),
+        ('_interfaces', 'interfaces', dict)),
+    'capabilities': (
+        ('_properties', 'properties', dict),),
+}
+
+
 class Tosca(object):
 
     schema_path = os.path.join(
         os.path.dirname(os.path.abspath(__file__)),
         'tosca_schema.yaml')
 
-    def __init__(self, data):
+    def __init__(self, data, path=None, search_paths=None):
+        """Create a topology from template data.
+
+        `path` is the template's file, which its imports are located
+        relative to, along with `search_paths`, by default those in
+        PYTOSCA_IMPORT_PATH. Imports are only loaded given either, as
+        load() does, otherwise the template's own types are loaded
+        without them.
+        """
+        self._local = threading.local()
+        self.path = path
+        self.search_paths = search_paths
         self.data = data
-        self.types = TypeHierarchy()
-        self.types.load_schema(self.schema_path)
+
+    @property
+    def data(self):
+        return self._data
+
+    @data.setter
+    def data(self, data):
+        self._data = data
+        parent = TypeHierarchy.shared(self.schema_path)
+        if self.imports and (
+                self.path is not None or self.search_paths is not None):
+            from pytosca.imports import ImportResolver
+            parent = ImportResolver(self.search_paths).load(
+                self.imports, self.path and os.path.dirname(self.path),
+                self.path, parent)
+        self.types = TypeHierarchy(parent=parent)
         self._load_template_schema()
+        self._replica_sets = {}
+        self.invalidate()
+
+    def invalidate(self):
+        """Discard state derived from the template data.
+
+        Needs to be called after modifying the template data in place.
+        """
+        self._graph = None
+        self._index = None
+        self._templates = {}
+        self._nodetemplates = None
+        self._values = {}
+        self._value_inputs = {}
+        self._input_validator = None
+
+    @property
+    def graph(self):
+        """The requirement graph between node templates.
+        """
+        if self._graph is None:
+            from pytosca.graph import TopologyGraph
+            self._graph = TopologyGraph(self)
+        return self._graph
 
     def _load_template_schema(self):
-        for k, v in ENTITY_TYPE_MAP.items():
-            if not v or not v in self.data:
-                continue
-            loader = getattr(self.types, 'load_%s' % k)
-            loader(self.data[v].keys(), self.data[v])
+        self.types.load_definitions(self.data)
 
     @property
     def tosca_version(self):
@@ -633,12 +1336,12 @@ class Tosca(object):
     @property
     def inputs(self):
         inputs = []
-        for k, v in self.data.get('inputs', {}).items():
+        for k, v in (self.data.get('inputs') or {}).items():
             inputs.append(Input(k, v))
         return inputs
 
     def get_input(self, name):
-        value = self.data.get('inputs', {}).get(name)
+        value = (self.data.get('inputs') or {}).get(name)
         if value is None:
             return value
         return Input(name, value)
@@ -649,48 +1352,243 @@ class Tosca(object):
             if input is None:
                 raise ValueError("Unknown input %s" % k)
             input.set_value(v)
+            for key in self._value_inputs.pop(k, ()):
+                self._values.pop(key, None)
+        self._templates = {}
+        self._nodetemplates = None
+
+    def validate_inputs(self, input_sets):
+        """Validate input value sets without binding them.
+
+        Takes an iterable of input dicts and returns an iterator of
+        error lists, one per set, an empty list for a valid set.
+        """
+        if self._input_validator is None:
+            from pytosca.batch import InputValidator
+            self._input_validator = InputValidator(self)
+        return self._input_validator.validate(input_sets)
+
+    def resolve_property(self, property):
+        """Resolve a property's function value, memoizing the result.
+
+        Values are cached per template and property, along with the
+        inputs and literal template values they were computed from. A
+        cached value is discarded when bind_inputs binds one of its
+        inputs, and is recomputed if any literal value it was derived
+        from has since been changed in the template data. Other changes
+        to the template data need a call to invalidate().
+
+        With lazily loaded templates, only values of the templates
+        retained by get_template() that don't read other templates'
+        unretained data are memoized, so iter_nodetemplates() passes
+        don't retain the templates they parse.
+        """
+        raw = property._value
+        key = (id(raw), property.parent.name, property.name)
+        stack = self._resolving()
+        entry = self._values.get(key)
+        if entry is None or entry.raw is not raw or not entry.current():
+            trace.count('property.cache_miss')
+            entry = _ResolvedValue(raw)
+            entry.cacheable = self._retained(property.parent)
+            stack.append(entry)
+            try:
+                with trace.span('property.resolve'):
+                    entry.value = ValueResolver.resolve(property, raw)
+            finally:
+                stack.pop()
+            if entry.cacheable:
+                self._values[key] = entry
+                for name in entry.inputs:
+                    self._value_inputs.setdefault(name, set()).add(key)
+        else:
+            trace.count('property.cache_hit')
+        if stack:
+            stack[-1].inputs.update(entry.inputs)
+            stack[-1].reads.extend(entry.reads)
+            stack[-1].cacheable = stack[-1].cacheable and entry.cacheable
+        return entry.value
+
+    def _lazy_templates(self):
+        return hasattr(self.data.get('node_templates'), 'peek')
+
+    def _retained(self, container):
+        """Whether a property container's data is retained.
+        """
+        return not self._lazy_templates() or (
+            self._templates.get(container.name) is container)
+
+    def track_read(self, mapping, key, input_name=None):
+        """Record a read of mapping[key] by the value being resolved.
+        """
+        stack = self._resolving()
+        if not stack:
+            return
+        stack[-1].reads.append((mapping, key, mapping.get(key)))
+        if input_name is not None:
+            stack[-1].inputs.add(input_name)
+
+    def track_property(self, data, property_key, name):
+        properties = data.get(property_key)
+        if properties is None:
+            self.track_read(data, property_key)
+        else:
+            self.track_read(properties, name)
+
+    def _resolving(self):
+        try:
+            return self._local.stack
+        except AttributeError:
+            stack = self._local.stack = []
+            return stack
 
     @property
     def outputs(self):
         outputs = []
-        for k, v in self.data.get('outputs', {}).items():
+        for k, v in (self.data.get('outputs') or {}).items():
             outputs.append(Output(k, v, self))
         return outputs
 
     def get_output(self, name):
-        value = self.data.get('outputs', {}).get(name)
+        value = (self.data.get('outputs') or {}).get(name)
         if value is None:
             return value
         return Output(name, value, self)
 
     @property
     def nodetemplates(self):
-        nodes = []
-        for k, v in self.data.get('node_templates', {}).items():
-            node_type = v.get('type')
-            node_cls = self.types.get(node_type)
-            if node_cls is None:
-                raise TypeError(
-                    "Unknown node template type %s for %s" % (
-                        node_type, k))
-            nodes.append(node_cls(k, v, self))
+        """All node templates, the returned list is shared and read only.
+
+        The list is rebuilt when a template's data is replaced or
+        templates are added or removed.
+        """
+        templates = self.data.get('node_templates') or {}
+        nodes = self._nodetemplates
+        if nodes is None or len(nodes) != len(templates) or not all(
+                templates.get(n.name) is n.data for n in nodes):
+            nodes = self._nodetemplates = [
+                self.get_template(k) for k in templates]
         return nodes
 
     def get_template(self, name):
-        value = self.data.get('node_templates', {}).get(name)
+        """Return the node template instance for the given name.
+
+        Instances are cached, repeated calls return the same instance
+        as long as the template's data is unchanged.
+        """
+        value = (self.data.get('node_templates') or {}).get(name)
         if value is None:
             return value
-        node_cls = self.types.get(value.get('type'))
+        node = self._templates.get(name)
+        if node is not None:
+            if node.data is value:
+                return node
+            self._nodetemplates = None
+        node = self._templates[name] = self._create_template(name, value)
+        return node
+
+    def peek_template(self, name):
+        """Return a node template without retaining it.
+
+        As get_template(), except with lazily loaded templates a
+        template not already retained is parsed for the call only.
+        """
+        if not self._lazy_templates():
+            return self.get_template(name)
+        templates = self.data['node_templates']
+        if name not in templates:
+            return None
+        node = self._templates.get(name)
+        value = templates.peek(name)
+        if node is not None and node.data is value:
+            return node
+        for entry in self._resolving():
+            entry.cacheable = False
+        return self._create_template(name, value)
+
+    def replicas(self, name):
+        """Return the ReplicaSet scaling the named node template.
+
+        Replica counts and overrides are kept across invalidate().
+        """
+        replicas = self._replica_sets.get(name)
+        if replicas is None:
+            if self.get_template(name) is None:
+                raise ValueError("Unknown node template %s" % name)
+            from pytosca.scaling import ReplicaSet
+            replicas = self._replica_sets[name] = ReplicaSet(self, name)
+        return replicas
+
+    def iter_nodetemplates(self):
+        """Iterate over node templates without retaining them.
+
+        With lazily loaded templates each template is parsed when
+        reached and released after, keeping memory use bounded.
+        """
+        from pytosca.lazy import iter_templates
+        for name, value in iter_templates(
+                self.data.get('node_templates') or {}):
+            node = self._templates.get(name)
+            if node is None or node.data is not value:
+                node = self._create_template(name, value)
+            yield node
+
+    def template_class(self, name, value):
+        """Return the node type class of a template's data.
+        """
+        node_cls = self.types.get(value.get('type'), types=('nodes',))
         if node_cls is None:
             raise TypeError(
                 "Unknown node template type %s for %s" % (
                     value.get('type'), name))
+        return node_cls
+
+    def _create_template(self, name, value):
+        node_cls = self.template_class(name, value)
+        trace.count('template.create')
         return node_cls(name, value, self)
 
+    @property
+    def index(self):
+        """Indexes of node templates by type, capability and property.
+        """
+        if self._index is None:
+            from pytosca.query import TemplateIndex
+            self._index = TemplateIndex(self)
+        return self._index
+
+    def find_templates(self, type=None, capability=None,
+                       capability_type=None, properties=None):
+        """Return the node templates matching all the given criteria.
+
+        See TemplateIndex.find.
+        """
+        return self.index.find(type, capability, capability_type, properties)
+
+    def resolve_all(self):
+        """Resolve every value in the topology in one pass.
+
+        Returns a ResolvedTopology snapshot of all node template
+        property, capability property, operation input and output
+        values.
+        """
+        from pytosca.resolve import TopologyResolver
+        with trace.span('topology.resolve_all'):
+            return TopologyResolver(self).resolve()
+
+    def snapshot(self):
+        """Return a read only Snapshot of the resolved topology.
+
+        The snapshot may be saved and reloaded by other processes
+        without loading the template again.
+        """
+        from pytosca.snapshot import Snapshot
+        return Snapshot.compile(self)
+
     # More advanced properties
     @property
     def imports(self):
-        return self.data.get('imports', ())
+        return self.data.get('imports') or ()
 
     @property
     def node_types(self):
@@ -713,7 +1611,29 @@ class Tosca(object):
         return self.data.get('groups', ())
 
     @classmethod
-    def load(cls, path):
-        with open(path) as fh:
-            data = yaml_load(fh.read())
-        return cls(data)
+    def load(cls, path, lazy=False, search_paths=None):
+        """Load a topology from a template file.
+
+        With lazy set, node templates are only parsed when accessed.
+        """
+        with trace.span('topology.load', {'path': path}):
+            with open(path) as fh:
+                content = fh.read()
+            if lazy:
+                from pytosca.lazy import lazy_load
+                data = lazy_load(content)
+            else:
+                data = yaml_load(content)
+            return cls(data, path, search_paths)
+
+
+def warmup(schema_path=None):
+    """Load yaml and build the normative types ahead of first use.
+
+    Pre-fork servers can call this in the parent so workers share the
+    loaded types instead of each building them on first request.
+    """
+    yaml_loader()
+    types = TypeHierarchy.shared(schema_path or Tosca.schema_path)
+    types.warmup()
+    return types
@@ -0,0 +1,174 @@
+# Copyright 2014-2015 Kapil Thangavelu <kapil.foss@gmail.com>
+#
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+"""Opt-in instrumentation of loading, resolution and validation.
+
+Instrumented code calls `count` for counters and `span` to time a
+phase. Both do nothing until `enable` is called, after which
+counters and per phase timings accumulate until `disable`::
+
+    >>> from pytosca import trace
+    >>> trace.enable()
+    >>> topology = Tosca.load('template.yaml')
+    >>> trace.stats()['timers']['yaml.parse']
+    {'count': 1, 'total': 0.0021, 'max': 0.0021}
+    >>> trace.export_chrome('trace.json')
+
+With events recorded, each span is also kept for export in the trace
+event format read by chrome://tracing and other trace viewers.
+"""
+
+import contextlib
+import json
+import os
+import threading
+import time
+
+_tracer = None
+
+
+class _NullSpan(object):
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class Tracer(object):
+    """Accumulates counters, timers and optionally trace events.
+    """
+
+    def __init__(self, events=True):
+        self.events = None
+        if events:
+            self.events = []
+        self.counters = {}
+        self.timers = {}
+        self.start = time.time()
+        self.lock = threading.Lock()
+
+    def count(self, name, n=1):
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    @contextlib.contextmanager
+    def span(self, name, args=None):
+        start = time.time()
+        try:
+            yield
+        finally:
+            end = time.time()
+            self.record(name, start, end - start, args)
+
+    def record(self, name, start, duration, args=None):
+        with self.lock:
+            timer = self.timers.get(name)
+            if timer is None:
+                timer = self.timers[name] = {
+                    'count': 0, 'total': 0.0, 'max': 0.0}
+            timer['count'] += 1
+            timer['total'] += duration
+            timer['max'] = max(timer['max'], duration)
+            if self.events is not None:
+                event = {
+                    'name': name, 'cat': name.split('.')[0], 'ph': 'X',
+                    'ts': (start - self.start) * 1e6, 'dur': duration * 1e6,
+                    'pid': os.getpid(),
+                    'tid': threading.current_thread().ident}
+                if args:
+                    event['args'] = args
+                self.events.append(event)
+
+    def stats(self):
+        with self.lock:
+            return {
+                'counters': dict(self.counters),
+                'timers': dict(
+                    (k, dict(v)) for k, v in self.timers.items())}
+
+    def trace_events(self):
+        with self.lock:
+            events = list(self.events or ())
+            ts = (time.time() - self.start) * 1e6
+            pid = os.getpid()
+            for name, value in sorted(self.counters.items()):
+                events.append({
+                    'name': name, 'cat': name.split('.')[0], 'ph': 'C',
+                    'ts': ts, 'pid': pid, 'args': {'value': value}})
+        return events
+
+
+def enable(events=True):
+    """Start collecting, with a fresh tracer, and return it.
+
+    Span events are kept for trace export unless `events` is False,
+    which limits memory use to the counters and timer totals.
+    """
+    global _tracer
+    _tracer = Tracer(events)
+    return _tracer
+
+
+def disable():
+    """Stop collecting, returning the tracer that was active if any.
+    """
+    global _tracer
+    tracer, _tracer = _tracer, None
+    return tracer
+
+
+def enabled():
+    return _tracer is not None
+
+
+def count(name, n=1):
+    if _tracer is not None:
+        _tracer.count(name, n)
+
+
+def span(name, args=None):
+    """Return a context manager timing the enclosed block as `name`.
+    """
+    if _tracer is None:
+        return _NULL_SPAN
+    return _tracer.span(name, args)
+
+
+def stats():
+    """Return the counters and timers collected so far.
+
+    Timers map a phase name to its count, total and max seconds.
+    """
+    if _tracer is None:
+        return {'counters': {}, 'timers': {}}
+    return _tracer.stats()
+
+
+def export_chrome(path, tracer=None):
+    """Write the collected spans and counters as a trace event file.
+    """
+    tracer = tracer or _tracer
+    if tracer is None:
+        raise RuntimeError("Tracing is not enabled")
+    with open(path, 'w') as fh:
+        json.dump({'traceEvents': tracer.trace_events(),
+                   'displayTimeUnit': 'ms'}, fh)
@@ -13,9 +13,10 @@ setup(name='pytosca',
       long_description=open("README.md").read(),
       url='https://github.com/kapilt/pytosca',
       license='Apache',
-      test_suite="pytosca.tests.test_tosca",
-      test_loader='unittest:TestLoader',
-      packages=find_packages(),
+      test_suite="pytosca.tests",
+      packages=find_packages(exclude=['benchmarks', 'benchmarks.*']),
       package_data={'pytosca': ['tosca_schema.yaml']},
       install_requires=["PyYAML"],
+      entry_points={
+          'console_scripts': ['pytosca = pytosca.cli:main']},
       )